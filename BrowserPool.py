@@ -0,0 +1,118 @@
+import atexit
+import queue
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+default_browser_pool_size = 2
+default_page_ready_timeout = 30
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36"
+
+class BrowserPool:
+	"""
+	Headless Chrome instances that are started on first use and kept for the whole run,
+	so that browser startup is paid once rather than once per page.
+	"""
+	def __init__(self, size=default_browser_pool_size, page_ready_timeout=default_page_ready_timeout):
+		self.size = size
+		self.page_ready_timeout = page_ready_timeout
+		self.idle_drivers = queue.Queue()
+		self.drivers = []
+		self.lock = threading.Lock()
+
+	def create_driver(self):
+		chrome_options = Options()
+		chrome_options.add_argument("--headless=new")
+		chrome_options.add_argument("--disable-gpu")
+		chrome_options.add_argument("--no-sandbox")
+		chrome_options.add_argument("--disable-dev-shm-usage")
+		chrome_options.add_argument(f"--user-agent={USER_AGENT}")
+		return webdriver.Chrome(options=chrome_options)
+
+	def acquire(self):
+		try:
+			return self.idle_drivers.get_nowait()
+		except queue.Empty:
+			pass
+
+		with self.lock:
+			if len(self.drivers) < self.size:
+				driver = self.create_driver()
+				self.drivers.append(driver)
+				return driver
+
+		return self.idle_drivers.get()
+
+	def discard(self, driver):
+		with self.lock:
+			self.drivers.remove(driver)
+		try:
+			driver.quit()
+		except WebDriverException:
+			pass
+
+	@contextmanager
+	def driver(self):
+		driver = self.acquire()
+		crashed = False
+		try:
+			yield driver
+		except WebDriverException:
+			crashed = True
+			raise
+		finally:
+			# A browser that may have crashed is replaced rather than handed out again
+			if crashed:
+				self.discard(driver)
+			else:
+				self.idle_drivers.put(driver)
+
+	def get_page_source(self, url, ready_selector=None):
+		"""
+		Load a page and wait until ready_selector is present, or until the document has
+		loaded if no selector is given. Returns the page source and whether it became ready.
+		"""
+		with self.driver() as driver:
+			driver.get(url)
+			try:
+				if ready_selector is not None:
+					WebDriverWait(driver, self.page_ready_timeout).until(
+						EC.presence_of_element_located((By.CSS_SELECTOR, ready_selector))
+					)
+				else:
+					WebDriverWait(driver, self.page_ready_timeout).until(
+						lambda d: d.execute_script("return document.readyState") == "complete"
+					)
+				ready = True
+			except TimeoutException:
+				print(f"Timed out after {self.page_ready_timeout}s waiting for {url} to be ready")
+				ready = False
+			return driver.page_source, ready
+
+	def close(self):
+		with self.lock:
+			drivers = self.drivers
+			self.drivers = []
+		for driver in drivers:
+			try:
+				driver.quit()
+			except WebDriverException:
+				pass
+
+browser_pool = None
+browser_pool_lock = threading.Lock()
+
+def get_browser_pool():
+	"""Return the process-wide browser pool, which is closed when the process exits."""
+	global browser_pool
+	with browser_pool_lock:
+		if browser_pool is None:
+			browser_pool = BrowserPool()
+			atexit.register(browser_pool.close)
+		return browser_pool
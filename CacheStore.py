@@ -0,0 +1,387 @@
+import argparse
+import atexit
+import gzip
+import io
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+# Total size the cache is allowed to grow to before least recently used entries are evicted
+default_cache_max_bytes = 4 * 1024 ** 3
+
+# How bodies are compressed on disk: None, "gzip" or "zstd" (needs the zstandard package)
+default_cache_compression = "gzip"
+
+# Access times and hit counts are written to the index in batches, at most this often or this many at a time
+access_flush_seconds = 5
+access_flush_size = 256
+
+INDEX_FILENAME = "index.sqlite3"
+# Databases of the other caches (parse results, enrichment, rate limits) live here, apart from the entries
+DATABASE_DIRNAME = "db"
+# Only files named like the keys of retrieve_webpage.get_cache_key are entries
+ENTRY_FILENAME = re.compile(r"^[0-9a-f]{32}\.(html|json)(\.gz|\.zst)?$")
+COMPRESSION_SUFFIXES = {
+	None: "",
+	"gzip": ".gz",
+	"zstd": ".zst"
+}
+
+class CacheStore:
+	"""
+	Cached webpages, stored as one optionally compressed file per entry in cache_dir, with a
+	SQLite index recording where each entry came from, its size and when it was last used.
+	"""
+	def __init__(self, cache_dir=".cache", max_bytes=default_cache_max_bytes, compression=default_cache_compression):
+		if compression not in COMPRESSION_SUFFIXES:
+			raise ValueError(f"Invalid cache compression: {compression}")
+		if compression == "zstd" and zstandard is None:
+			raise ValueError("zstd cache compression requires the zstandard package")
+
+		self.cache_dir = cache_dir
+		self.max_bytes = max_bytes
+		self.compression = compression
+		self.lock = threading.Lock()
+		# Unwritten access times by key, and unwritten [hits, misses] by host
+		self.pending_accesses = {}
+		self.pending_host_stats = {}
+		self.last_flush = time.time()
+
+		os.makedirs(cache_dir, exist_ok=True)
+		self.connection = sqlite3.connect(
+			os.path.join(cache_dir, INDEX_FILENAME),
+			timeout=60,
+			check_same_thread=False
+		)
+		self.connection.execute("PRAGMA journal_mode=WAL")
+		self.connection.executescript("""
+			CREATE TABLE IF NOT EXISTS entries (
+				key TEXT PRIMARY KEY,
+				url TEXT,
+				host TEXT,
+				fetched_at REAL,
+				last_accessed REAL,
+				status INTEGER,
+				size INTEGER,
+				encoding TEXT,
+				etag TEXT,
+				last_modified TEXT
+			);
+			CREATE INDEX IF NOT EXISTS entries_last_accessed ON entries (last_accessed);
+			CREATE TABLE IF NOT EXISTS host_stats (
+				host TEXT PRIMARY KEY,
+				hits INTEGER NOT NULL DEFAULT 0,
+				misses INTEGER NOT NULL DEFAULT 0
+			);
+		""")
+		# Indexes created by older versions lack the columns added since
+		columns = [row[1] for row in self.connection.execute("PRAGMA table_info(entries)")]
+		for column in ["encoding", "etag", "last_modified"]:
+			if column not in columns:
+				self.connection.execute(f"ALTER TABLE entries ADD COLUMN {column} TEXT")
+		self.connection.commit()
+
+	def path(self, key, encoding=None):
+		return os.path.join(self.cache_dir, key + COMPRESSION_SUFFIXES[encoding])
+
+	def get(self, key, url=None):
+		"""Return the cached content for key, or None if it is not cached."""
+		host = urlparse(url).netloc if url else "unknown"
+		with self.lock:
+			row = self.connection.execute("SELECT encoding FROM entries WHERE key = ?", (key,)).fetchone()
+
+			# Entries written before the index existed are adopted the first time they are requested
+			if row is None and os.path.exists(self.path(key)):
+				self.insert_entry(key, url, os.path.getmtime(self.path(key)), 200, None)
+				self.connection.commit()
+				row = (None,)
+
+			content = None
+			if row is not None:
+				try:
+					content = self.read(key, row[0])
+				except FileNotFoundError:
+					self.connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+					self.connection.commit()
+
+			# A warm rerun reads every page, so hits are only recorded in memory until the next flush
+			hit = content is not None
+			host_stats = self.pending_host_stats.setdefault(host, [0, 0])
+			host_stats[0 if hit else 1] += 1
+			if hit:
+				self.pending_accesses[key] = time.time()
+			if len(self.pending_accesses) >= access_flush_size or time.time() - self.last_flush >= access_flush_seconds:
+				self.flush_accesses()
+
+		return content
+
+	def flush_accesses(self):
+		"""Write the batched access times and hit counts to the index. Callers hold the lock."""
+		if len(self.pending_accesses) > 0 or len(self.pending_host_stats) > 0:
+			self.connection.executemany(
+				"UPDATE entries SET last_accessed = ? WHERE key = ?",
+				[(accessed, key) for key, accessed in self.pending_accesses.items()]
+			)
+			self.connection.executemany(
+				"INSERT INTO host_stats (host, hits, misses) VALUES (?, ?, ?) "
+				"ON CONFLICT (host) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+				[(host, hits, misses) for host, (hits, misses) in self.pending_host_stats.items()]
+			)
+			self.connection.commit()
+		self.pending_accesses = {}
+		self.pending_host_stats = {}
+		self.last_flush = time.time()
+
+	def flush(self):
+		with self.lock:
+			self.flush_accesses()
+
+	def contains(self, key):
+		"""Whether key can be read, so an index row whose file has been lost does not count."""
+		with self.lock:
+			row = self.connection.execute("SELECT encoding FROM entries WHERE key = ?", (key,)).fetchone()
+		return os.path.exists(self.path(key, row[0] if row is not None else None))
+
+	def put(self, key, url, content, status=200, etag=None, last_modified=None):
+		"""
+		Store content under key along with the response's validators, then evict least recently
+		used entries if the cache is over budget.
+		"""
+		with self.lock:
+			self.write(key, content, self.compression)
+			self.remove_other_encodings(key, self.compression)
+			self.insert_entry(key, url, time.time(), status, self.compression, etag, last_modified)
+			self.connection.commit()
+			self.evict(self.max_bytes)
+
+	def remove(self, key):
+		"""Drop an entry so that it is fetched again."""
+		with self.lock:
+			for encoding in COMPRESSION_SUFFIXES:
+				if os.path.exists(self.path(key, encoding)):
+					os.remove(self.path(key, encoding))
+			self.connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+			self.connection.commit()
+
+	def get_metadata(self, key):
+		"""Return when an entry was fetched (or last revalidated) and its validators, or None if it is not indexed."""
+		with self.lock:
+			row = self.connection.execute(
+				"SELECT fetched_at, etag, last_modified FROM entries WHERE key = ?", (key,)
+			).fetchone()
+		if row is None:
+			return None
+		return {"fetched_at": row[0], "etag": row[1], "last_modified": row[2]}
+
+	def mark_revalidated(self, key):
+		"""Record that the server confirmed an entry is still current."""
+		with self.lock:
+			self.connection.execute("UPDATE entries SET fetched_at = ? WHERE key = ?", (time.time(), key))
+			self.connection.commit()
+
+	def read(self, key, encoding):
+		with open(self.path(key, encoding), 'rb') as f:
+			data = f.read()
+		if encoding == "gzip":
+			data = gzip.decompress(data)
+		elif encoding == "zstd":
+			data = zstandard.ZstdDecompressor().decompress(data)
+		# Decode the same way reading the file in text mode would, including newline translation
+		return io.TextIOWrapper(io.BytesIO(data), encoding='utf-8').read()
+
+	def write(self, key, content, encoding):
+		data = content.encode('utf-8')
+		if encoding == "gzip":
+			data = gzip.compress(data)
+		elif encoding == "zstd":
+			data = zstandard.ZstdCompressor().compress(data)
+
+		# Write then rename so that concurrent readers never see a partial file
+		temp_path = self.path(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+		with open(temp_path, 'wb') as f:
+			f.write(data)
+		os.replace(temp_path, self.path(key, encoding))
+
+	def remove_other_encodings(self, key, encoding):
+		for other_encoding in COMPRESSION_SUFFIXES:
+			if other_encoding != encoding and os.path.exists(self.path(key, other_encoding)):
+				os.remove(self.path(key, other_encoding))
+
+	def insert_entry(self, key, url, fetched_at, status, encoding, etag=None, last_modified=None):
+		self.connection.execute(
+			"INSERT OR REPLACE INTO entries (key, url, host, fetched_at, last_accessed, status, size, encoding, etag, last_modified) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+			(key, url, urlparse(url).netloc if url else "unknown", fetched_at, time.time(), status, os.path.getsize(self.path(key, encoding)), encoding, etag, last_modified)
+		)
+
+	def total_bytes(self):
+		return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+	def evict(self, max_bytes):
+		"""Remove least recently used entries until the cache fits in max_bytes. Returns the number removed."""
+		if max_bytes is None:
+			return 0
+
+		excess = self.total_bytes() - max_bytes
+		if excess <= 0:
+			return 0
+		# Eviction goes by access time, so it must see the batched ones
+		self.flush_accesses()
+		evicted = 0
+		for key, size, encoding in self.connection.execute("SELECT key, size, encoding FROM entries ORDER BY last_accessed").fetchall():
+			if excess <= 0:
+				break
+			if os.path.exists(self.path(key, encoding)):
+				os.remove(self.path(key, encoding))
+			self.connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+			excess -= size
+			evicted += 1
+
+		self.connection.commit()
+		return evicted
+
+	def index_existing_files(self):
+		"""Index cache files that predate the index. Their URL is unknown until they are next requested."""
+		indexed = 0
+		with self.lock:
+			# Older versions indexed the other caches' databases, which were kept alongside the entries
+			stray_keys = [
+				key for key, encoding in self.connection.execute("SELECT key, encoding FROM entries WHERE url IS NULL")
+				if not ENTRY_FILENAME.match(key + COMPRESSION_SUFFIXES[encoding])
+			]
+			self.connection.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in stray_keys])
+			known = set([
+				key + COMPRESSION_SUFFIXES[encoding]
+				for key, encoding in self.connection.execute("SELECT key, encoding FROM entries")
+			])
+			for filename in os.listdir(self.cache_dir):
+				if filename in known or not ENTRY_FILENAME.match(filename):
+					continue
+				if not os.path.isfile(os.path.join(self.cache_dir, filename)):
+					continue
+
+				key, encoding = filename, None
+				for suffix_encoding, suffix in COMPRESSION_SUFFIXES.items():
+					if suffix_encoding is not None and filename.endswith(suffix):
+						key, encoding = filename[:-len(suffix)], suffix_encoding
+
+				self.insert_entry(key, None, os.path.getmtime(self.path(key, encoding)), 200, encoding)
+				indexed += 1
+			self.connection.commit()
+		return indexed
+
+	def compress_existing_entries(self):
+		"""One-shot migration rewriting every entry not yet stored with the configured compression."""
+		self.index_existing_files()
+
+		with self.lock:
+			rows = self.connection.execute(
+				"SELECT key, encoding FROM entries WHERE encoding IS NOT ?", (self.compression,)
+			).fetchall()
+		before = self.total_bytes()
+
+		for key, encoding in rows:
+			with self.lock:
+				try:
+					content = self.read(key, encoding)
+				except FileNotFoundError:
+					continue
+				self.write(key, content, self.compression)
+				self.remove_other_encodings(key, self.compression)
+				self.connection.execute(
+					"UPDATE entries SET encoding = ?, size = ? WHERE key = ?",
+					(self.compression, os.path.getsize(self.path(key, self.compression)), key)
+				)
+				self.connection.commit()
+
+		return len(rows), before, self.total_bytes()
+
+	def gc(self, max_bytes=None):
+		"""Drop index rows whose files are gone, then evict down to max_bytes (the store's limit by default)."""
+		with self.lock:
+			dangling = [
+				key for (key, encoding) in self.connection.execute("SELECT key, encoding FROM entries").fetchall()
+				if not os.path.exists(self.path(key, encoding))
+			]
+			self.connection.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in dangling])
+			self.connection.commit()
+			evicted = self.evict(max_bytes if max_bytes is not None else self.max_bytes)
+		return len(dangling), evicted
+
+	def stats(self):
+		with self.lock:
+			self.flush_accesses()
+			hosts = {}
+			for host, entries, size in self.connection.execute("SELECT host, COUNT(*), SUM(size) FROM entries GROUP BY host"):
+				hosts[host] = {"entries": entries, "bytes": size, "hits": 0, "misses": 0}
+			for host, hits, misses in self.connection.execute("SELECT host, hits, misses FROM host_stats"):
+				hosts.setdefault(host, {"entries": 0, "bytes": 0})
+				hosts[host]["hits"] = hits
+				hosts[host]["misses"] = misses
+			return {"total_bytes": self.total_bytes(), "max_bytes": self.max_bytes, "hosts": hosts}
+
+	def print_stats(self):
+		stats = self.stats()
+		total_hits = sum([host["hits"] for host in stats["hosts"].values()])
+		total_lookups = total_hits + sum([host["misses"] for host in stats["hosts"].values()])
+
+		print(f"Cache: {self.cache_dir} -----------------------------------------")
+		print(f"Size: {stats['total_bytes'] / 1024 ** 2:.1f} MiB of {stats['max_bytes'] / 1024 ** 2:.1f} MiB")
+		if total_lookups > 0:
+			print(f"Hit rate: {100 * total_hits / total_lookups:.1f}% ({total_hits}/{total_lookups})")
+		for host, host_stats in sorted(stats["hosts"].items(), key=lambda item: -item[1]["bytes"]):
+			lookups = host_stats["hits"] + host_stats["misses"]
+			hit_rate = f"{100 * host_stats['hits'] / lookups:.1f}%" if lookups > 0 else "-"
+			print(f"  {host}: {host_stats['entries']} entries, {host_stats['bytes'] / 1024 ** 2:.1f} MiB, hit rate {hit_rate}")
+
+cache_stores = {}
+cache_stores_lock = threading.Lock()
+
+def database_path(cache_dir, filename):
+	"""
+	Path of one of the other caches' databases, in their own directory so that the cache store never
+	takes them for entries. A database left in cache_dir by an older version is moved there first.
+	"""
+	database_dir = os.path.join(cache_dir, DATABASE_DIRNAME)
+	os.makedirs(database_dir, exist_ok=True)
+	path = os.path.join(database_dir, filename)
+	if not os.path.exists(path) and os.path.exists(os.path.join(cache_dir, filename)):
+		for suffix in ["", "-wal", "-shm"]:
+			if os.path.exists(os.path.join(cache_dir, filename + suffix)):
+				os.replace(os.path.join(cache_dir, filename + suffix), path + suffix)
+	return path
+
+def get_cache_store(cache_dir=".cache"):
+	"""Return the process-wide store for a cache directory."""
+	with cache_stores_lock:
+		if cache_dir not in cache_stores:
+			cache_stores[cache_dir] = CacheStore(cache_dir)
+			atexit.register(cache_stores[cache_dir].flush)
+		return cache_stores[cache_dir]
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Inspect and maintain the webpage cache")
+	parser.add_argument("command", choices=["stats", "gc", "index", "compress"])
+	parser.add_argument("--cache-dir", default=".cache")
+	parser.add_argument("--max-bytes", type=int, default=None, help="Evict down to this many bytes (gc only)")
+	args = parser.parse_args()
+
+	store = get_cache_store(args.cache_dir)
+	if args.command == "stats":
+		store.print_stats()
+	elif args.command == "gc":
+		dangling, evicted = store.gc(args.max_bytes)
+		print(f"Removed {dangling} dangling index entries and evicted {evicted} entries")
+		store.print_stats()
+	elif args.command == "index":
+		print(f"Indexed {store.index_existing_files()} existing cache files")
+	elif args.command == "compress":
+		migrated, before, after = store.compress_existing_entries()
+		print(f"Compressed {migrated} entries with {store.compression}: {before / 1024 ** 2:.1f} MiB -> {after / 1024 ** 2:.1f} MiB")
@@ -1,12 +1,40 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from html_parsing import make_soup
 from retrieve_webpage import get_cached_webpage, get_cached_webpage_via_selenium
-from retrieve_paper_info import get_info_from_semantic_scholar
+from retrieve_paper_info import get_infos_from_semantic_scholar, get_doi_from_link, semantic_scholar_bulk_search_url, semantic_scholar_bulk_search_titles_per_query, semantic_scholar_batch_size
+import math
 import json
 import os
-from copy import deepcopy
-from utils import pretty_print_diff
+from utils import structural_diff, print_structural_diff, merge_sessions
+from saving import JsonlWriter
 from ScrapingStrategies import AbstractScrapingStrategy1, AbstractScrapingStrategy2
 from OsdiAtcNsdiConferenceScraper import OsdiAtcNsdiConferenceScraper
+from Pipeline import Pipeline, PipelineStage
+from ParseCache import memoize_parse, get_parse_cache
+from RunMetrics import get_run_metrics, reset_run_metrics
+from FetchPlan import FetchPlan, planning, get_active_fetch_plan
+from RunJournal import RunJournal
+from Paper import Session, encode_papers, decode_papers, encode_sessions, decode_sessions
+
+# Worker threads for each stage of the extraction pipeline, and the size of each stage's input queue
+pipeline_stage_workers = {
+    "fetch": 4,
+    "enrich": 2,
+    "doi": 2
+}
+pipeline_queue_size = 8
+
+# Journal events recorded for each session as it passes through the pipeline, in order
+session_journal_events = ["fetched", "enriched", "finished"]
+
+def new_stats():
+    return {"sessions": 0, "papers": 0, "missing_abstracts": 0, "missing_links": 0}
+
+def count_session(stats, papers):
+    stats["sessions"] += 1
+    stats["papers"] += len(papers)
+    stats["missing_abstracts"] += len([paper for paper in papers if paper.abstract == ""])
+    stats["missing_links"] += len([paper for paper in papers if paper.link == ""])
 
 class ConferenceScraper():
     def __init__(
@@ -17,97 +45,333 @@ class ConferenceScraper():
         scraping_strategy2: AbstractScrapingStrategy2 = None
     ):
         self.conference_name = conference_name
-        self.top_level_soup = BeautifulSoup(get_cached_webpage(top_level_url), 'html.parser')
+        self.top_level_url = top_level_url
         self.sessions = {}
         self.sessions_and_links = []
         self.scraping_strategy1 = scraping_strategy1
         self.scraping_strategy2 = scraping_strategy2
+        self.fetched_top_level_html = None
+        self.parsed_top_level_soup = None
+        self.journal = None
+        self.journaled_sessions = {}
+
+    @property
+    def top_level_html(self):
+        # Fetched on first use, so that constructing a scraper is free
+        if self.fetched_top_level_html is None:
+            self.fetched_top_level_html = get_cached_webpage(self.top_level_url)
+        return self.fetched_top_level_html
+
+    @property
+    def top_level_soup(self):
+        # Parsed on first use, so that memoized extractions never parse the top-level page
+        if self.parsed_top_level_soup is None:
+            strategy = self.scraping_strategy1 if self.scraping_strategy1 is not None else self.scraping_strategy2
+            top_level_html = self.top_level_html
+            with get_run_metrics().parsing("top_level_soup"):
+                self.parsed_top_level_soup = make_soup(
+                    top_level_html,
+                    strategy.top_level_parse_only if strategy is not None else None
+                )
+        return self.parsed_top_level_soup
+
+    def extract(self, output_writer: JsonlWriter = None, resume=False, stream=False):
+        """
+        Extract all sessions. If output_writer is given, each session's papers are written to it as soon as they are finalized.
+        Progress is journaled, and with resume a run of the same strategy that did not finish continues from its journal.
+        With stream, the sessions of a strategy 1 are only written to output_writer rather than kept in self.sessions, and
+        the top-level page is released before they are fetched, so memory does not grow with the size of the conference.
+        """
+        strategy = self.scraping_strategy1 if self.scraping_strategy1 is not None else self.scraping_strategy2
+        if strategy is None:
+            raise ValueError("Scraping strategy 1 or 2 is not set")
+        if stream and output_writer is None:
+            raise ValueError("Streaming needs an output writer")
+        # Metrics belong to a run, so merely constructing or planning a scraper must not reset them
+        if get_active_fetch_plan() is None:
+            reset_run_metrics()
+        records = self.open_journal(strategy, resume)
 
-    def extract(self):
         if self.scraping_strategy1 is not None:
-            self.sessions_and_links = self.scraping_strategy1.extract_session_titles_and_links(
-                self.top_level_soup
-            )
-            for session_title, session_link in self.sessions_and_links:
-                papers = self.scraping_strategy1.link_to_papers(session_link)
-                self.sessions[session_title] = papers
-
-            self.populate_missing_abstracts_and_links()
-            self.print_stats()
-        elif self.scraping_strategy2 is not None:
-            self.sessions = self.scraping_strategy2.extract_sessions(self.top_level_soup)
+            get_parse_cache().clear_stale(self.scraping_strategy1)
+            self.sessions_and_links = []
+            self.replay_journal(records)
+            # The pairs are small, so all are collected first and the top-level page is released before
+            # any session is fetched, leaving only the pages in the pipeline in memory while streaming
+            if len(self.sessions_and_links) == 0:
+                top_level_html = self.top_level_html
+                with get_run_metrics().parsing("extract_session_titles_and_links"):
+                    self.sessions_and_links = memoize_parse(
+                        self.scraping_strategy1,
+                        "extract_session_titles_and_links",
+                        top_level_html,
+                        lambda: list(self.scraping_strategy1.extract_session_titles_and_links(self.top_level_soup))
+                    )
+                self.append_to_journal({"event": "sessions", "sessions_and_links": self.sessions_and_links})
+            self.release_top_level_page()
+            # Enrichment of early sessions overlaps with fetching of later ones. Sessions are enriched
+            # a few at a time, so that each Semantic Scholar request carries as many titles as it can
+            pipeline = Pipeline([
+                PipelineStage("fetch", self.fetch_session, pipeline_stage_workers["fetch"], pipeline_queue_size),
+                PipelineStage("enrich", self.enrich_sessions, pipeline_stage_workers["enrich"], pipeline_queue_size, self.enrichment_batch_fits),
+                PipelineStage("doi", self.populate_session_abstracts_from_doi, pipeline_stage_workers["doi"], pipeline_queue_size),
+            ])
+            if stream:
+                stats = new_stats()
+                def on_result(session):
+                    output_writer.write_session(session.title, session.papers)
+                    count_session(stats, session.papers)
+                pipeline.run(self.sessions_and_links, on_result, keep_results=False)
+                self.print_stats(stats)
+            else:
+                on_result = (lambda session: output_writer.write_session(session.title, session.papers)) if output_writer is not None else None
+                for session in pipeline.run(self.sessions_and_links, on_result):
+                    self.sessions[session.title] = session.papers
+                self.print_stats()
         else:
-            raise ValueError("Scraping strategy 1 or 2 is not set")
+            get_parse_cache().clear_stale(self.scraping_strategy2)
+            extracted = [record for record in records if record["event"] == "extracted"]
+            if len(extracted) > 0:
+                self.sessions = decode_sessions(extracted[-1]["sessions"])
+            else:
+                top_level_html = self.top_level_html
+                with get_run_metrics().parsing("extract_sessions"):
+                    self.sessions = memoize_parse(
+                        self.scraping_strategy2,
+                        "extract_sessions",
+                        top_level_html,
+                        lambda: self.scraping_strategy2.extract_sessions(self.top_level_soup),
+                        encode=encode_sessions,
+                        decode=decode_sessions
+                    )
+                self.append_to_journal({"event": "extracted", "sessions": encode_sessions(self.sessions)})
+                self.release_top_level_page()
+            if output_writer is not None:
+                for session_title, papers in self.sessions.items():
+                    output_writer.write_session(session_title, papers)
+
+        # Kept after the run, so that a save stopped by a diff can be resumed with --merge
+        if self.journal is not None:
+            self.journal.close()
+
+    def release_top_level_page(self):
+        """Free the top-level page once the sessions have been found on it, which is the largest page of a conference."""
+        if self.parsed_top_level_soup is not None:
+            # Soups are full of reference cycles, so they are only freed promptly when taken apart
+            self.parsed_top_level_soup.decompose()
+        self.parsed_top_level_soup = None
+        self.fetched_top_level_html = None
+
+    def open_journal(self, strategy, resume):
+        """Start the journal for this run, returning the records to resume from. Plans are not journaled."""
+        self.journaled_sessions = {}
+        if get_active_fetch_plan() is not None:
+            self.journal = None
+            return []
+
+        self.journal = RunJournal(self.conference_name)
+        run = {"top_level_url": self.top_level_url, "strategy": type(strategy).__name__, "version": strategy.version}
+        if not resume:
+            self.journal.start(run)
+            return []
+        records = self.journal.resume(run)
+        if len(records) > 0:
+            print(f"Resuming {self.conference_name} from {len(records)} journal records")
+        return records
+
+    def replay_journal(self, records):
+        for record in records:
+            if record["event"] == "sessions":
+                self.sessions_and_links = [tuple(session_title_and_link) for session_title_and_link in record["sessions_and_links"]]
+            elif record["event"] in session_journal_events:
+                # Only the latest event of a session matters, as it carries the papers so far
+                self.journaled_sessions[record["session"]] = (record["event"], decode_papers(record["papers"]))
+
+    def append_to_journal(self, record):
+        if self.journal is not None:
+            self.journal.append(record)
+
+    def journaled_session_done(self, session_title, event):
+        """Whether the journal shows the session already got through the stage that records event."""
+        if session_title not in self.journaled_sessions:
+            return False
+        journaled_event, _ = self.journaled_sessions[session_title]
+        return session_journal_events.index(journaled_event) >= session_journal_events.index(event)
+
+    def plan(self):
+        """
+        Work out the fetches that extract() would make without making any, by running it against
+        the cache with uncached pages treated as empty. Returns a FetchPlan.
+        """
+        fetch_plan = FetchPlan()
+        with planning(fetch_plan):
+            if self.top_level_html is None:
+                fetch_plan.note(f"{self.top_level_url} is not cached, so its sessions and papers are unknown")
+                return fetch_plan
+            self.extract()
+
+        if self.scraping_strategy1 is not None:
+            missed_urls = fetch_plan.missed_urls()
+            uncached_sessions = len([session_link for _, session_link in self.sessions_and_links if session_link in missed_urls])
+            cached_sessions = len(self.sessions) - uncached_sessions
+            if uncached_sessions > 0 and cached_sessions > 0:
+                # Guess that uncached sessions are as large as the cached ones
+                papers_per_session = sum([len(papers) for papers in self.sessions.values()]) / cached_sessions
+                expected_papers = math.ceil(papers_per_session * uncached_sessions)
+                fetch_plan.add_possible(
+                    semantic_scholar_bulk_search_url,
+                    math.ceil(expected_papers / semantic_scholar_bulk_search_titles_per_query),
+                    "semantic_scholar"
+                )
+                fetch_plan.note(f"{uncached_sessions} session pages are not cached, with about {expected_papers} papers to enrich")
+            elif uncached_sessions > 0:
+                fetch_plan.note(f"None of the {uncached_sessions} session pages are cached, so the papers are unknown")
+
+        if fetch_plan.hosts.get("api.semanticscholar.org", {"misses": 0})["misses"] > 0:
+            # Semantic Scholar may yet supply the abstracts that the ACM DL pages would be fetched for
+            fetch_plan.make_possible("dl.acm.org")
+
+        # The plan's run must not be mistaken for a real one
+        self.sessions = {}
+        self.fetched_top_level_html = None
+        self.parsed_top_level_soup = None
+        return fetch_plan
+
+    def fetch_session(self, session_title_and_link):
+        session_title, session_link = session_title_and_link
+        if session_title in self.journaled_sessions:
+            return Session(session_title, self.journaled_sessions[session_title][1])
+
+        session_html = get_cached_webpage(session_link)
+        if session_html is None:
+            # Not cached while planning, so the session's papers are unknown
+            return Session(session_title, [])
+        with get_run_metrics().parsing("link_to_papers"):
+            papers = memoize_parse(
+                self.scraping_strategy1,
+                "link_to_papers",
+                session_html,
+                lambda: list(self.scraping_strategy1.link_to_papers(session_link)),
+                argument=session_link,
+                encode=encode_papers,
+                decode=decode_papers
+            )
+        self.append_to_journal({"event": "fetched", "session": session_title, "papers": encode_papers(papers)})
+        return Session(session_title, papers)
+
+    def papers_to_enrich(self, sessions):
+        return [
+            paper
+            for session in sessions if not self.journaled_session_done(session.title, "enriched")
+            for paper in session.papers if paper.abstract == ""
+        ]
+
+    def enrichment_batch_fits(self, sessions):
+        """Whether the sessions' papers fit in one bulk search for those without a DOI and one batch request for the others."""
+        papers = self.papers_to_enrich(sessions)
+        with_doi = len([paper for paper in papers if get_doi_from_link(paper.link) != ""])
+        return with_doi <= semantic_scholar_batch_size and len(papers) - with_doi <= semantic_scholar_bulk_search_titles_per_query
+
+    def enrich_sessions(self, sessions):
+        self.try_populate_abstracts_and_links_from_semantic_scholar(self.papers_to_enrich(sessions))
+        for session in sessions:
+            if not self.journaled_session_done(session.title, "enriched"):
+                self.append_to_journal({"event": "enriched", "session": session.title, "papers": encode_papers(session.papers)})
+        return sessions
+
+    def populate_session_abstracts_from_doi(self, session: Session):
+        if self.journaled_session_done(session.title, "finished"):
+            return session
+        for paper in session.papers:
+            self.try_populate_missing_abstracts_from_doi(paper)
+        self.append_to_journal({"event": "finished", "session": session.title, "papers": encode_papers(session.papers)})
+        return session
 
     def populate_missing_abstracts_and_links(self):
-        for _, papers in self.sessions.items():
-            for paper in papers:
-                self.try_populate_abstract_and_link_from_semantic_scholar(paper)
-                self.try_populate_missing_abstracts_from_doi(paper)
-
-    def try_populate_abstract_and_link_from_semantic_scholar(self, paper):
-        if paper["abstract"] == "":
-            abstract, link = get_info_from_semantic_scholar(paper["title"])
-            if abstract != "":
-                paper["abstract"] = abstract
-            if paper["link"] == "" and link != "":
-                paper["link"] = link
+        papers = [paper for _, session_papers in self.sessions.items() for paper in session_papers]
+        self.try_populate_abstracts_and_links_from_semantic_scholar(papers)
+        for paper in papers:
+            self.try_populate_missing_abstracts_from_doi(paper)
+
+    def try_populate_abstracts_and_links_from_semantic_scholar(self, papers):
+        papers = [paper for paper in papers if paper.abstract == ""]
+        infos = get_infos_from_semantic_scholar(
+            [paper.title for paper in papers],
+            dois={paper.title: get_doi_from_link(paper.link) for paper in papers}
+        )
+        for paper in papers:
+            info = infos[paper.title]
+            if info["abstract"] != "":
+                paper.abstract = info["abstract"]
+            if paper.link == "" and info["link"] != "":
+                paper.link = info["link"]
 
     def try_populate_missing_abstracts_from_doi(self, paper):
-        if paper["abstract"] == "":
-            if paper["link"] != "" and "doi.org" in paper["link"]:
+        if paper.abstract == "":
+            if paper.link != "" and "doi.org" in paper.link:
                 # If link in this format
                 # https://doi.org/10.1145/3676641.3716268
                 # Convert to this format
                 # https://dl.acm.org/doi/10.1145/3676641.3716268
-                if "doi.org" in paper["link"]:
-                    dl_link = paper["link"].replace("doi.org", "dl.acm.org/doi")
-                elif "dl.acm.org" in paper["link"]:
-                    dl_link = paper["link"]
+                if "doi.org" in paper.link:
+                    dl_link = paper.link.replace("doi.org", "dl.acm.org/doi")
+                elif "dl.acm.org" in paper.link:
+                    dl_link = paper.link
                 else:
-                    print(f"No doi found in link: {paper['link']}")
+                    print(f"No doi found in link: {paper.link}")
                     return
 
-                soup = BeautifulSoup(get_cached_webpage_via_selenium(dl_link), 'html.parser')
+                dl_html = get_cached_webpage_via_selenium(dl_link)
+                if dl_html is None:
+                    return
+                with get_run_metrics().parsing("acm_abstract"):
+                    soup = make_soup(dl_html, SoupStrainer('section', id='abstract'))
 
-                abstract = soup.find('section', id='abstract')
-                abstract_paragraphs = abstract.find_all('div', role='paragraph')
-                abstract_text = "\n".join([paragraph.text.strip() for paragraph in abstract_paragraphs])
-                paper["abstract"] = abstract_text
+                    abstract = soup.find('section', id='abstract')
+                    if abstract is None:
+                        # Some DL pages, such as front matter, have no abstract
+                        return
+                    abstract_paragraphs = abstract.find_all('div', role='paragraph')
+                    abstract_text = "\n".join([paragraph.text.strip() for paragraph in abstract_paragraphs])
+                paper.abstract = abstract_text
     
-    def print_stats(self):
-        total_papers = 0
-        for _, papers in self.sessions.items():
-            total_papers += len(papers)
-        total_sessions = len(self.sessions)
-        missing_abstracts = 0
-        missing_links = 0
-        for _, papers in self.sessions.items():
-            for paper in papers:
-                if paper["abstract"] == "":
-                    missing_abstracts += 1
-                if paper["link"] == "":
-                    missing_links += 1
+    def print_stats(self, stats=None):
+        if stats is None:
+            stats = new_stats()
+            for papers in self.sessions.values():
+                count_session(stats, papers)
 
         print(f"Conference: {self.conference_name} -----------------------------------------")
-        print(f"Sessions: {total_sessions}")
-        print(f"Papers: {total_papers}")
-        print(f"Missing abstracts: {missing_abstracts}")
-        print(f"Missing links: {missing_links}")
+        print(f"Sessions: {stats['sessions']}")
+        print(f"Papers: {stats['papers']}")
+        print(f"Missing abstracts: {stats['missing_abstracts']}")
+        print(f"Missing links: {stats['missing_links']}")
     
-    def save_sessions(self, force_overwrite):
-        self.save_to_json(force_overwrite)
+    def save_sessions(self, force_overwrite, merge=False):
+        self.save_to_json(force_overwrite, merge)
         self.save_to_notion()
+        get_run_metrics().save(self.conference_name)
 
-    def save_to_json(self, force_overwrite=False):
-        """Save the scraped data to a JSON file"""
+    def save_to_jsonl(self):
+        """Save the scraped data as one JSON record per paper"""
+        with JsonlWriter(self.conference_name) as writer:
+            for session_title, papers in self.sessions.items():
+                writer.write_session(session_title, papers)
+
+    def save_to_json(self, force_overwrite=False, merge=False):
+        """
+        Save the scraped data to a JSON file. If a file with different data already exists, the differences
+        are printed and ValueError is raised, unless merge is set, in which case old non-empty abstracts
+        are kept, new links are accepted and the merged sessions are saved.
+        """
         filename = f"{self.conference_name}.json"
 
         if not os.path.exists("json_format"):
             os.makedirs("json_format")
 
         # Create JSON content in memory
-        json_content = json.dumps(self.sessions, indent=2, ensure_ascii=False)
+        sessions = encode_sessions(self.sessions)
+        json_content = json.dumps(sessions, indent=2, ensure_ascii=False)
 
         # Read the existing JSON file if it exists
         output_file_exists = os.path.exists(f"json_format/{filename}")
@@ -118,9 +382,16 @@ class ConferenceScraper():
         
         if output_file_exists and not force_overwrite:
             if existing_content != json_content:
-                # Print the diff
-                pretty_print_diff(existing_content, json_content)
-                exit()
+                existing_sessions = json.loads(existing_content)
+                changes = structural_diff(existing_sessions, sessions)
+                # Files that only differ in formatting are simply rewritten
+                if len(changes) > 0:
+                    print_structural_diff(changes)
+                    if not merge:
+                        raise ValueError(f"json_format/{filename} differs from the scraped data, rerun with merge or force_overwrite")
+                    sessions = merge_sessions(existing_sessions, sessions)
+                    self.sessions = decode_sessions(sessions)
+                    json_content = json.dumps(sessions, indent=2, ensure_ascii=False)
         
         # Write the content to file
         with open(f"json_format/{filename}", 'w', encoding='utf-8') as f:
@@ -139,20 +410,28 @@ class ConferenceScraper():
             for session_title, papers in self.sessions.items():
                 f.write(f" - {session_title}\n")
                 for paper in papers:
-                    temp_paper = deepcopy(paper)
-                    f.write(f"   - {paper['title']}\n")
-                    temp_paper.pop("title")
-                    for key, value in temp_paper.items():
-                        f.write(f"     - {value}\n")
+                    f.write(f"   - {paper.title}\n")
+                    for key, value in paper.items():
+                        if key == "authors" and isinstance(value, list):
+                            for author in value:
+                                f.write(f"     - {author['name']} ({author['institution']})\n")
+                        elif key != "title":
+                            f.write(f"     - {value}\n")
         
         print(f"Data saved to notion_format/{filename}")
 
 if __name__ == "__main__":
+    import sys
+
     scraper = ConferenceScraper(
         "osdi_atc25",
         "https://www.usenix.org/conference/osdi25/technical-sessions",
         scraping_strategy2=OsdiAtcNsdiConferenceScraper("osdi_atc25")
     )
-    scraper.extract()
+    if "--plan" in sys.argv:
+        scraper.plan().print_report(scraper.conference_name)
+        exit(0)
+
+    scraper.extract(resume="--resume" in sys.argv)
     scraper.print_stats()
     scraper.save_sessions(force_overwrite=False)
\ No newline at end of file
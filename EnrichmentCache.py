@@ -0,0 +1,166 @@
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+from utils import normalize_title
+from CacheStore import database_path
+
+# Titles Semantic Scholar found nothing for are stored as misses, and looked up again once the miss is this old
+miss_retry_age = 7 * 24 * 60 * 60
+
+def is_miss(info):
+	return all([info[field] == "" for field in ["abstract", "link", "doi", "open_access_pdf"]])
+
+class EnrichmentCache:
+	"""
+	Parsed Semantic Scholar results (abstract, link and ids) keyed by normalized title, so that a
+	paper is looked up once however its title is written and whichever conference it appears in.
+	"""
+	def __init__(self, cache_dir=".cache"):
+		self.lock = threading.Lock()
+
+		self.connection = sqlite3.connect(
+			database_path(cache_dir, "enrichment.sqlite3"),
+			timeout=60,
+			check_same_thread=False
+		)
+		self.connection.execute("PRAGMA journal_mode=WAL")
+		self.connection.execute("""
+			CREATE TABLE IF NOT EXISTS enrichment (
+				normalized_title TEXT PRIMARY KEY,
+				title TEXT,
+				abstract TEXT,
+				link TEXT,
+				doi TEXT,
+				open_access_pdf TEXT,
+				source TEXT,
+				updated_at REAL
+			)
+		""")
+		self.connection.commit()
+
+	def get_many(self, titles):
+		"""Return a dict from each title that has a stored result to that result. Misses older than miss_retry_age are left out."""
+		infos = {}
+		with self.lock:
+			for title in titles:
+				row = self.connection.execute(
+					"SELECT abstract, link, doi, open_access_pdf, updated_at FROM enrichment WHERE normalized_title = ?",
+					(normalize_title(title),)
+				).fetchone()
+				if row is None:
+					continue
+				info = {"abstract": row[0], "link": row[1], "doi": row[2], "open_access_pdf": row[3]}
+				if is_miss(info) and time.time() - (row[4] or 0) > miss_retry_age:
+					continue
+				infos[title] = info
+		return infos
+
+	def get(self, title):
+		return self.get_many([title]).get(title)
+
+	def put_many(self, infos, source):
+		"""
+		Store a dict from title to result. A result with an abstract never gets replaced by one
+		without, so the most useful lookup for a title wins. A result with nothing at all is stored
+		as a miss, which get_many only returns until it is miss_retry_age old.
+		"""
+		with self.lock:
+			for title, info in infos.items():
+				normalized_title = normalize_title(title)
+				if normalized_title == "":
+					continue
+
+				row = self.connection.execute(
+					"SELECT abstract FROM enrichment WHERE normalized_title = ?", (normalized_title,)
+				).fetchone()
+				if row is not None and row[0] != "" and info["abstract"] == "":
+					continue
+
+				self.connection.execute(
+					"INSERT OR REPLACE INTO enrichment (normalized_title, title, abstract, link, doi, open_access_pdf, source, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+					(normalized_title, title, info["abstract"], info["link"], info["doi"], info["open_access_pdf"], source, time.time())
+				)
+			self.connection.commit()
+
+	def put(self, title, info, source):
+		self.put_many({title: info}, source)
+
+	def count(self):
+		with self.lock:
+			return self.connection.execute("SELECT COUNT(*) FROM enrichment").fetchone()[0]
+
+enrichment_caches = {}
+enrichment_caches_lock = threading.Lock()
+
+def get_enrichment_cache(cache_dir=".cache"):
+	with enrichment_caches_lock:
+		if cache_dir not in enrichment_caches:
+			enrichment_caches[cache_dir] = EnrichmentCache(cache_dir)
+		return enrichment_caches[cache_dir]
+
+def titles_in_outputs(output_dirs=("json_format", "jsonl_format")):
+	"""Yield every paper title found in existing JSON and JSONL outputs."""
+	for output_dir in output_dirs:
+		for path in sorted(glob.glob(os.path.join(output_dir, "*.json"))):
+			with open(path, 'r', encoding='utf-8') as f:
+				data = json.load(f)
+			# ConferenceScraper saves sessions, PaperManager saves a flat list of papers
+			papers = [paper for papers in data.values() for paper in papers] if isinstance(data, dict) else data
+			for paper in papers:
+				yield paper["title"]
+		for path in sorted(glob.glob(os.path.join(output_dir, "*.jsonl"))):
+			with open(path, 'r', encoding='utf-8') as f:
+				for line in f:
+					if line.strip() != "":
+						yield json.loads(line)["title"]
+
+def index_existing_cache(cache_dir=".cache"):
+	"""
+	One-shot migration filling the enrichment cache from raw responses already in the webpage cache.
+	Single-title searches are found through the titles in existing outputs, since the cached response
+	does not record which title was searched for. Bulk search and batch responses carry their titles.
+	"""
+	# Imported here because retrieve_paper_info itself uses the enrichment cache
+	from retrieve_paper_info import get_cached_info_from_semantic_scholar, parse_semantic_scholar_paper, semantic_scholar_bulk_search_url, semantic_scholar_batch_url
+	from CacheStore import get_cache_store
+
+	enrichment_cache = get_enrichment_cache(cache_dir)
+	before = enrichment_cache.count()
+
+	searched = {}
+	for title in dict.fromkeys(titles_in_outputs()):
+		info = get_cached_info_from_semantic_scholar(title)
+		if info is not None:
+			searched[title] = info
+	enrichment_cache.put_many(searched, "search")
+
+	store = get_cache_store(cache_dir)
+	with store.lock:
+		rows = store.connection.execute(
+			"SELECT key, encoding, url FROM entries WHERE url IN (?, ?)",
+			(semantic_scholar_bulk_search_url, semantic_scholar_batch_url)
+		).fetchall()
+	for key, encoding, url in rows:
+		response = json.loads(store.read(key, encoding))
+		papers = (response.get("data") or []) if isinstance(response, dict) else response
+		enrichment_cache.put_many(
+			{paper["title"]: parse_semantic_scholar_paper(paper) for paper in papers if paper is not None and paper.get("title")},
+			"bulk" if url == semantic_scholar_bulk_search_url else "batch"
+		)
+
+	return enrichment_cache.count() - before
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Maintain the normalized-title enrichment cache")
+	parser.add_argument("command", choices=["migrate", "count"])
+	parser.add_argument("--cache-dir", default=".cache")
+	args = parser.parse_args()
+
+	if args.command == "migrate":
+		print(f"Indexed {index_existing_cache(args.cache_dir)} titles from the existing cache")
+	elif args.command == "count":
+		print(f"{get_enrichment_cache(args.cache_dir).count()} titles in the enrichment cache")
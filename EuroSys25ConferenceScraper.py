@@ -1,9 +1,13 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from html_parsing import make_soup
 from retrieve_webpage import get_cached_webpage
 from ScrapingStrategies import AbstractScrapingStrategy1
-from typing import List, Dict, Tuple
+from typing import List, Tuple
 from ConferenceScraper import ConferenceScraper
+from Paper import Paper
 class EuroSys25ConferenceScraper(AbstractScrapingStrategy1):
+	top_level_parse_only = SoupStrainer('div', class_=lambda x: x and 'pretalx-tab-content' in x)
+
 	def __init__(self):
 		self.ignore_sessions = [
 			"Martin",
@@ -41,8 +45,8 @@ class EuroSys25ConferenceScraper(AbstractScrapingStrategy1):
 
 		return sessions_and_links
 	
-	def link_to_papers(self, session_link: str) -> List[Dict[str, str]]:
-		soup = BeautifulSoup(get_cached_webpage(session_link), 'html.parser')
+	def link_to_papers(self, session_link: str) -> List[Paper]:
+		soup = make_soup(get_cached_webpage(session_link), SoupStrainer('section', class_='description'))
 
 		papers = []
 		description_section = soup.find('section', class_='description')
@@ -56,12 +60,12 @@ class EuroSys25ConferenceScraper(AbstractScrapingStrategy1):
 			authors = paragraph_text.replace(paper_title, "").replace("Paper", "").strip()
 			link = paragraph.find('a')['href']
 
-			papers.append({
-				"title": paper_title,
-				"authors": authors,
-				"abstract": "",
-				"link": link
-			})
+			papers.append(Paper(
+				title=paper_title,
+				authors=authors,
+				abstract="",
+				link=link
+			))
 
 		return papers
 
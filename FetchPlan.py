@@ -0,0 +1,136 @@
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# Rough costs used for the estimate, on top of the politeness sleeps between fetches to a host
+estimated_download_seconds = 2
+estimated_browser_seconds = 15
+
+class FetchPlan:
+	"""
+	The fetches a run would make, worked out from cached pages only. Misses are fetches that will
+	certainly be made. Possible fetches depend on responses that are not cached yet, such as the
+	papers on an uncached session page or the single-title searches behind a bulk search miss.
+	"""
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.hosts = {}
+		self.notes = []
+
+	def host(self, host, target_url):
+		if host not in self.hosts:
+			self.hosts[host] = {"target_url": target_url, "hits": 0, "misses": 0, "possible": 0, "browser": False, "missed_urls": []}
+		return self.hosts[host]
+
+	def add(self, url, cached, target_url="other", browser=False):
+		with self.lock:
+			stats = self.host(urlparse(url).netloc, target_url)
+			stats["browser"] = stats["browser"] or browser
+			if cached:
+				stats["hits"] += 1
+			else:
+				stats["misses"] += 1
+				stats["missed_urls"].append(url)
+
+	def add_possible(self, url, count, target_url="other", browser=False):
+		with self.lock:
+			stats = self.host(urlparse(url).netloc, target_url)
+			stats["browser"] = stats["browser"] or browser
+			stats["possible"] += count
+
+	def make_possible(self, host):
+		"""Count a host's misses as only possible, e.g. when whether they happen depends on another host's misses."""
+		with self.lock:
+			if host in self.hosts:
+				stats = self.hosts[host]
+				stats["possible"] += stats["misses"]
+				stats["misses"] = 0
+				stats["missed_urls"] = []
+
+	def note(self, note):
+		with self.lock:
+			self.notes.append(note)
+
+	def missed_urls(self):
+		with self.lock:
+			return set([url for stats in self.hosts.values() for url in stats["missed_urls"]])
+
+	def misses(self):
+		with self.lock:
+			return sum([stats["misses"] for stats in self.hosts.values()])
+
+	def merge(self, other):
+		for host, other_stats in other.hosts.items():
+			stats = self.host(host, other_stats["target_url"])
+			for name in ["hits", "misses", "possible"]:
+				stats[name] += other_stats[name]
+			stats["browser"] = stats["browser"] or other_stats["browser"]
+			stats["missed_urls"].extend(other_stats["missed_urls"])
+		self.notes.extend(other.notes)
+
+	def estimate_host_seconds(self, host, include_possible=False):
+		"""
+		Fetches to a host start one politeness sleep apart, whatever the download takes, so the host is
+		busy for the sleeps between its fetches plus the last download, or for all downloads if longer.
+		"""
+		# Imported here because retrieve_webpage itself uses the active plan
+		from retrieve_webpage import get_fetch_interval
+
+		stats = self.hosts[host]
+		fetches = stats["misses"] + (stats["possible"] if include_possible else 0)
+		if fetches == 0:
+			return 0
+		download_seconds = estimated_browser_seconds if stats["browser"] else estimated_download_seconds
+		return max((fetches - 1) * get_fetch_interval(host, stats["target_url"]) + download_seconds, fetches * download_seconds)
+
+	def estimate_seconds(self, include_possible=False):
+		"""Hosts are fetched from concurrently, so the slowest host sets the wall time."""
+		return max([self.estimate_host_seconds(host, include_possible) for host in self.hosts] or [0])
+
+	def report(self):
+		return {
+			"hosts": {
+				host: {
+					"hits": stats["hits"],
+					"misses": stats["misses"],
+					"possible": stats["possible"],
+					"estimated_seconds": self.estimate_host_seconds(host),
+					"estimated_seconds_with_possible": self.estimate_host_seconds(host, True),
+				}
+				for host, stats in sorted(self.hosts.items())
+			},
+			"estimated_seconds": self.estimate_seconds(),
+			"estimated_seconds_with_possible": self.estimate_seconds(True),
+			"notes": list(self.notes),
+		}
+
+	def print_report(self, name):
+		print(f"Plan: {name} -----------------------------------------")
+		for host, stats in sorted(self.hosts.items()):
+			print(f"{host:<32} {stats['hits']:>6} cached {stats['misses']:>6} to fetch {stats['possible']:>6} possible  ~{format_duration(self.estimate_host_seconds(host))}")
+		print(f"Estimated wall time: {format_duration(self.estimate_seconds())}, up to {format_duration(self.estimate_seconds(True))} with possible fetches")
+		for note in self.notes:
+			print(f"  {note}")
+
+def format_duration(seconds):
+	if seconds < 60:
+		return f"{seconds:.0f}s"
+	if seconds < 3600:
+		return f"{seconds / 60:.0f}m"
+	return f"{int(seconds // 3600)}h{int(seconds % 3600 // 60):02d}m"
+
+# While a plan is active, fetches are recorded in it and cache misses return None instead of being downloaded
+active_fetch_plan = None
+
+def get_active_fetch_plan():
+	return active_fetch_plan
+
+@contextmanager
+def planning(plan):
+	global active_fetch_plan
+	assert active_fetch_plan is None, "Plans cannot be nested"
+	active_fetch_plan = plan
+	try:
+		yield plan
+	finally:
+		active_fetch_plan = None
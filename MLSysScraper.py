@@ -1,11 +1,15 @@
 from utils import flat_map
 from retrieve_webpage import get_cached_webpage
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from html_parsing import make_soup
 from ScrapingStrategies import AbstractScrapingStrategy1
-from typing import List, Tuple, Dict
+from typing import Iterator, List, Tuple
 from ConferenceScraper import ConferenceScraper
+from Paper import Paper
 
 class MLSysScraper(AbstractScrapingStrategy1):
+	top_level_parse_only = SoupStrainer('div', class_='timebox')
+
 	def __init__(self, conference_name: str):
 		self.ignore_session_titles = [
 			"Poster",
@@ -14,11 +18,10 @@ class MLSysScraper(AbstractScrapingStrategy1):
 		]
 		self.conference_name = conference_name
 
-	def extract_session_titles_and_links(self, top_level_soup: BeautifulSoup) -> List[Tuple[str, str]]:
+	def extract_session_titles_and_links(self, top_level_soup: BeautifulSoup) -> Iterator[Tuple[str, str]]:
 		timebox_divs = top_level_soup.find_all('div', class_='timebox')
 		session_title_divs = flat_map(lambda timebox_div: timebox_div.find_all('div', class_='sessiontitle'), timebox_divs)
 
-		sessions_and_links = []
 		for session_title_div in session_title_divs:
 			session_title = session_title_div.text.strip()
 			session_title = session_title.split("\n")[0]
@@ -37,15 +40,12 @@ class MLSysScraper(AbstractScrapingStrategy1):
 			else:
 				raise ValueError(f"Unknown conference: {self.conference_name}")
 
-			sessions_and_links.append((session_title, session_link))
-
-		return sessions_and_links
+			yield session_title, session_link
 
-	def link_to_papers(self, session_link: str) -> List[Dict[str, str]]:
-		session_soup = BeautifulSoup(get_cached_webpage(session_link), 'html.parser')
+	def link_to_papers(self, session_link: str) -> Iterator[Paper]:
+		session_soup = make_soup(get_cached_webpage(session_link), SoupStrainer('div', class_='track-schedule-card'))
 
 		paper_divs = session_soup.find_all('div', class_='track-schedule-card')
-		papers = []
 		for paper_div in paper_divs:
 			paper_title = paper_div.find('a').text.strip()
 
@@ -53,14 +53,15 @@ class MLSysScraper(AbstractScrapingStrategy1):
 			authors = paper_div.find('p', class_='text-muted').text.strip()
 			abstract = paper_div.find('div', class_='abstract').text.strip()
 
-			papers.append({
-				"title": paper_title,
-				"authors": authors,
-				"abstract": abstract,
-				"link": paper_link,
-			})
+			yield Paper(
+				title=paper_title,
+				authors=authors,
+				abstract=abstract,
+				link=paper_link,
+			)
 
-		return papers
+		# Soups are full of reference cycles, so they are only freed promptly when taken apart
+		session_soup.decompose()
 
 
 if __name__ == "__main__":
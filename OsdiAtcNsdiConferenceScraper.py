@@ -1,12 +1,18 @@
-from bs4 import BeautifulSoup
-from typing import List, Tuple
+from bs4 import BeautifulSoup, SoupStrainer
+from typing import List, Dict
 from ScrapingStrategies import AbstractScrapingStrategy2
+from author_parsing import parse_authors
+from Paper import Paper
 
 class OsdiAtcNsdiConferenceScraper(AbstractScrapingStrategy2):
+    # Version 2 parses authors into {name, institution} records, so parses memoized by version 1 are stale
+    version = 2
+    top_level_parse_only = SoupStrainer('article', class_=lambda c: c and 'node-session' in c)
+
     def __init__(self, conference_name: str):
         self.conference_name = conference_name
 
-    def extract_sessions(self, top_level_soup: BeautifulSoup) -> List[Tuple[str, str]]:
+    def extract_sessions(self, top_level_soup: BeautifulSoup) -> Dict[str, List[Paper]]:
         session_divs = top_level_soup.find_all('article', class_=lambda c: c and 'node-session' in c)
         return self.parse_sessions(session_divs, self.conference_name)
 
@@ -35,7 +41,7 @@ class OsdiAtcNsdiConferenceScraper(AbstractScrapingStrategy2):
 
         authors_div = paper_div.find('div', class_='field-name-field-paper-people-text')
         authors = authors_div.find('p').get_text(strip=True) if authors_div else ""
-        # authors = parse_authors_osdi_nsdi_atc(authors)
+        authors = self.parse_authors_osdi_nsdi_atc(authors)
 
         abstract_div = paper_div.find('div', class_='field-name-field-paper-description-long')
 
@@ -49,42 +55,15 @@ class OsdiAtcNsdiConferenceScraper(AbstractScrapingStrategy2):
             else:
                 abstract = ""
     
-        return {
-            "title": paper_title,
-            "authors": authors,
-            "abstract": abstract,
-            "link": paper_link
-        }
-
-    def parse_authors_intitution_pair(author_institution_pair):
-        authors_processed = []
-
-        institution = author_institution_pair.split(",")[-1]
-        authors = author_institution_pair.split(",")[:-1]
-        for author in authors:
-            author = author.strip()
-            institution = institution.strip()
-
-            if author.startswith("and"):
-                author = author[4:].strip()
-
-            authors_processed.append({
-                "name": author,
-                "institution": institution
-            })
-
-        return authors_processed
-
-    def parse_authors_osdi_nsdi_atc(authors):
-        if authors == "":
-            return []
-
-        authors_processed = []
-        if ";" in authors:
-            author_institutions = authors.split(";")
-            for author_institution_pair in author_institutions:
-                authors_processed.extend(parse_authors_intitution_pair(author_institution_pair))
-        else:
-            authors_processed.extend(parse_authors_intitution_pair(authors))
-    
-        return authors_processed
\ No newline at end of file
+        return Paper(
+            title=paper_title,
+            authors=authors,
+            abstract=abstract,
+            link=paper_link
+        )
+
+    def parse_authors_intitution_pair(self, author_institution_pair):
+        return parse_authors(author_institution_pair, "usenix")
+
+    def parse_authors_osdi_nsdi_atc(self, authors):
+        return parse_authors(authors, "usenix")
@@ -0,0 +1,99 @@
+import sys
+from author_parsing import intern_text
+
+class Paper:
+	"""
+	A scraped paper. Slots keep the tens of thousands of papers of a large conference much smaller
+	than dicts, and fields outside the usual four are kept in extra so that nothing read from an
+	output is lost on the way back out. Item access works as for the dicts papers used to be, for
+	code that still indexes them by field name.
+	"""
+	__slots__ = ("title", "authors", "abstract", "link", "extra")
+
+	fields = ("title", "authors", "abstract", "link")
+
+	def __init__(self, title, authors="", abstract="", link="", extra=None):
+		self.title = title
+		# Parsed author lists repeat the same names and institutions across papers and conferences
+		if isinstance(authors, list):
+			authors = [{"name": intern_text(author["name"]), "institution": intern_text(author.get("institution") or "")} for author in authors]
+		self.authors = authors
+		self.abstract = abstract
+		self.link = link
+		self.extra = extra
+
+	@classmethod
+	def from_json(cls, record):
+		"""A paper from its record in the JSON outputs, or the paper itself if it already is one."""
+		if isinstance(record, Paper):
+			return record
+		extra = {key: value for key, value in record.items() if key not in cls.fields}
+		return cls(record["title"], record.get("authors", ""), record.get("abstract", ""), record.get("link", ""), extra or None)
+
+	def to_json(self):
+		"""The paper's record in the JSON outputs, with the fields in their usual order."""
+		record = {"title": self.title, "authors": self.authors, "abstract": self.abstract, "link": self.link}
+		if self.extra is not None:
+			record.update(self.extra)
+		return record
+
+	def items(self):
+		return self.to_json().items()
+
+	def keys(self):
+		return self.to_json().keys()
+
+	def get(self, key, default=None):
+		if key in Paper.fields:
+			return getattr(self, key)
+		return self.extra.get(key, default) if self.extra is not None else default
+
+	def __getitem__(self, key):
+		if key in Paper.fields:
+			return getattr(self, key)
+		if self.extra is None or key not in self.extra:
+			raise KeyError(key)
+		return self.extra[key]
+
+	def __setitem__(self, key, value):
+		if key in Paper.fields:
+			setattr(self, key, value)
+		else:
+			if self.extra is None:
+				self.extra = {}
+			self.extra[key] = value
+
+	def __contains__(self, key):
+		return key in Paper.fields or (self.extra is not None and key in self.extra)
+
+	def __eq__(self, other):
+		if not isinstance(other, Paper):
+			return NotImplemented
+		return self.to_json() == other.to_json()
+
+	def __repr__(self):
+		return f"Paper({self.title!r})"
+
+class Session:
+	"""A session title and its papers, as passed between the stages of the extraction pipeline."""
+	__slots__ = ("title", "papers")
+
+	def __init__(self, title, papers):
+		self.title = sys.intern(title)
+		self.papers = papers
+
+	def __repr__(self):
+		return f"Session({self.title!r}, {len(self.papers)} papers)"
+
+def encode_papers(papers):
+	return [paper.to_json() for paper in papers]
+
+def decode_papers(records):
+	return [Paper.from_json(record) for record in records]
+
+def encode_sessions(sessions):
+	"""{session title: [Paper]} to the layout of the JSON outputs."""
+	return {session_title: encode_papers(papers) for session_title, papers in sessions.items()}
+
+def decode_sessions(data):
+	return {sys.intern(session_title): decode_papers(records) for session_title, records in data.items()}
@@ -1,59 +1,107 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from html_parsing import make_soup
 from retrieve_webpage import get_cached_webpage_via_selenium
-from retrieve_paper_info import get_info_from_semantic_scholar
+from retrieve_paper_info import get_infos_from_semantic_scholar, get_doi_from_link
+import hashlib
 import json
 import os
-from copy import deepcopy
-from utils import pretty_print_diff
+from utils import structural_diff, print_structural_diff, merge_sessions
+from saving import JsonlWriter
+from RunMetrics import get_run_metrics, reset_run_metrics
+from RunJournal import RunJournal
+from Paper import Paper, encode_papers, decode_papers
 
 class PaperManager:
 	def __init__(self, papers, conference_name: str):
 		self.conference_name = conference_name
-		self.papers = papers
+		# Papers may be given as Paper records or as their dicts in the JSON outputs
+		self.papers = decode_papers(papers)
 
-	def populate_missing_abstracts_and_links(self):
-		for paper in self.papers:
-			self.try_populate_abstract_and_link_from_semantic_scholar(paper)
-			self.try_populate_missing_abstracts_from_doi(paper)
+	def populate_missing_abstracts_and_links(self, output_writer: JsonlWriter = None, resume=False):
+		"""
+		Populate missing fields. If output_writer is given, each paper is written to it as soon as it is finalized.
+		Progress is journaled, and with resume a run over the same papers that did not finish continues from its journal.
+		"""
+		reset_run_metrics()
+		journal = RunJournal(self.conference_name)
+		# The journal only applies to the same input papers
+		run = {"papers": hashlib.md5(json.dumps(encode_papers(self.papers), sort_keys=True).encode()).hexdigest()}
+		records = journal.resume(run) if resume else []
+		if not resume:
+			journal.start(run)
+
+		finished = 0
+		for record in records:
+			if record["event"] == "enriched":
+				self.papers = decode_papers(record["papers"])
+			elif record["event"] == "finished":
+				self.papers[record["index"]] = Paper.from_json(record["paper"])
+				finished = record["index"] + 1
+		if len(records) > 0:
+			print(f"Resuming {self.conference_name} from paper {finished + 1} of {len(self.papers)}")
+
+		if not any([record["event"] == "enriched" for record in records]):
+			self.try_populate_abstracts_and_links_from_semantic_scholar(self.papers)
+			journal.append({"event": "enriched", "papers": encode_papers(self.papers)})
+
+		for index, paper in enumerate(self.papers):
+			if index >= finished:
+				self.try_populate_missing_abstracts_from_doi(paper)
+				journal.append({"event": "finished", "index": index, "paper": paper.to_json()})
+			if output_writer is not None:
+				output_writer.write_paper(paper)
+		journal.close()
 
-	def try_populate_abstract_and_link_from_semantic_scholar(self, paper):
-		if paper["abstract"] == "":
-			abstract, link = get_info_from_semantic_scholar(paper["title"])
-			if abstract != "":
-				paper["abstract"] = abstract
-			if paper["link"] == "" and link != "":
-				paper["link"] = link
+	def try_populate_abstracts_and_links_from_semantic_scholar(self, papers):
+		papers = [paper for paper in papers if paper.abstract == ""]
+		infos = get_infos_from_semantic_scholar(
+			[paper.title for paper in papers],
+			dois={paper.title: get_doi_from_link(paper.link) for paper in papers}
+		)
+		for paper in papers:
+			info = infos[paper.title]
+			if info["abstract"] != "":
+				paper.abstract = info["abstract"]
+			if paper.link == "" and info["link"] != "":
+				paper.link = info["link"]
 
 	def try_populate_missing_abstracts_from_doi(self, paper):
-		if paper["abstract"] == "":
-			if paper["link"] != "" and "doi.org" in paper["link"]:
+		if paper.abstract == "":
+			if paper.link != "" and "doi.org" in paper.link:
 				# If link in this format
 				# https://doi.org/10.1145/3676641.3716268
 				# Convert to this format
 				# https://dl.acm.org/doi/10.1145/3676641.3716268
-				if "doi.org" in paper["link"]:
-					dl_link = paper["link"].replace("doi.org", "dl.acm.org/doi")
-				elif "dl.acm.org" in paper["link"]:
-					dl_link = paper["link"]
+				if "doi.org" in paper.link:
+					dl_link = paper.link.replace("doi.org", "dl.acm.org/doi")
+				elif "dl.acm.org" in paper.link:
+					dl_link = paper.link
 				else:
-					print(f"No doi found in link: {paper['link']}")
+					print(f"No doi found in link: {paper.link}")
 					return
 
-				soup = BeautifulSoup(get_cached_webpage_via_selenium(dl_link), 'html.parser')
+				dl_html = get_cached_webpage_via_selenium(dl_link)
+				if dl_html is None:
+					return
+				with get_run_metrics().parsing("acm_abstract"):
+					soup = make_soup(dl_html, SoupStrainer('section', id='abstract'))
 
-				abstract = soup.find('section', id='abstract')
-				abstract_paragraphs = abstract.find_all('div', role='paragraph')
-				abstract_text = "\n".join([paragraph.text.strip() for paragraph in abstract_paragraphs])
-				paper["abstract"] = abstract_text
+					abstract = soup.find('section', id='abstract')
+					if abstract is None:
+						# Some DL pages, such as front matter, have no abstract
+						return
+					abstract_paragraphs = abstract.find_all('div', role='paragraph')
+					abstract_text = "\n".join([paragraph.text.strip() for paragraph in abstract_paragraphs])
+				paper.abstract = abstract_text
 
 	def print_stats(self):
 		total_papers = len(self.papers)
 		missing_abstracts = 0
 		missing_links = 0
 		for paper in self.papers:
-			if paper["abstract"] == "":
+			if paper.abstract == "":
 				missing_abstracts += 1
-			if paper["link"] == "":
+			if paper.link == "":
 				missing_links += 1
 
 		print(f"Conference: {self.conference_name} -----------------------------------------")
@@ -61,19 +109,31 @@ class PaperManager:
 		print(f"Missing abstracts: {missing_abstracts}")
 		print(f"Missing links: {missing_links}")
 	
-	def save_sessions(self, force_overwrite):
-		self.save_to_json(force_overwrite)
+	def save_sessions(self, force_overwrite, merge=False):
+		self.save_to_json(force_overwrite, merge)
 		self.save_to_notion()
+		get_run_metrics().save(self.conference_name)
+
+	def save_to_jsonl(self):
+		"""Save the papers as one JSON record per line"""
+		with JsonlWriter(self.conference_name) as writer:
+			for paper in self.papers:
+				writer.write_paper(paper)
 
-	def save_to_json(self, force_overwrite=False):
-		"""Save the scraped data to a JSON file"""
+	def save_to_json(self, force_overwrite=False, merge=False):
+		"""
+		Save the scraped data to a JSON file. If a file with different data already exists, the differences
+		are printed and ValueError is raised, unless merge is set, in which case old non-empty abstracts
+		are kept, new links are accepted and the merged papers are saved.
+		"""
 		filename = f"{self.conference_name}.json"
 
 		if not os.path.exists("json_format"):
 			os.makedirs("json_format")
 
 		# Create JSON content in memory
-		json_content = json.dumps(self.papers, indent=2, ensure_ascii=False)
+		papers = encode_papers(self.papers)
+		json_content = json.dumps(papers, indent=2, ensure_ascii=False)
 
 		# Read the existing JSON file if it exists
 		output_file_exists = os.path.exists(f"json_format/{filename}")
@@ -84,9 +144,17 @@ class PaperManager:
 		
 		if output_file_exists and not force_overwrite:
 			if existing_content != json_content:
-				# Print the diff
-				pretty_print_diff(existing_content, json_content)
-				exit()
+				# Papers have no sessions, so compare them as a single unnamed session
+				existing_papers = {"": json.loads(existing_content)}
+				changes = structural_diff(existing_papers, {"": papers})
+				# Files that only differ in formatting are simply rewritten
+				if len(changes) > 0:
+					print_structural_diff(changes)
+					if not merge:
+						raise ValueError(f"json_format/{filename} differs from the scraped data, rerun with merge or force_overwrite")
+					papers = merge_sessions(existing_papers, {"": papers})[""]
+					self.papers = decode_papers(papers)
+					json_content = json.dumps(papers, indent=2, ensure_ascii=False)
 		
 		# Write the content to file
 		with open(f"json_format/{filename}", 'w', encoding='utf-8') as f:
@@ -103,10 +171,11 @@ class PaperManager:
 
 		with open(f"notion_format/{filename}", 'w', encoding='utf-8') as f:
 			for paper in self.papers:
-				temp_paper = deepcopy(paper)
-				f.write(f" - {paper['title']}\n")
-				temp_paper.pop("title")
-				for key, value in temp_paper.items():
-					f.write(f"   - {key}: {value}\n")
+				f.write(f" - {paper.title}\n")
+				for key, value in paper.items():
+					if key == "authors" and isinstance(value, list):
+						value = ", ".join([f"{author['name']} ({author['institution']})" for author in value])
+					if key != "title":
+						f.write(f"   - {key}: {value}\n")
 		
 		print(f"Data saved to notion_format/{filename}")
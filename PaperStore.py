@@ -0,0 +1,488 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from utils import index_papers
+from author_parsing import parse_authors, author_style
+
+class PaperStore:
+	"""
+	Every scraped conference in one SQLite database, with an FTS5 index over paper titles, authors and
+	abstracts. Conferences are upserted as a whole: papers are matched to stored ones by normalized
+	title, only changed rows are written, and papers that disappeared are removed. The index is kept
+	in sync by triggers. Authors are parsed into names and institutions as papers are written, into
+	an inverted index from each author and institution to their papers.
+	"""
+	def __init__(self, path=os.path.join("sqlite_format", "papers.sqlite3")):
+		self.lock = threading.Lock()
+
+		if os.path.dirname(path) != "":
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+		self.connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+		self.connection.execute("PRAGMA journal_mode=WAL")
+		self.connection.execute("PRAGMA foreign_keys=ON")
+		self.connection.executescript("""
+			CREATE TABLE IF NOT EXISTS conferences (
+				id INTEGER PRIMARY KEY,
+				name TEXT UNIQUE,
+				venue TEXT,
+				year INTEGER,
+				source TEXT,
+				content_hash TEXT,
+				ingested_at REAL
+			);
+			CREATE TABLE IF NOT EXISTS sessions (
+				id INTEGER PRIMARY KEY,
+				conference_id INTEGER REFERENCES conferences(id) ON DELETE CASCADE,
+				title TEXT,
+				position INTEGER,
+				UNIQUE (conference_id, title)
+			);
+			CREATE TABLE IF NOT EXISTS papers (
+				id INTEGER PRIMARY KEY,
+				conference_id INTEGER REFERENCES conferences(id) ON DELETE CASCADE,
+				session_id INTEGER REFERENCES sessions(id) ON DELETE SET NULL,
+				normalized_title TEXT,
+				occurrence INTEGER,
+				position INTEGER,
+				title TEXT,
+				authors TEXT,
+				authors_json TEXT,
+				abstract TEXT,
+				link TEXT,
+				UNIQUE (conference_id, normalized_title, occurrence)
+			);
+			CREATE INDEX IF NOT EXISTS papers_session ON papers (session_id);
+
+			CREATE TABLE IF NOT EXISTS authors (
+				id INTEGER PRIMARY KEY,
+				name TEXT UNIQUE COLLATE NOCASE
+			);
+			CREATE TABLE IF NOT EXISTS institutions (
+				id INTEGER PRIMARY KEY,
+				name TEXT UNIQUE COLLATE NOCASE
+			);
+			CREATE TABLE IF NOT EXISTS paper_authors (
+				paper_id INTEGER REFERENCES papers(id) ON DELETE CASCADE,
+				position INTEGER,
+				author_id INTEGER REFERENCES authors(id),
+				institution_id INTEGER REFERENCES institutions(id),
+				PRIMARY KEY (paper_id, position)
+			);
+			CREATE INDEX IF NOT EXISTS paper_authors_author ON paper_authors (author_id);
+			CREATE INDEX IF NOT EXISTS paper_authors_institution ON paper_authors (institution_id);
+
+			CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+				title, authors, abstract,
+				content='papers', content_rowid='id', tokenize='porter unicode61'
+			);
+			CREATE TRIGGER IF NOT EXISTS papers_fts_insert AFTER INSERT ON papers BEGIN
+				INSERT INTO papers_fts (rowid, title, authors, abstract) VALUES (new.id, new.title, new.authors, new.abstract);
+			END;
+			CREATE TRIGGER IF NOT EXISTS papers_fts_delete AFTER DELETE ON papers BEGIN
+				INSERT INTO papers_fts (papers_fts, rowid, title, authors, abstract) VALUES ('delete', old.id, old.title, old.authors, old.abstract);
+			END;
+			CREATE TRIGGER IF NOT EXISTS papers_fts_update AFTER UPDATE OF title, authors, abstract ON papers BEGIN
+				INSERT INTO papers_fts (papers_fts, rowid, title, authors, abstract) VALUES ('delete', old.id, old.title, old.authors, old.abstract);
+				INSERT INTO papers_fts (rowid, title, authors, abstract) VALUES (new.id, new.title, new.authors, new.abstract);
+			END;
+		""")
+		self.connection.commit()
+
+	def upsert_conference(self, conference_name, data, source="", force=False):
+		"""
+		Store a conference's papers, given as {session title: [paper]} like ConferenceScraper and
+		save_to_json save them, or as a flat list of papers like PaperManager. Returns the number of
+		papers inserted, updated and removed, or None if the data is unchanged since the last upsert.
+		"""
+		sessions = data if isinstance(data, dict) else {None: data}
+		content_hash = hashlib.md5(json.dumps(data, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+		venue, year = parse_conference_name(conference_name)
+
+		with self.lock:
+			row = self.connection.execute("SELECT id, content_hash FROM conferences WHERE name = ?", (conference_name,)).fetchone()
+			if row is not None and row[1] == content_hash and not force:
+				return None
+
+			try:
+				self.connection.execute(
+					"""INSERT INTO conferences (name, venue, year, source, content_hash, ingested_at) VALUES (?, ?, ?, ?, ?, ?)
+					ON CONFLICT (name) DO UPDATE SET venue = excluded.venue, year = excluded.year, source = excluded.source,
+						content_hash = excluded.content_hash, ingested_at = excluded.ingested_at""",
+					(conference_name, venue, year, source, content_hash, time.time())
+				)
+				conference_id = self.connection.execute("SELECT id FROM conferences WHERE name = ?", (conference_name,)).fetchone()[0]
+				counts = self.upsert_papers(conference_id, self.upsert_sessions(conference_id, sessions), sessions, author_style(conference_name))
+				self.connection.commit()
+			except BaseException:
+				self.connection.rollback()
+				raise
+		return counts
+
+	def upsert_sessions(self, conference_id, sessions):
+		"""Returns a dict from session title to id. Sessions that are no longer in the conference are removed."""
+		session_ids = {}
+		for position, session_title in enumerate(sessions):
+			if session_title is None:
+				continue
+			self.connection.execute(
+				"""INSERT INTO sessions (conference_id, title, position) VALUES (?, ?, ?)
+				ON CONFLICT (conference_id, title) DO UPDATE SET position = excluded.position""",
+				(conference_id, session_title, position)
+			)
+		for session_id, session_title in self.connection.execute("SELECT id, title FROM sessions WHERE conference_id = ?", (conference_id,)).fetchall():
+			if session_title in sessions:
+				session_ids[session_title] = session_id
+			else:
+				self.connection.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+		return session_ids
+
+	def upsert_papers(self, conference_id, session_ids, sessions, style="auto"):
+		stored = {
+			(normalized_title, occurrence): (paper_id, rest)
+			for paper_id, normalized_title, occurrence, *rest in self.connection.execute(
+				"SELECT id, normalized_title, occurrence, session_id, position, title, authors, authors_json, abstract, link FROM papers WHERE conference_id = ?",
+				(conference_id,)
+			).fetchall()
+		}
+
+		inserted, updated = 0, 0
+		for (normalized_title, occurrence), (session_title, position, paper) in index_papers(sessions).items():
+			authors = paper.get("authors", "")
+			row = [
+				session_ids.get(session_title),
+				position,
+				paper["title"],
+				format_authors(authors),
+				json.dumps(authors, ensure_ascii=False),
+				paper.get("abstract", ""),
+				paper.get("link", ""),
+			]
+			if (normalized_title, occurrence) not in stored:
+				paper_id = self.connection.execute(
+					"INSERT INTO papers (conference_id, normalized_title, occurrence, session_id, position, title, authors, authors_json, abstract, link) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+					(conference_id, normalized_title, occurrence, *row)
+				).lastrowid
+				self.index_authors(paper_id, authors, style)
+				inserted += 1
+				continue
+
+			paper_id, stored_row = stored.pop((normalized_title, occurrence))
+			# Unchanged papers are not written, so their index entries are left alone
+			if list(stored_row) != row:
+				self.connection.execute(
+					"UPDATE papers SET session_id = ?, position = ?, title = ?, authors = ?, authors_json = ?, abstract = ?, link = ? WHERE id = ?",
+					(*row, paper_id)
+				)
+				if stored_row[4] != row[4]:
+					self.index_authors(paper_id, authors, style)
+				updated += 1
+
+		for paper_id, _ in stored.values():
+			self.connection.execute("DELETE FROM papers WHERE id = ?", (paper_id,))
+		return {"inserted": inserted, "updated": updated, "removed": len(stored)}
+
+	def name_id(self, table, name):
+		self.connection.execute(f"INSERT INTO {table} (name) VALUES (?) ON CONFLICT (name) DO NOTHING", (name,))
+		return self.connection.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()[0]
+
+	def index_authors(self, paper_id, authors, style="auto"):
+		"""Replace a paper's entries in the author and institution index."""
+		self.connection.execute("DELETE FROM paper_authors WHERE paper_id = ?", (paper_id,))
+		for position, author in enumerate(parse_authors(authors, style)):
+			self.connection.execute(
+				"INSERT INTO paper_authors (paper_id, position, author_id, institution_id) VALUES (?, ?, ?, ?)",
+				(paper_id, position, self.name_id("authors", author["name"]), self.name_id("institutions", author["institution"]) if author["institution"] != "" else None)
+			)
+
+	def reindex_authors(self):
+		"""Parse the authors of every stored paper again, e.g. after the author parser changed."""
+		with self.lock:
+			try:
+				rows = self.connection.execute(
+					"SELECT papers.id, papers.authors_json, conferences.name FROM papers JOIN conferences ON conferences.id = papers.conference_id"
+				).fetchall()
+				for paper_id, authors_json, conference_name in rows:
+					self.index_authors(paper_id, json.loads(authors_json), author_style(conference_name))
+				# Names that no paper refers to any more
+				self.connection.execute("DELETE FROM authors WHERE id NOT IN (SELECT author_id FROM paper_authors)")
+				self.connection.execute("DELETE FROM institutions WHERE id NOT IN (SELECT institution_id FROM paper_authors WHERE institution_id IS NOT NULL)")
+				self.connection.commit()
+			except BaseException:
+				self.connection.rollback()
+				raise
+		return len(rows)
+
+	def ingest_file(self, path, force=False):
+		"""
+		Upsert a JSON output of ConferenceScraper, PaperManager or save_to_json, or a JSONL output of
+		JsonlWriter, named after the conference. Returns the conference name and the upsert counts.
+		"""
+		conference_name = conference_name_from_path(path)
+		if path.endswith(".jsonl"):
+			# Imported here because saving is only needed for JSONL outputs
+			from saving import read_jsonl
+			data = {}
+			for record in read_jsonl(path):
+				conference_name = record.pop("conference", conference_name)
+				data.setdefault(record.pop("session", None), []).append(record)
+			if list(data) == [None]:
+				data = data[None]
+		else:
+			with open(path, 'r', encoding='utf-8') as f:
+				data = json.load(f)
+		return conference_name, self.upsert_conference(conference_name, data, source=path, force=force)
+
+	def remove_conference(self, conference_name):
+		with self.lock:
+			self.connection.execute("DELETE FROM papers WHERE conference_id IN (SELECT id FROM conferences WHERE name = ?)", (conference_name,))
+			self.connection.execute("DELETE FROM conferences WHERE name = ?", (conference_name,))
+			self.connection.commit()
+
+	def search(self, query, venues=None, since=None, limit=20):
+		"""
+		Full-text search, best matches first. The query uses FTS5 syntax (e.g. "disaggregat*",
+		'title:"memory disaggregation"', "rdma OR cxl"). Results can be restricted to venues, where
+		"osdi" also matches the combined "osdi_atc", and to years from since onwards.
+		"""
+		conditions, parameters = conference_conditions(venues, since)
+		conditions.insert(0, "papers_fts MATCH ?")
+		parameters.insert(0, query)
+
+		sql = f"""
+			SELECT conferences.name, sessions.title, papers.title, papers.authors, papers.abstract, papers.link
+			FROM papers_fts
+			JOIN papers ON papers.id = papers_fts.rowid
+			JOIN conferences ON conferences.id = papers.conference_id
+			LEFT JOIN sessions ON sessions.id = papers.session_id
+			WHERE {' AND '.join(conditions)}
+			ORDER BY bm25(papers_fts, 10.0, 2.0, 1.0)
+			LIMIT ?
+		"""
+		with self.lock:
+			try:
+				rows = self.connection.execute(sql, (*parameters, limit)).fetchall()
+			except sqlite3.OperationalError:
+				# Not valid FTS5 syntax, e.g. a title with punctuation, so search for its words instead
+				parameters[0] = " ".join(['"' + word.replace('"', '""') + '"' for word in query.split()])
+				rows = self.connection.execute(sql, (*parameters, limit)).fetchall()
+		return [
+			{"conference": conference, "session": session, "title": title, "authors": authors, "abstract": abstract, "link": link}
+			for conference, session, title, authors, abstract, link in rows
+		]
+
+	def papers_by(self, author=None, institution=None, venues=None, since=None):
+		"""
+		Papers with an author or an institution whose name contains the given text, ignoring case,
+		through the author index. Venues and since restrict the results as for search().
+		"""
+		conditions, parameters = conference_conditions(venues, since)
+		if author is not None:
+			conditions.append("paper_authors.author_id IN (SELECT id FROM authors WHERE name LIKE ?)")
+			parameters.append(f"%{author}%")
+		if institution is not None:
+			conditions.append("paper_authors.institution_id IN (SELECT id FROM institutions WHERE name LIKE ?)")
+			parameters.append(f"%{institution}%")
+
+		with self.lock:
+			rows = self.connection.execute(f"""
+				SELECT DISTINCT conferences.name, conferences.year, papers.title, papers.link
+				FROM paper_authors
+				JOIN papers ON papers.id = paper_authors.paper_id
+				JOIN conferences ON conferences.id = papers.conference_id
+				WHERE {' AND '.join(conditions) if len(conditions) > 0 else '1'}
+				ORDER BY conferences.year DESC, conferences.venue, papers.id
+			""", parameters).fetchall()
+		return [{"conference": conference, "year": year, "title": title, "link": link} for conference, year, title, link in rows]
+
+	def top_institutions(self, venues=None, since=None, limit=20):
+		"""Institutions by number of papers."""
+		conditions, parameters = conference_conditions(venues, since)
+		conditions.append("paper_authors.institution_id IS NOT NULL")
+		with self.lock:
+			return self.connection.execute(f"""
+				SELECT institutions.name, COUNT(DISTINCT paper_authors.paper_id) AS paper_count
+				FROM paper_authors
+				JOIN institutions ON institutions.id = paper_authors.institution_id
+				JOIN papers ON papers.id = paper_authors.paper_id
+				JOIN conferences ON conferences.id = papers.conference_id
+				WHERE {' AND '.join(conditions)}
+				GROUP BY institutions.id
+				ORDER BY paper_count DESC
+				LIMIT ?
+			""", (*parameters, limit)).fetchall()
+
+	def conference_names(self):
+		with self.lock:
+			return [name for name, in self.connection.execute("SELECT name FROM conferences ORDER BY venue, year, name").fetchall()]
+
+	def papers(self, conference_name):
+		"""A conference's papers in the order they were scraped."""
+		with self.lock:
+			rows = self.connection.execute("""
+				SELECT papers.title, papers.authors_json, papers.abstract, papers.link
+				FROM papers
+				JOIN conferences ON conferences.id = papers.conference_id
+				LEFT JOIN sessions ON sessions.id = papers.session_id
+				WHERE conferences.name = ?
+				ORDER BY sessions.position, papers.position
+			""", (conference_name,)).fetchall()
+		return [
+			{"title": title, "authors": json.loads(authors_json), "abstract": abstract, "link": link}
+			for title, authors_json, abstract, link in rows
+		]
+
+	def optimize(self):
+		"""Merge the index's segments after ingesting, which keeps queries fast."""
+		with self.lock:
+			self.connection.execute("INSERT INTO papers_fts (papers_fts) VALUES ('optimize')")
+			self.connection.commit()
+
+	def stats(self):
+		with self.lock:
+			return {
+				name: {"venue": venue, "year": year, "sessions": sessions, "papers": papers, "missing_abstracts": missing_abstracts}
+				for name, venue, year, sessions, papers, missing_abstracts in self.connection.execute("""
+					SELECT name, venue, year,
+						(SELECT COUNT(*) FROM sessions WHERE conference_id = conferences.id),
+						(SELECT COUNT(*) FROM papers WHERE conference_id = conferences.id),
+						(SELECT COUNT(*) FROM papers WHERE conference_id = conferences.id AND abstract = '')
+					FROM conferences ORDER BY venue, year
+				""").fetchall()
+			}
+
+def conference_conditions(venues=None, since=None):
+	"""SQL conditions on the conferences table, where venue "osdi" also matches the combined "osdi_atc"."""
+	conditions, parameters = [], []
+	if venues is not None and len(venues) > 0:
+		venue_condition = "(conferences.venue = ? OR conferences.venue LIKE ? ESCAPE '\\' OR conferences.venue LIKE ? ESCAPE '\\')"
+		conditions.append(f"({' OR '.join([venue_condition] * len(venues))})")
+		for venue in venues:
+			parameters.extend([venue, f"{venue}\\_%", f"%\\_{venue}"])
+	if since is not None:
+		conditions.append("conferences.year >= ?")
+		parameters.append(since)
+	return conditions, parameters
+
+def parse_conference_name(conference_name):
+	"""Split a conference name such as "osdi24" or "osdi_atc25" into its venue and four-digit year."""
+	match = re.fullmatch(r"([a-z_]+?)_?(\d{2}|\d{4})", conference_name)
+	if match is None:
+		return conference_name, None
+	year = int(match.group(2))
+	return match.group(1), year + 2000 if year < 100 else year
+
+def conference_name_from_path(path):
+	"""json_format/osdi24_sessions.json, as saved by the legacy scrapers, and json_format/osdi24.json both give osdi24."""
+	name = os.path.basename(path).split(".")[0]
+	return name[:-len("_sessions")] if name.endswith("_sessions") else name
+
+def format_authors(authors):
+	"""Authors as text for the index, whether a raw string or a list of {name, institution} records."""
+	if isinstance(authors, list):
+		return "; ".join([
+			f"{author['name']} ({author['institution']})" if author.get("institution") else author["name"]
+			for author in authors
+		])
+	return authors or ""
+
+def ingest_outputs(paper_store, paths=None, force=False):
+	"""Upsert every given output, by default every JSON output in json_format/. Returns a dict from conference name to counts."""
+	if paths is None:
+		paths = sorted(glob.glob(os.path.join("json_format", "*.json")))
+	results = {}
+	for path in paths:
+		conference_name, counts = paper_store.ingest_file(path, force)
+		results[conference_name] = counts
+	return results
+
+paper_stores = {}
+paper_stores_lock = threading.Lock()
+
+def get_paper_store(path=os.path.join("sqlite_format", "papers.sqlite3")):
+	with paper_stores_lock:
+		if path not in paper_stores:
+			paper_stores[path] = PaperStore(path)
+		return paper_stores[path]
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Load scraped conferences into SQLite and search them")
+	parser.add_argument("--database", default=os.path.join("sqlite_format", "papers.sqlite3"))
+	subparsers = parser.add_subparsers(dest="command", required=True)
+
+	ingest_parser = subparsers.add_parser("ingest", help="Upsert outputs, by default every file in json_format/")
+	ingest_parser.add_argument("paths", nargs="*")
+	ingest_parser.add_argument("--force", action="store_true", help="Upsert even if a conference is unchanged since the last ingest")
+
+	search_parser = subparsers.add_parser("search", help="Full-text search over titles, authors and abstracts")
+	search_parser.add_argument("query")
+	search_parser.add_argument("--venue", nargs="*", default=None, help="e.g. osdi nsdi sosp eurosys")
+	search_parser.add_argument("--since", type=int, default=None, help="First year to include, e.g. 2019")
+	search_parser.add_argument("--limit", type=int, default=20)
+	search_parser.add_argument("--abstracts", action="store_true", help="Also print each result's abstract")
+
+	papers_by_parser = subparsers.add_parser("papers-by", help="Papers by an author or institution, through the author index")
+	papers_by_parser.add_argument("--author", default=None)
+	papers_by_parser.add_argument("--institution", default=None)
+	papers_by_parser.add_argument("--venue", nargs="*", default=None)
+	papers_by_parser.add_argument("--since", type=int, default=None)
+
+	institutions_parser = subparsers.add_parser("institutions", help="Institutions by number of papers")
+	institutions_parser.add_argument("--venue", nargs="*", default=None)
+	institutions_parser.add_argument("--since", type=int, default=None)
+	institutions_parser.add_argument("--limit", type=int, default=20)
+
+	subparsers.add_parser("reindex-authors", help="Parse the authors of every stored paper again")
+
+	remove_parser = subparsers.add_parser("remove", help="Remove a conference")
+	remove_parser.add_argument("conference")
+
+	subparsers.add_parser("stats", help="Print the sessions and papers stored per conference")
+	args = parser.parse_args()
+
+	paper_store = get_paper_store(args.database)
+	if args.command == "ingest":
+		results = ingest_outputs(paper_store, args.paths or None, args.force)
+		for conference_name, counts in results.items():
+			if counts is None:
+				print(f"{conference_name:<16} unchanged")
+			else:
+				print(f"{conference_name:<16} {counts['inserted']:>5} inserted {counts['updated']:>5} updated {counts['removed']:>5} removed")
+		if any([counts is not None for counts in results.values()]):
+			paper_store.optimize()
+	elif args.command == "search":
+		start = time.perf_counter()
+		results = paper_store.search(args.query, args.venue, args.since, args.limit)
+		milliseconds = (time.perf_counter() - start) * 1000
+		for result in results:
+			print(f"[{result['conference']}] {result['title']}")
+			if result["session"] is not None:
+				print(f"    {result['session']}")
+			if result["link"] != "":
+				print(f"    {result['link']}")
+			if args.abstracts and result["abstract"] != "":
+				print(f"    {result['abstract']}")
+		print(f"{len(results)} results in {milliseconds:.1f}ms")
+	elif args.command == "papers-by":
+		assert args.author is not None or args.institution is not None, "Give --author or --institution"
+		start = time.perf_counter()
+		results = paper_store.papers_by(args.author, args.institution, args.venue, args.since)
+		milliseconds = (time.perf_counter() - start) * 1000
+		for result in results:
+			print(f"[{result['conference']}] {result['title']}")
+		print(f"{len(results)} results in {milliseconds:.1f}ms")
+	elif args.command == "institutions":
+		for institution, paper_count in paper_store.top_institutions(args.venue, args.since, args.limit):
+			print(f"{paper_count:>5} {institution}")
+	elif args.command == "reindex-authors":
+		print(f"Indexed the authors of {paper_store.reindex_authors()} papers")
+	elif args.command == "remove":
+		paper_store.remove_conference(args.conference)
+	elif args.command == "stats":
+		for conference_name, stats in paper_store.stats().items():
+			print(f"{conference_name:<16} {stats['sessions']:>4} sessions {stats['papers']:>5} papers {stats['missing_abstracts']:>5} missing abstracts")
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import html_parsing
+from CacheStore import database_path
+
+class ParseCache:
+	"""
+	Extraction results keyed by the hash of the page they were parsed from and the strategy that
+	parsed them, so that unchanged pages are not parsed again. Bumping a strategy's version, or
+	changing its configuration, makes its old results unreachable.
+	"""
+	def __init__(self, cache_dir=".cache"):
+		self.lock = threading.Lock()
+
+		self.connection = sqlite3.connect(
+			database_path(cache_dir, "parsed.sqlite3"),
+			timeout=60,
+			check_same_thread=False
+		)
+		self.connection.execute("PRAGMA journal_mode=WAL")
+		self.connection.execute("""
+			CREATE TABLE IF NOT EXISTS parsed (
+				key TEXT PRIMARY KEY,
+				strategy TEXT,
+				version INTEGER,
+				result TEXT
+			)
+		""")
+		self.connection.commit()
+
+	def get(self, key):
+		with self.lock:
+			row = self.connection.execute("SELECT result FROM parsed WHERE key = ?", (key,)).fetchone()
+		return json.loads(row[0]) if row is not None else None
+
+	def put(self, key, strategy, result):
+		with self.lock:
+			self.connection.execute(
+				"INSERT OR REPLACE INTO parsed (key, strategy, version, result) VALUES (?, ?, ?, ?)",
+				(key, type(strategy).__name__, strategy.version, json.dumps(result, ensure_ascii=False))
+			)
+			self.connection.commit()
+
+	def clear_stale(self, strategy):
+		"""Remove results from older versions of a strategy."""
+		with self.lock:
+			self.connection.execute(
+				"DELETE FROM parsed WHERE strategy = ? AND version != ?",
+				(type(strategy).__name__, strategy.version)
+			)
+			self.connection.commit()
+
+parse_caches = {}
+parse_caches_lock = threading.Lock()
+
+# Set to False to always parse, e.g. while developing a strategy without bumping its version
+USE_PARSE_CACHE = True
+
+def get_parse_cache(cache_dir=".cache"):
+	with parse_caches_lock:
+		if cache_dir not in parse_caches:
+			parse_caches[cache_dir] = ParseCache(cache_dir)
+		return parse_caches[cache_dir]
+
+def parse_key(strategy, method_name, content, argument=""):
+	content_hash = hashlib.sha256(content.encode()).hexdigest()
+	# Backends may repair malformed markup differently, so results are kept per backend
+	return "|".join([strategy.parse_cache_identity(), html_parsing.html_parser_backend, method_name, argument, content_hash])
+
+def memoize_parse(strategy, method_name, content, parse, argument="", encode=None, decode=None):
+	"""
+	Return the result of parse(), a call to strategy.method_name on a page with the given content,
+	reusing the stored result if this page has been parsed by the same strategy version before.
+	encode and decode convert results that are not plain JSON, such as Paper records, to and from it.
+	"""
+	if not USE_PARSE_CACHE:
+		return parse()
+
+	key = parse_key(strategy, method_name, content, argument)
+	parse_cache = get_parse_cache()
+	result = parse_cache.get(key)
+	if result is None:
+		result = parse()
+		if encode is not None:
+			result = encode(result)
+		parse_cache.put(key, strategy, result)
+		# Round trip through JSON so that a fresh parse and a cached one look the same to callers
+		result = json.loads(json.dumps(result, ensure_ascii=False))
+
+	return decode(result) if decode is not None else result
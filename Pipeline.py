@@ -0,0 +1,176 @@
+import queue
+import threading
+
+STOP = object()
+
+class PipelineStage:
+	"""
+	A stage of a Pipeline. With batch_fits, function is called on lists of items rather than on
+	each item, and returns a list of results in the same order. Each worker gathers items while
+	batch_fits(items) holds, and runs its batch once the next item would not fit, the input runs
+	out, or the pipeline cannot take more items until some are finished.
+	"""
+	def __init__(self, name, function, workers=1, queue_size=8, batch_fits=None):
+		self.name = name
+		self.function = function
+		self.workers = workers
+		self.queue_size = queue_size
+		self.batch_fits = batch_fits
+
+class Pipeline:
+	"""
+	Runs items through a sequence of stages. Each stage has its own worker threads and a
+	bounded input queue, so later stages start on early items while earlier stages are still
+	working on later ones. Results are returned in input order, and can also be handed to a
+	callback in input order as soon as each one and all those before it are finished. Without
+	keep_results, results are dropped once handed to the callback, and at most max_pending items
+	are in the pipeline at once, so memory does not grow with the number of items.
+	"""
+	def __init__(self, stages):
+		self.stages = stages
+		self.queues = [queue.Queue(maxsize=stage.queue_size) for stage in stages]
+		self.results = {}
+		self.results_lock = threading.Lock()
+		self.next_result_index = 0
+		self.on_result = None
+		self.error = None
+		self.error_lock = threading.Lock()
+		self.keep_results = True
+		self.pending = None
+		# Set while the input waits for items to be finished, so that partial batches are run
+		self.starved = threading.Event()
+
+	def run(self, items, on_result=None, keep_results=True, max_pending=None):
+		assert keep_results or on_result is not None, "Results that are not kept must be handed to on_result"
+		self.on_result = on_result
+		self.keep_results = keep_results
+		if max_pending is None:
+			max_pending = sum([stage.queue_size + stage.workers for stage in self.stages])
+		# Only needed when results are dropped, as otherwise they are all kept anyway
+		self.pending = threading.Semaphore(max_pending) if not keep_results else None
+		threads = []
+		for stage_index, stage in enumerate(self.stages):
+			remaining_workers = [stage.workers]
+			for _ in range(stage.workers):
+				thread = threading.Thread(
+					target=self.work,
+					args=(stage_index, remaining_workers),
+					name=f"{stage.name}-worker",
+					daemon=True
+				)
+				thread.start()
+				threads.append(thread)
+
+		count = 0
+		try:
+			for index, item in enumerate(items):
+				if self.pending is not None:
+					# Waits for earlier items to be handed to on_result, unless one has failed
+					while not self.pending.acquire(timeout=0.1):
+						self.starved.set()
+						if self.error is not None:
+							break
+					self.starved.clear()
+					if self.error is not None:
+						break
+				self.queues[0].put((index, item))
+				count += 1
+		finally:
+			for _ in range(self.stages[0].workers):
+				self.queues[0].put(STOP)
+
+		for thread in threads:
+			thread.join()
+
+		if self.error is not None:
+			raise self.error
+
+		if not self.keep_results:
+			return None
+		return [self.results[index] for index in range(count)]
+
+	def finish(self, index, item):
+		with self.results_lock:
+			self.results[index] = item
+			if self.on_result is None:
+				return
+
+			while self.next_result_index in self.results and self.error is None:
+				try:
+					self.on_result(self.results[self.next_result_index])
+				except Exception as e:
+					with self.error_lock:
+						if self.error is None:
+							self.error = e
+				if not self.keep_results:
+					del self.results[self.next_result_index]
+					self.pending.release()
+				self.next_result_index += 1
+
+	def work(self, stage_index, remaining_workers):
+		stage = self.stages[stage_index]
+		input_queue = self.queues[stage_index]
+		is_last_stage = stage_index == len(self.stages) - 1
+		batch = []
+
+		while True:
+			if len(batch) > 0:
+				# A partial batch is only held while the input can still grow it
+				try:
+					entry = input_queue.get(timeout=0.1)
+				except queue.Empty:
+					if self.starved.is_set():
+						self.process(stage_index, batch)
+						batch = []
+					continue
+			else:
+				entry = input_queue.get()
+			if entry is STOP:
+				break
+
+			if stage.batch_fits is None:
+				self.process(stage_index, [entry])
+			elif self.error is not None:
+				# Items drained after a failure may not be what batch_fits takes, so they are not batched
+				self.process(stage_index, batch + [entry])
+				batch = []
+			elif len(batch) == 0 or stage.batch_fits([item for _, item in batch] + [entry[1]]):
+				batch.append(entry)
+			else:
+				self.process(stage_index, batch)
+				batch = [entry]
+
+		if len(batch) > 0:
+			self.process(stage_index, batch)
+
+		# The last worker of a stage to finish tells the next stage that no more items are coming
+		with self.error_lock:
+			remaining_workers[0] -= 1
+			last_worker = remaining_workers[0] == 0
+		if last_worker and not is_last_stage:
+			for _ in range(self.stages[stage_index + 1].workers):
+				self.queues[stage_index + 1].put(STOP)
+
+	def process(self, stage_index, entries):
+		"""Run a stage on entries, a list of (index, item), and pass the results on to the next stage."""
+		stage = self.stages[stage_index]
+		items = [item for _, item in entries]
+		# After a failure, items are drained without being processed so that no stage blocks
+		if self.error is None:
+			try:
+				if stage.batch_fits is not None:
+					results = stage.function(items)
+					assert len(results) == len(items), f"Stage {stage.name} returned {len(results)} results for {len(items)} items"
+					items = results
+				else:
+					items = [stage.function(items[0])]
+			except Exception as e:
+				with self.error_lock:
+					if self.error is None:
+						self.error = e
+
+		for (index, _), item in zip(entries, items):
+			if stage_index == len(self.stages) - 1:
+				self.finish(index, item)
+			else:
+				self.queues[stage_index + 1].put((index, item))
@@ -0,0 +1,146 @@
+import sqlite3
+import threading
+import time
+from CacheStore import database_path
+
+class RateLimit:
+	"""
+	Requests per second allowed to a host. The rate starts at initial_rate, grows by additive_increase
+	after every successful request up to max_rate, and is multiplied by multiplicative_decrease down
+	to min_rate whenever the host throttles us. burst is how many requests may go out back to back
+	after the host has been idle, and initial_tokens how many of those a host we have never sent a
+	request to starts with (burst by default).
+	"""
+	def __init__(self, initial_rate, min_rate, max_rate, additive_increase, multiplicative_decrease=0.5, burst=1, initial_tokens=None):
+		self.initial_rate = initial_rate
+		self.min_rate = min_rate
+		self.max_rate = max_rate
+		self.additive_increase = additive_increase
+		self.multiplicative_decrease = multiplicative_decrease
+		self.burst = burst
+		self.initial_tokens = initial_tokens if initial_tokens is not None else burst
+
+# The Semantic Scholar API key allows one request per second, and we start at half of that
+semantic_scholar_rate_limit = RateLimit(initial_rate=1 / 2, min_rate=1 / 60, max_rate=1, additive_increase=1 / 50)
+# Scraped sites get one request per minute to look less suspicious, and only ever slow down from there.
+# Even the first request to a new host waits its full interval
+other_rate_limit = RateLimit(initial_rate=1 / 60, min_rate=1 / 600, max_rate=1 / 60, additive_increase=1 / 6000, initial_tokens=0)
+
+# Per-host overrides, otherwise the limit for the request's target_url is used
+host_rate_limits = {}
+
+class RateLimiter:
+	"""
+	A token bucket per host with an additive-increase/multiplicative-decrease rate, kept in SQLite so
+	that every scraper process on the machine using the same cache directory shares one budget per
+	host. Each reservation runs in its own write transaction. Tokens may go negative, in which case
+	they stand for requests already queued and the next reservation waits for them.
+	"""
+	def __init__(self, cache_dir=".cache"):
+		self.lock = threading.Lock()
+
+		self.connection = sqlite3.connect(
+			database_path(cache_dir, "rate_limits.sqlite3"),
+			timeout=60,
+			check_same_thread=False,
+			isolation_level=None
+		)
+		self.connection.execute("PRAGMA journal_mode=WAL")
+		self.connection.execute("""
+			CREATE TABLE IF NOT EXISTS buckets (
+				host TEXT PRIMARY KEY,
+				rate REAL,
+				tokens REAL,
+				updated_at REAL
+			)
+		""")
+
+	def get_rate_limit(self, host, target_url):
+		if host in host_rate_limits:
+			return host_rate_limits[host]
+		return semantic_scholar_rate_limit if target_url == "semantic_scholar" else other_rate_limit
+
+	def update(self, host, target_url, change):
+		"""
+		Refill the host's bucket up to now and apply change(rate, tokens, rate_limit), which returns the
+		new rate, tokens and a result, all in one transaction. Returns the result.
+		"""
+		rate_limit = self.get_rate_limit(host, target_url)
+		with self.lock:
+			self.connection.execute("BEGIN IMMEDIATE")
+			try:
+				now = time.time()
+				row = self.connection.execute("SELECT rate, tokens, updated_at FROM buckets WHERE host = ?", (host,)).fetchone()
+				if row is None:
+					rate, tokens = rate_limit.initial_rate, rate_limit.initial_tokens
+				else:
+					rate, tokens, updated_at = row
+					# The limits may have been changed since the rate was stored
+					rate = min(max(rate, rate_limit.min_rate), rate_limit.max_rate)
+					tokens = min(rate_limit.burst, tokens + max(0, now - updated_at) * rate)
+
+				rate, tokens, result = change(rate, tokens, rate_limit)
+				self.connection.execute(
+					"INSERT OR REPLACE INTO buckets (host, rate, tokens, updated_at) VALUES (?, ?, ?, ?)",
+					(host, rate, tokens, now)
+				)
+				self.connection.execute("COMMIT")
+			except BaseException:
+				self.connection.execute("ROLLBACK")
+				raise
+		return result
+
+	def reserve(self, host, target_url="other"):
+		"""Take a token for one request, returning how many seconds to wait before sending it."""
+		def take(rate, tokens, rate_limit):
+			tokens -= 1
+			return rate, tokens, max(0.0, -tokens / rate)
+		return self.update(host, target_url, take)
+
+	def record_success(self, host, target_url="other"):
+		"""Additive increase after a request the host accepted."""
+		def increase(rate, tokens, rate_limit):
+			return min(rate_limit.max_rate, rate + rate_limit.additive_increase), tokens, None
+		self.update(host, target_url, increase)
+
+	def record_throttled(self, host, target_url="other", seconds=0):
+		"""
+		Multiplicative decrease after the host throttled us, also holding back every process's
+		requests to it for at least the given number of seconds.
+		"""
+		def decrease(rate, tokens, rate_limit):
+			rate = max(rate_limit.min_rate, rate * rate_limit.multiplicative_decrease)
+			return rate, min(tokens, -seconds * rate), None
+		self.update(host, target_url, decrease)
+
+	def defer(self, host, target_url="other", seconds=0):
+		"""Hold back requests to a host without changing its rate, e.g. after a server error."""
+		def hold(rate, tokens, rate_limit):
+			return rate, min(tokens, -seconds * rate), None
+		self.update(host, target_url, hold)
+
+	def interval(self, host, target_url="other"):
+		"""Current seconds between requests to a host, without taking a token."""
+		rate_limit = self.get_rate_limit(host, target_url)
+		with self.lock:
+			row = self.connection.execute("SELECT rate FROM buckets WHERE host = ?", (host,)).fetchone()
+		rate = row[0] if row is not None else rate_limit.initial_rate
+		return 1 / min(max(rate, rate_limit.min_rate), rate_limit.max_rate)
+
+	def stats(self):
+		with self.lock:
+			rows = self.connection.execute("SELECT host, rate, tokens, updated_at FROM buckets ORDER BY host").fetchall()
+		return {host: {"rate": rate, "interval": 1 / rate, "tokens": tokens, "updated_at": updated_at} for host, rate, tokens, updated_at in rows}
+
+rate_limiters = {}
+rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(cache_dir=".cache"):
+	with rate_limiters_lock:
+		if cache_dir not in rate_limiters:
+			rate_limiters[cache_dir] = RateLimiter(cache_dir)
+		return rate_limiters[cache_dir]
+
+if __name__ == "__main__":
+	for host, stats in get_rate_limiter().stats().items():
+		print(f"{host:<32} {stats['rate']:.3f}/s (one every {stats['interval']:.1f}s), {stats['tokens']:.1f} tokens")
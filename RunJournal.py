@@ -0,0 +1,66 @@
+import json
+import os
+import threading
+
+class RunJournal:
+	"""
+	Append-only record of a run's progress, one JSON object per line, so that a crashed or stopped
+	run can be resumed without parsing or enriching again. The first record describes the run and
+	a journal is only replayed into a run with the same description. A torn last line from a
+	crash is ignored.
+	"""
+	def __init__(self, name, journal_dir=os.path.join(".cache", "journals")):
+		self.lock = threading.Lock()
+		os.makedirs(journal_dir, exist_ok=True)
+		self.path = os.path.join(journal_dir, f"{name}.jsonl")
+		self.file = None
+
+	def read(self):
+		records = []
+		if not os.path.exists(self.path):
+			return records
+		with open(self.path, 'r', encoding='utf-8') as f:
+			for line in f:
+				try:
+					records.append(json.loads(line))
+				except json.JSONDecodeError:
+					break
+		return records
+
+	def resume(self, run):
+		"""
+		Return the records of an earlier run with the same description, then keep appending to
+		its journal. Without one, a new journal is started and an empty list returned.
+		"""
+		records = self.read()
+		if len(records) == 0 or records[0] != {"event": "start", "run": run}:
+			self.start(run)
+			return []
+
+		# Rewrite the readable records so that a torn last line does not corrupt the next one
+		with self.lock:
+			self.file = open(self.path, 'w', encoding='utf-8')
+			for record in records:
+				self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+			self.file.flush()
+		return records[1:]
+
+	def start(self, run):
+		"""Start a new journal, discarding any earlier one."""
+		with self.lock:
+			if self.file is not None:
+				self.file.close()
+			self.file = open(self.path, 'w', encoding='utf-8')
+		self.append({"event": "start", "run": run})
+
+	def append(self, record):
+		with self.lock:
+			self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+			# Flushed per record, so everything appended survives the process dying
+			self.file.flush()
+
+	def close(self):
+		with self.lock:
+			if self.file is not None:
+				self.file.close()
+				self.file = None
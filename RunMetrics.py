@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+class RunMetrics:
+	"""
+	Where a run's time and requests go: cache hits and misses and bytes downloaded per host, time
+	spent sleeping for politeness and retries, downloading and parsing, and enrichment calls.
+	Times are summed over threads, so with concurrent fetches they can add up to more than the
+	wall time of the run.
+	"""
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.started_at = time.time()
+		self.hosts = {}
+		self.seconds = {"sleep_rate_limit": 0.0, "sleep_retry": 0.0, "download": 0.0, "parse": 0.0, "enrichment": 0.0}
+		self.parse_stages = {}
+		self.enrichment = {}
+		# Fetch and enrichment time spent so far by each thread, so that parse time can leave it out
+		self.thread_state = threading.local()
+
+	def host(self, host):
+		if host not in self.hosts:
+			self.hosts[host] = {"hits": 0, "misses": 0, "bytes": 0, "download_seconds": 0.0, "sleep_seconds": 0.0}
+		return self.hosts[host]
+
+	def record_cache_hit(self, host):
+		with self.lock:
+			self.host(host)["hits"] += 1
+
+	def record_download(self, host, size, seconds):
+		"""A cache miss that was downloaded, with the size of the body and the time spent on all attempts."""
+		with self.lock:
+			stats = self.host(host)
+			stats["misses"] += 1
+			stats["bytes"] += size
+			stats["download_seconds"] += seconds
+			self.seconds["download"] += seconds
+
+	def record_sleep(self, host, seconds, reason="rate_limit"):
+		assert reason in ["rate_limit", "retry"], f"Invalid sleep reason: {reason}"
+		with self.lock:
+			self.host(host)["sleep_seconds"] += seconds
+			self.seconds[f"sleep_{reason}"] += seconds
+
+	def record_enrichment(self, name, count=1):
+		with self.lock:
+			self.enrichment[name] = self.enrichment.get(name, 0) + count
+
+	def io_seconds(self):
+		return getattr(self.thread_state, "io_seconds", 0.0)
+
+	@contextmanager
+	def fetching(self):
+		"""Mark a block on this thread as waiting on the cache or network, so it does not count as parsing."""
+		depth = getattr(self.thread_state, "io_depth", 0)
+		self.thread_state.io_depth = depth + 1
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.thread_state.io_depth = depth
+			# Nested blocks are already covered by the outermost one
+			if depth == 0:
+				self.thread_state.io_seconds = self.io_seconds() + time.perf_counter() - start
+
+	@contextmanager
+	def enriching(self):
+		start = time.perf_counter()
+		with self.fetching():
+			yield
+		with self.lock:
+			self.seconds["enrichment"] += time.perf_counter() - start
+
+	@contextmanager
+	def parsing(self, stage):
+		"""Time a parsing stage, leaving out any fetching or enrichment done inside it on the same thread."""
+		start = time.perf_counter()
+		io_start = self.io_seconds()
+		try:
+			yield
+		finally:
+			seconds = time.perf_counter() - start - (self.io_seconds() - io_start)
+			with self.lock:
+				stats = self.parse_stages.setdefault(stage, {"calls": 0, "seconds": 0.0})
+				stats["calls"] += 1
+				stats["seconds"] += seconds
+				self.seconds["parse"] += seconds
+
+	def report(self):
+		with self.lock:
+			hits = sum([stats["hits"] for stats in self.hosts.values()])
+			misses = sum([stats["misses"] for stats in self.hosts.values()])
+			return {
+				"wall_seconds": time.time() - self.started_at,
+				"seconds": dict(self.seconds),
+				"cache": {
+					"hits": hits,
+					"misses": misses,
+					"hit_rate": hits / (hits + misses) if hits + misses > 0 else None,
+					"bytes_downloaded": sum([stats["bytes"] for stats in self.hosts.values()]),
+				},
+				"hosts": {host: dict(stats) for host, stats in sorted(self.hosts.items())},
+				"parse_stages": {stage: dict(stats) for stage, stats in self.parse_stages.items()},
+				"enrichment": dict(self.enrichment),
+			}
+
+	def save(self, conference_name, filename=None):
+		"""Save the report to metrics_format/, next to the json_format/ and notion_format/ outputs."""
+		if filename is None:
+			filename = f"{conference_name}_metrics.json"
+		os.makedirs("metrics_format", exist_ok=True)
+		with open(os.path.join("metrics_format", filename), 'w', encoding='utf-8') as f:
+			json.dump({"conference": conference_name, **self.report()}, f, indent=4)
+
+# Metrics are kept per process, and each conference run starts a fresh set
+run_metrics = RunMetrics()
+
+def get_run_metrics():
+	return run_metrics
+
+def reset_run_metrics():
+	global run_metrics
+	run_metrics = RunMetrics()
+	return run_metrics
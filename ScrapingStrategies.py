@@ -1,31 +1,50 @@
 from abc import ABC, abstractmethod
-from bs4 import BeautifulSoup
-from typing import List, Tuple, Dict
+from bs4 import BeautifulSoup, SoupStrainer
+from typing import Iterable, List, Tuple, Dict, Optional
+from Paper import Paper
 
 class AbstractScrapingStrategy1(ABC):
+
+	# Restricts parsing of the top-level page to the elements the strategy reads, None parses everything
+	top_level_parse_only: Optional[SoupStrainer] = None
+
+	# Bump whenever a change to the strategy changes what it extracts, to invalidate memoized results
+	version: int = 1
+
+	def parse_cache_identity(self) -> str:
+		return f"{type(self).__name__}:{self.version}:{sorted(vars(self).items())}"
 	
-	# Extracts a list of session titles, and links to the session pages
+	# Extracts session titles, and links to the session pages. May yield them lazily, for streaming
 	@abstractmethod
 	def extract_session_titles_and_links(
 		self,
 		top_level_soup: BeautifulSoup
-	) -> List[Tuple[str, str]]:
+	) -> Iterable[Tuple[str, str]]:
 		pass
 
-	# Given a link to a session page, extracts a list of papers in the session
+	# Given a link to a session page, extracts the papers in the session. May yield them lazily
 	@abstractmethod
 	def link_to_papers(
 		self,
 		session_link: str
-	) -> List[Dict[str, str]]:
+	) -> Iterable[Paper]:
 		pass
 
 class AbstractScrapingStrategy2(ABC):
+
+	# Restricts parsing of the top-level page to the elements the strategy reads, None parses everything
+	top_level_parse_only: Optional[SoupStrainer] = None
+
+	# Bump whenever a change to the strategy changes what it extracts, to invalidate memoized results
+	version: int = 1
+
+	def parse_cache_identity(self) -> str:
+		return f"{type(self).__name__}:{self.version}:{sorted(vars(self).items())}"
 	
 	# Extracts sessions immediately as all information in the top-level page
 	@abstractmethod
 	def extract_sessions(
 		self,
 		top_level_soup: BeautifulSoup
-	) -> List[Tuple[str, str]]:
+	) -> Dict[str, List[Paper]]:
 		pass
\ No newline at end of file
@@ -0,0 +1,311 @@
+import argparse
+import json
+import math
+import os
+import re
+import shutil
+import time
+from collections import Counter
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+from utils import normalize_title
+
+# Words too common in paper titles and abstracts to say anything about the topic
+stop_words = set("""
+	a about above after again all also an and any are as at be because been before being below between both but by
+	can could did do does doing down during each few for from further had has have having here how however if in into
+	is it its itself just more most no nor not now of off on once only or other our ours out over own paper same
+	should so some such than that the their them then there these they this those through to too under until up
+	us using very via was we were what when where which while who whom why will with would you your
+""".split())
+
+# Title words count this many times, since a title says more about a paper than any one sentence of its abstract
+title_weight = 2
+
+# Once the corpus has grown by this fraction since all conferences were weighted, adding one reweights them all
+reweight_growth = 0.5
+
+def save_array(path, values):
+	# Written aside and moved into place, so that memory maps of the old file stay valid
+	with open(path + ".tmp", 'wb') as f:
+		np.save(f, values)
+	os.replace(path + ".tmp", path)
+
+def tokenize(text):
+	return [word for word in re.findall(r"[a-z][a-z0-9]+", text.lower()) if word not in stop_words]
+
+def paper_term_counts(paper):
+	counts = Counter(tokenize(paper.get("abstract", "")))
+	for term in tokenize(paper["title"]):
+		counts[term] += title_weight
+	return counts
+
+class SimilarityIndex:
+	"""
+	TF-IDF vectors of paper titles and abstracts for finding related papers across conferences.
+	Each conference is a segment of rows in CSR form, stored as .npy files that are memory-mapped on
+	load, with the sublinear term frequencies kept next to the normalized TF-IDF weights. Adding a
+	conference appends to the vocabulary and weights only its own rows, with the document frequencies
+	of the whole corpus at that time, so earlier conferences drift slightly from the current weights
+	until reweight() recomputes every segment from its term frequencies.
+	"""
+	def __init__(self, index_dir="similarity_index"):
+		self.index_dir = index_dir
+		os.makedirs(index_dir, exist_ok=True)
+
+		self.terms = []
+		self.document_frequency = np.zeros(0, dtype=np.int64)
+		self.documents = 0
+		self.weighted_documents = 0
+		self.segment_names = []
+		vocabulary_path = os.path.join(index_dir, "vocabulary.json")
+		if os.path.exists(vocabulary_path):
+			with open(vocabulary_path, 'r', encoding='utf-8') as f:
+				vocabulary = json.load(f)
+			self.terms = vocabulary["terms"]
+			self.document_frequency = np.array(vocabulary["document_frequency"], dtype=np.int64)
+			self.documents = vocabulary["documents"]
+			self.weighted_documents = vocabulary["weighted_documents"]
+			self.segment_names = vocabulary["segments"]
+		self.columns = {term: column for column, term in enumerate(self.terms)}
+		self.segments = {name: self.load_segment(name) for name in self.segment_names}
+
+	def segment_dir(self, name):
+		return os.path.join(self.index_dir, name)
+
+	def load_segment(self, name):
+		segment_dir = self.segment_dir(name)
+		with open(os.path.join(segment_dir, "papers.json"), 'r', encoding='utf-8') as f:
+			papers = json.load(f)
+		return {
+			"papers": papers,
+			"keys": {normalize_title(paper["title"]): row for row, paper in reversed(list(enumerate(papers)))},
+			**{array: np.load(os.path.join(segment_dir, f"{array}.npy"), mmap_mode='r') for array in ["weights", "frequencies", "indices", "indptr"]},
+		}
+
+	def save_vocabulary(self):
+		vocabulary_path = os.path.join(self.index_dir, "vocabulary.json")
+		with open(vocabulary_path + ".tmp", 'w', encoding='utf-8') as f:
+			json.dump({
+				"terms": self.terms,
+				"document_frequency": self.document_frequency.tolist(),
+				"documents": self.documents,
+				"weighted_documents": self.weighted_documents,
+				"segments": self.segment_names,
+			}, f, ensure_ascii=False)
+		os.replace(vocabulary_path + ".tmp", vocabulary_path)
+
+	def idf(self):
+		# Smoothed, so that a term in every paper still has a weight of 1
+		return (np.log((1 + self.documents) / (1 + self.document_frequency)) + 1).astype(np.float32)
+
+	def weigh(self, frequencies, indices, indptr):
+		"""TF-IDF weights of rows of sublinear term frequencies, normalized to unit length per row."""
+		weights = frequencies * self.idf()[indices]
+		row_lengths = np.diff(indptr)
+		norms = np.sqrt(np.bincount(np.repeat(np.arange(len(row_lengths)), row_lengths), weights=weights ** 2, minlength=len(row_lengths)))
+		# Empty rows have nothing to normalize
+		norms[norms == 0] = 1
+		return (weights / np.repeat(norms, row_lengths)).astype(np.float32)
+
+	def vectorize(self, term_counts_list):
+		"""Rows of sublinear term frequencies in CSR form, ignoring terms outside the vocabulary."""
+		indptr = [0]
+		indices = []
+		frequencies = []
+		for term_counts in term_counts_list:
+			row = sorted([(self.columns[term], count) for term, count in term_counts.items() if term in self.columns])
+			indices.extend([column for column, _ in row])
+			frequencies.extend([1 + math.log(count) for _, count in row])
+			indptr.append(len(indices))
+		return np.array(frequencies, dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)
+
+	def add_conference(self, conference_name, papers):
+		"""Add a conference's papers, replacing the conference if it was added before."""
+		if conference_name in self.segments:
+			self.remove_conference(conference_name, save=False)
+
+		term_counts_list = [paper_term_counts(paper) for paper in papers]
+		for term_counts in term_counts_list:
+			for term in term_counts:
+				if term not in self.columns:
+					self.columns[term] = len(self.terms)
+					self.terms.append(term)
+		frequencies, indices, indptr = self.vectorize(term_counts_list)
+
+		self.document_frequency = np.concatenate([
+			self.document_frequency,
+			np.zeros(len(self.terms) - len(self.document_frequency), dtype=np.int64)
+		])
+		self.document_frequency += np.bincount(indices, minlength=len(self.terms))
+		self.documents += len(papers)
+
+		segment_dir = self.segment_dir(conference_name)
+		os.makedirs(segment_dir, exist_ok=True)
+		with open(os.path.join(segment_dir, "papers.json"), 'w', encoding='utf-8') as f:
+			json.dump([{"title": paper["title"], "link": paper.get("link", "")} for paper in papers], f, ensure_ascii=False)
+		for array, values in [("frequencies", frequencies), ("indices", indices), ("indptr", indptr), ("weights", self.weigh(frequencies, indices, indptr))]:
+			save_array(os.path.join(segment_dir, f"{array}.npy"), values)
+		self.segment_names.append(conference_name)
+		self.segments[conference_name] = self.load_segment(conference_name)
+
+		if self.documents > self.weighted_documents * (1 + reweight_growth):
+			self.reweight()
+		else:
+			self.save_vocabulary()
+
+	def remove_conference(self, conference_name, save=True):
+		segment = self.segments.pop(conference_name)
+		self.segment_names.remove(conference_name)
+		self.document_frequency -= np.bincount(segment["indices"], minlength=len(self.terms))
+		self.documents -= len(segment["papers"])
+		self.weighted_documents = min(self.weighted_documents, self.documents)
+		shutil.rmtree(self.segment_dir(conference_name))
+		if save:
+			self.save_vocabulary()
+
+	def reweight(self):
+		"""Recompute the weights of every conference with the current document frequencies."""
+		for name in self.segment_names:
+			segment = self.segments[name]
+			save_array(os.path.join(self.segment_dir(name), "weights.npy"), self.weigh(segment["frequencies"], segment["indices"], segment["indptr"]))
+			self.segments[name] = self.load_segment(name)
+		self.weighted_documents = self.documents
+		self.save_vocabulary()
+
+	def segment_matrix(self, segment, array="weights"):
+		return csr_matrix((segment[array], segment["indices"], segment["indptr"]), shape=(len(segment["papers"]), len(self.terms)), copy=False)
+
+	def top_k(self, query_matrix, k, exclude=None):
+		"""
+		Best k papers by cosine similarity for each row of a query matrix, as lists of (score,
+		conference, row). exclude maps a query's position to a (conference, row) to leave out.
+		"""
+		names = [name for name in self.segment_names if len(self.segments[name]["papers"]) > 0]
+		if len(names) == 0 or query_matrix.shape[0] == 0:
+			return [[] for _ in range(query_matrix.shape[0])]
+
+		# Sparse rows times dense queries is much faster than a sparse product whose result is nearly dense anyway
+		queries = query_matrix.toarray().T
+		# One dense block of scores per conference, side by side, so a single partition finds the best across all of them
+		scores = np.hstack([(self.segment_matrix(self.segments[name]) @ queries).T for name in names])
+		offsets = np.cumsum([0] + [len(self.segments[name]["papers"]) for name in names])
+		for query, (conference_name, row) in (exclude or {}).items():
+			scores[query, offsets[names.index(conference_name)] + row] = -np.inf
+
+		k = min(k, scores.shape[1])
+		best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+		results = []
+		for query in range(scores.shape[0]):
+			columns = best[query][np.argsort(-scores[query, best[query]])]
+			matches = []
+			for column in columns:
+				if scores[query, column] <= 0:
+					break
+				segment = np.searchsorted(offsets, column, side='right') - 1
+				matches.append((float(scores[query, column]), names[segment], int(column - offsets[segment])))
+			results.append(matches)
+		return results
+
+	def describe(self, matches):
+		return [
+			{"score": score, "conference": conference_name, **self.segments[conference_name]["papers"][row]}
+			for score, conference_name, row in matches
+		]
+
+	def similar_to_texts(self, texts, k=10):
+		"""For each text, the k most similar papers across all conferences, best first."""
+		frequencies, indices, indptr = self.vectorize([Counter(tokenize(text)) for text in texts])
+		query_matrix = csr_matrix((self.weigh(frequencies, indices, indptr), indices, indptr), shape=(len(texts), len(self.terms)))
+		return [self.describe(matches) for matches in self.top_k(query_matrix, k)]
+
+	def similar_to_papers(self, papers, k=10):
+		"""
+		For each (conference name, title) of an indexed paper, the k most similar other papers, best
+		first. Papers that are not in the index get an empty list.
+		"""
+		positions = []
+		rows = []
+		for position, (conference_name, title) in enumerate(papers):
+			row = self.segments[conference_name]["keys"].get(normalize_title(title)) if conference_name in self.segments else None
+			if row is not None:
+				positions.append(position)
+				rows.append((conference_name, row))
+
+		results = [[] for _ in papers]
+		if len(rows) == 0:
+			return results
+		query_matrix = vstack([self.segment_matrix(self.segments[conference_name])[row] for conference_name, row in rows], format='csr')
+		for position, matches in zip(positions, self.top_k(query_matrix, k, exclude=dict(enumerate(rows)))):
+			results[position] = self.describe(matches)
+		return results
+
+	def stats(self):
+		return {
+			"conferences": len(self.segment_names),
+			"papers": self.documents,
+			"terms": len(self.terms),
+			"weighted_papers": self.weighted_documents,
+		}
+
+def build_from_paper_store(similarity_index, paper_store, conference_names=None):
+	"""Add conferences from a PaperStore, by default every conference in it that is not indexed yet."""
+	if conference_names is None:
+		conference_names = [name for name in paper_store.conference_names() if name not in similarity_index.segments]
+	for conference_name in conference_names:
+		similarity_index.add_conference(conference_name, paper_store.papers(conference_name))
+	return conference_names
+
+def print_matches(matches):
+	for match in matches:
+		print(f"  {match['score']:.3f} [{match['conference']}] {match['title']}")
+		if match["link"] != "":
+			print(f"        {match['link']}")
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Find related papers across conferences by TF-IDF similarity")
+	parser.add_argument("--index-dir", default="similarity_index")
+	subparsers = parser.add_subparsers(dest="command", required=True)
+
+	add_parser = subparsers.add_parser("add", help="Add conferences from the PaperStore, by default all that are not indexed yet")
+	add_parser.add_argument("conferences", nargs="*")
+	add_parser.add_argument("--database", default=os.path.join("sqlite_format", "papers.sqlite3"))
+
+	remove_parser = subparsers.add_parser("remove", help="Remove a conference")
+	remove_parser.add_argument("conference")
+
+	similar_parser = subparsers.add_parser("similar", help="Papers most similar to an indexed paper")
+	similar_parser.add_argument("conference")
+	similar_parser.add_argument("title")
+	similar_parser.add_argument("-k", type=int, default=10)
+
+	query_parser = subparsers.add_parser("query", help="Papers most similar to some text")
+	query_parser.add_argument("text")
+	query_parser.add_argument("-k", type=int, default=10)
+
+	subparsers.add_parser("reweight", help="Recompute every conference's weights with the current document frequencies")
+	subparsers.add_parser("stats")
+	args = parser.parse_args()
+
+	similarity_index = SimilarityIndex(args.index_dir)
+	if args.command == "add":
+		# Imported here because only adding conferences reads the PaperStore
+		from PaperStore import get_paper_store
+		added = build_from_paper_store(similarity_index, get_paper_store(args.database), args.conferences or None)
+		print(f"Added {len(added)} conferences, {similarity_index.documents} papers indexed")
+	elif args.command == "remove":
+		similarity_index.remove_conference(args.conference)
+	elif args.command in ["similar", "query"]:
+		start = time.perf_counter()
+		if args.command == "similar":
+			matches = similarity_index.similar_to_papers([(args.conference, args.title)], args.k)[0]
+		else:
+			matches = similarity_index.similar_to_texts([args.text], args.k)[0]
+		milliseconds = (time.perf_counter() - start) * 1000
+		print_matches(matches)
+		print(f"{len(matches)} results in {milliseconds:.1f}ms")
+	elif args.command == "reweight":
+		similarity_index.reweight()
+	elif args.command == "stats":
+		for name, value in similarity_index.stats().items():
+			print(f"{name}: {value}")
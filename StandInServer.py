@@ -0,0 +1,218 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import http_client
+
+class StandInServer:
+	"""
+	A local HTTP server answering requests meant for Semantic Scholar, USENIX, the ACM DL and any
+	other recorded host from the fixtures written in record mode, so that fetching and enrichment
+	can be run and timed offline. Point the scrapers at it with http_client.configure(stand_in=...).
+
+	It can add latency, answer bursts of requests with 429s, fail a fraction of requests with
+	a 500 or by dropping the connection, and make up Semantic Scholar results that have no fixture.
+	"""
+	def __init__(
+		self,
+		fixtures_dir=None,
+		port=8765,
+		latency=0,
+		jitter=0,
+		burst_every=0,
+		burst_length=0,
+		retry_after=1,
+		failure_rate=0,
+		drop_rate=0,
+		synthesize=False,
+		seed=None
+	):
+		self.fixtures_dir = fixtures_dir if fixtures_dir is not None else http_client.fixtures_dir
+		self.port = port
+		self.latency = latency
+		self.jitter = jitter
+		# After every burst_every requests, the next burst_length requests get a 429
+		self.burst_every = burst_every
+		self.burst_length = burst_length
+		self.retry_after = retry_after
+		self.failure_rate = failure_rate
+		self.drop_rate = drop_rate
+		self.synthesize = synthesize
+		self.random = random.Random(seed)
+
+		self.lock = threading.Lock()
+		self.stats = {"requests": 0, "served": 0, "rate_limited": 0, "failed": 0, "dropped": 0, "missing": 0}
+		self.server = None
+		self.thread = None
+
+	@property
+	def url(self):
+		return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+	def start(self):
+		"""Serve in a background thread, returning the base URL to configure clients with."""
+		self.server = ThreadingHTTPServer(("127.0.0.1", self.port), StandInRequestHandler)
+		self.server.daemon_threads = True
+		self.server.stand_in = self
+		self.thread = threading.Thread(target=self.server.serve_forever, name="stand-in-server", daemon=True)
+		self.thread.start()
+		return self.url
+
+	def stop(self):
+		self.server.shutdown()
+		self.server.server_close()
+		self.thread.join()
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.stop()
+
+	def count(self, stat):
+		with self.lock:
+			self.stats[stat] += 1
+
+	def next_outcome(self):
+		"""Decide whether the next request is rate limited, failed, dropped or served."""
+		with self.lock:
+			index = self.stats["requests"]
+			self.stats["requests"] += 1
+			roll = self.random.random()
+
+		if self.burst_every > 0 and index % (self.burst_every + self.burst_length) >= self.burst_every:
+			return "rate_limited"
+		if roll < self.drop_rate:
+			return "dropped"
+		if roll < self.drop_rate + self.failure_rate:
+			return "failed"
+		return "served"
+
+	def respond(self, method, path, body):
+		"""
+		Answer a request for path, which starts with the original host as in http_client.rewrite_url.
+		Returns the status code, headers and body, or None to drop the connection.
+		"""
+		delay = self.latency + self.random.uniform(0, self.jitter)
+		if delay > 0:
+			time.sleep(delay)
+
+		outcome = self.next_outcome()
+		if outcome == "rate_limited":
+			self.count("rate_limited")
+			return 429, {"Retry-After": str(self.retry_after)}, "Too Many Requests"
+		if outcome == "dropped":
+			self.count("dropped")
+			return None
+		if outcome == "failed":
+			self.count("failed")
+			return 500, {}, "Injected failure"
+
+		original_url = "https://" + path.lstrip("/")
+		json_data = json.loads(body) if body else None
+
+		fixture = http_client.load_fixture(method, original_url, json_data=json_data, directory=self.fixtures_dir)
+		if fixture is not None:
+			self.count("served")
+			return fixture["status"], fixture["headers"], fixture["text"]
+
+		if self.synthesize:
+			synthesized = synthesize_semantic_scholar_response(original_url, json_data)
+			if synthesized is not None:
+				self.count("served")
+				return 200, {"Content-Type": "application/json"}, json.dumps(synthesized)
+
+		self.count("missing")
+		return 404, {}, f"No fixture for {method} {original_url}"
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+
+	def handle_request(self, method):
+		length = int(self.headers.get("Content-Length") or 0)
+		body = self.rfile.read(length).decode() if length > 0 else ""
+
+		response = self.server.stand_in.respond(method, self.path, body)
+		if response is None:
+			self.close_connection = True
+			self.connection.close()
+			return
+
+		status_code, headers, text = response
+		content = text.encode()
+		self.send_response(status_code)
+		for name, value in headers.items():
+			self.send_header(name, value)
+		self.send_header("Content-Length", str(len(content)))
+		self.end_headers()
+		self.wfile.write(content)
+
+	def do_GET(self):
+		self.handle_request("GET")
+
+	def do_POST(self):
+		self.handle_request("POST")
+
+	def log_message(self, format, *args):
+		pass
+
+def synthesize_semantic_scholar_paper(title, doi=""):
+	paper_id = hashlib.sha1((title or doi).encode()).hexdigest()
+	return {
+		"paperId": paper_id,
+		"title": title,
+		"abstract": f"Synthetic abstract of {title or doi}.",
+		"url": f"https://www.semanticscholar.org/paper/{paper_id}",
+		"externalIds": {"DOI": doi} if doi != "" else {},
+		"openAccessPdf": None,
+	}
+
+def synthesize_semantic_scholar_response(url, json_data=None):
+	"""Make up a plausible answer to a Semantic Scholar search, bulk search or batch request, or None for other URLs."""
+	parsed = urlparse(url)
+	if parsed.netloc != "api.semanticscholar.org":
+		return None
+
+	query = parse_qs(parsed.query).get("query", [""])[0]
+	if parsed.path == "/graph/v1/paper/search":
+		return {"total": 1, "offset": 0, "data": [synthesize_semantic_scholar_paper(query)]}
+	if parsed.path == "/graph/v1/paper/search/bulk":
+		titles = re.findall(r'"([^"]*)"', query)
+		return {"total": len(titles), "data": [synthesize_semantic_scholar_paper(title) for title in titles]}
+	if parsed.path == "/graph/v1/paper/batch" and json_data is not None:
+		dois = [paper_id.removeprefix("DOI:") for paper_id in json_data.get("ids", [])]
+		return [synthesize_semantic_scholar_paper("", doi) for doi in dois]
+	return None
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Serve recorded fixtures as a local stand-in for the scraped hosts")
+	parser.add_argument("--fixtures-dir", default=None, help=f"default: {http_client.fixtures_dir}")
+	parser.add_argument("--port", type=int, default=8765)
+	parser.add_argument("--latency", type=float, default=0, help="Seconds added to every response")
+	parser.add_argument("--jitter", type=float, default=0, help="Up to this many more seconds, chosen at random")
+	parser.add_argument("--burst-every", type=int, default=0, help="Requests between bursts of 429s (0 disables bursts)")
+	parser.add_argument("--burst-length", type=int, default=0, help="Requests answered with 429 per burst")
+	parser.add_argument("--retry-after", type=float, default=1)
+	parser.add_argument("--failure-rate", type=float, default=0, help="Fraction of requests answered with a 500")
+	parser.add_argument("--drop-rate", type=float, default=0, help="Fraction of connections closed without a response")
+	parser.add_argument("--synthesize", action="store_true", help="Make up Semantic Scholar results that have no fixture")
+	parser.add_argument("--seed", type=int, default=None)
+	args = parser.parse_args()
+
+	stand_in = StandInServer(
+		args.fixtures_dir, args.port, args.latency, args.jitter, args.burst_every, args.burst_length,
+		args.retry_after, args.failure_rate, args.drop_rate, args.synthesize, args.seed
+	)
+	print(f"Serving {stand_in.fixtures_dir} at {stand_in.start()}, stop with Ctrl-C")
+	try:
+		while True:
+			time.sleep(1)
+	except KeyboardInterrupt:
+		stand_in.stop()
+	print(json.dumps(stand_in.stats, indent=2))
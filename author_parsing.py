@@ -0,0 +1,95 @@
+import re
+import sys
+from functools import lru_cache
+
+# Author list layouts of the scraped sites:
+#   "usenix"  OSDI, NSDI and ATC: "A, B, and C, Inst; D, Other Inst"
+#   "mlsys"   MLSys and NeurIPS calendars: "A · B · C", with no institutions
+#   "auto"    SOSP and EuroSys, which either put each institution in parentheses after its authors,
+#             "A, B (Inst), C (Other Inst)", or only list names, "A, B and C"
+usenix_venues = {"osdi", "nsdi", "atc", "osdi_atc", "usenix"}
+mlsys_venues = {"mlsys", "neurips", "icml", "iclr"}
+
+# Words that mark a comma separated part of a USENIX author list as the start of the institution,
+# so that "University of California, Berkeley" stays one institution
+institution_words = re.compile(
+    r"\b(University|Universit\w*|Institute|Institut|College|School|Laborator\w*|Labs?|Research|Inc\.?|Corp\.?|"
+    r"Corporation|Ltd\.?|LLC|Academy|Center|Centre|Foundation|Technolog\w*|Department|National|Polytechnic|ETH|EPFL)\b"
+)
+# Company suffixes written after a comma, as in "Google, Inc.", which belong to the part before them
+company_suffix = re.compile(r"(Inc|Ltd|LLC|Corp|Co|GmbH|AG|S\.?A|PLC)\.?", re.IGNORECASE)
+name_separators = re.compile(r"\s*,\s*(?:and\s+)?|\s+and\s+|\s*&\s*|\s*·\s*|\s*\|\s*")
+parenthesized_institution = re.compile(r"([^()]*)\(([^()]*)\)")
+
+def intern_text(text):
+    return sys.intern(" ".join(text.split()))
+
+def author_style(conference_name):
+    """The author list layout of a conference such as "osdi24" or "neurips24"."""
+    venue = re.sub(r"_?\d+$", "", conference_name)
+    if venue in usenix_venues:
+        return "usenix"
+    if venue in mlsys_venues:
+        return "mlsys"
+    return "auto"
+
+def split_names(names):
+    return [name for name in name_separators.split(names.strip()) if name != "" and name != "and"]
+
+def parse_usenix_group(group):
+    """One ";" separated group of a USENIX list: names, then the institution they share."""
+    parts = [part.strip() for part in group.split(",") if part.strip() != ""]
+    if len(parts) == 0:
+        return []
+    if len(parts) == 1:
+        return [(part, "") for part in split_names(parts[0])]
+
+    institution_start = len(parts) - 1
+    for position in range(1, len(parts) - 1):
+        if institution_words.search(parts[position]):
+            institution_start = position
+            break
+    if institution_start > 1 and company_suffix.fullmatch(parts[institution_start]):
+        institution_start -= 1
+    institution = ", ".join(parts[institution_start:])
+    return [(name, institution) for name in split_names(", ".join(parts[:institution_start]))]
+
+def parse_parenthesized(authors):
+    """Names followed by their institution in parentheses, which applies to every name since the previous one."""
+    pairs = []
+    end = 0
+    for match in parenthesized_institution.finditer(authors):
+        pairs.extend([(name, match.group(2).strip()) for name in split_names(match.group(1))])
+        end = match.end()
+    pairs.extend([(name, "") for name in split_names(authors[end:])])
+    return pairs
+
+@lru_cache(maxsize=1 << 16)
+def parse_author_pairs(authors, style="auto"):
+    """
+    Parse a raw author list into a tuple of (name, institution) pairs, with "" for an unknown
+    institution. Names and institutions are interned, as the same few thousand recur across
+    every conference, and results are cached since author lists are parsed again on every ingest.
+    """
+    if style == "usenix":
+        pairs = [pair for group in authors.split(";") for pair in parse_usenix_group(group)]
+    elif style == "mlsys":
+        pairs = [(name, "") for name in split_names(authors)]
+    elif "(" in authors:
+        pairs = parse_parenthesized(authors)
+    elif ";" in authors:
+        pairs = [pair for group in authors.split(";") for pair in parse_usenix_group(group)]
+    else:
+        pairs = [(name, "") for name in split_names(authors)]
+    return tuple([(intern_text(name), intern_text(institution)) for name, institution in pairs if name.strip() != ""])
+
+def parse_authors(authors, style="auto"):
+    """
+    Parse authors as scraped into a list of {"name", "institution"} records. Lists that are already
+    parsed are returned with their strings interned.
+    """
+    if isinstance(authors, list):
+        return [{"name": intern_text(author["name"]), "institution": intern_text(author.get("institution") or "")} for author in authors]
+    if authors is None or authors.strip() == "":
+        return []
+    return [{"name": name, "institution": institution} for name, institution in parse_author_pairs(authors, style)]
@@ -0,0 +1,362 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from unittest import mock
+from bs4 import SoupStrainer
+import html_parsing
+from html_parsing import make_soup
+from retrieve_webpage import get_cache_key, read_cached_webpage
+import scrape_eurosys
+import scrape_eurosys22
+import scrape_sosp24
+import scrape_sosp_old
+import MLSysScraper
+import EuroSys25ConferenceScraper
+from OsdiAtcNsdiConferenceScraper import OsdiAtcNsdiConferenceScraper
+from Paper import Paper
+from utils import structural_diff, print_structural_diff
+
+fixtures_dir = "benchmark_fixtures"
+baseline_path = os.path.join(fixtures_dir, "baseline.json")
+
+def no_infos(titles):
+    """Stands in for get_infos_from_semantic_scholar so that no parser touches the network."""
+    return {title: {"abstract": "", "link": "", "doi": "", "open_access_pdf": ""} for title in titles}
+
+def count_papers(result):
+    """Papers in a parser's result, either {session title: papers} or a list of papers."""
+    if isinstance(result, dict):
+        return sum([len(papers) for papers in result.values()])
+    return len(result)
+
+def result_to_json(result):
+    if isinstance(result, dict):
+        return {session_title: result_to_json(papers) for session_title, papers in result.items()}
+    return [paper.to_json() if isinstance(paper, Paper) else paper for paper in result]
+
+def run_osdi_parse_paper(html):
+    strategy = OsdiAtcNsdiConferenceScraper("osdi_atc25")
+    soup = make_soup(html, strategy.top_level_parse_only)
+    return [strategy.parse_paper(paper_div) for paper_div in soup.find_all('article', class_='node-paper')]
+
+def run_mlsys_link_to_papers(html):
+    with mock.patch.object(MLSysScraper, "get_cached_webpage", lambda url: html):
+        return list(MLSysScraper.MLSysScraper("mlsys24").link_to_papers("https://mlsys.org/virtual/2024/session/0"))
+
+def run_eurosys25_link_to_papers(html):
+    with mock.patch.object(EuroSys25ConferenceScraper, "get_cached_webpage", lambda url: html):
+        return EuroSys25ConferenceScraper.EuroSys25ConferenceScraper().link_to_papers("https://download.vusec.net/talk/0")
+
+def run_sosp_old(html):
+    with mock.patch.object(scrape_sosp_old, "get_infos_from_semantic_scholar", no_infos):
+        soup = make_soup(html, SoupStrainer('div', class_='program'))
+        return scrape_sosp_old.parse_document_sosp_old(soup, "sosp23")
+
+def run_eurosys(html):
+    with mock.patch.object(scrape_eurosys, "get_infos_from_semantic_scholar", no_infos):
+        soup = make_soup(html, SoupStrainer('td', class_='sch'), backend="html.parser")
+        return scrape_eurosys.parse_document_eurosys(soup, "eurosys24")
+
+def run_eurosys22(html):
+    with mock.patch.object(scrape_eurosys22, "get_infos_from_semantic_scholar", no_infos):
+        return scrape_eurosys22.parse_document_eurosys22(make_soup(html), "eurosys22")
+
+def run_sosp24(html):
+    with mock.patch.object(scrape_sosp24, "get_infos_from_semantic_scholar", no_infos):
+        return scrape_sosp24.parse_document_sosp24(make_soup(html))
+
+def filler(count):
+    """Navigation and footer markup that the parsers have to skip over, as on the real pages."""
+    return "".join([f'<div class="menu-item"><a href="/page/{i}">Menu entry {i}</a><span>Some text {i}</span></div>' for i in range(count)])
+
+def abstract(i):
+    return " ".join([f"Sentence {j} of the abstract of paper {i} describing a system that is fast and correct." for j in range(8)])
+
+def synthesize_usenix(sessions=12, papers_per_session=6):
+    body = []
+    for s in range(sessions):
+        papers = "".join([
+            f'<article class="node node-paper"><h2><a href="/conference/osdi25/presentation/paper-{s}-{p}">Paper {s}-{p}: A System for Things</a></h2>'
+            f'<div class="field-name-field-paper-people-text"><p>Ada Lovelace and Alan Turing, University {p}; Grace Hopper, Institute {s}</p></div>'
+            f'<div class="field-name-field-paper-description-long"><p>{abstract(p)}</p><p>{abstract(s)}</p></div></article>'
+            for p in range(papers_per_session)
+        ])
+        body.append(f'<article class="node node-session"><h2>Session {s}: Topic</h2>{papers}</article>')
+    return f"<html><body>{filler(300)}{''.join(body)}{filler(300)}</body></html>"
+
+def synthesize_mlsys(papers=20):
+    cards = "".join([
+        f'<div class="track-schedule-card"><h5><a href="/virtual/2024/poster/{p}">Paper {p}: Learning Things</a></h5>'
+        f'<p class="text-muted">Ada Lovelace, Alan Turing, Grace Hopper</p><div class="abstract">{abstract(p)}</div></div>'
+        for p in range(papers)
+    ])
+    return f"<html><body>{filler(300)}{cards}{filler(300)}</body></html>"
+
+def synthesize_eurosys25(papers=6):
+    paragraphs = "<p>Session chair: Ada Lovelace</p>" + "".join([
+        f'<p><strong>Paper {p}: Operating Things</strong> Alan Turing, Grace Hopper <a href="https://doi.org/10.1145/{p}">Paper</a></p>'
+        for p in range(papers)
+    ])
+    return f'<html><body>{filler(300)}<section class="description">{paragraphs}</section>{filler(300)}</body></html>'
+
+def synthesize_sosp_old(sessions=12, papers_per_session=4):
+    rows = []
+    for s in range(sessions):
+        rows.append(f'<tr class="info"><td><strong>Session {s}: Topic</strong></td></tr>')
+        for p in range(papers_per_session):
+            rows.append(f'<tr><td><a href="https://doi.org/10.1145/{s}.{p}">Paper {s}-{p}: Kernels</a></td></tr>')
+            rows.append(f'<tr><td>Ada Lovelace (University {p}), Alan Turing (Institute {s})</td></tr>')
+        rows.append('<tr class="success"><td>Break</td></tr>')
+    rows.append('<tr class="info"><td><strong>Closing</strong></td></tr>')
+    program = f'<div class="program"><div class="col-md-12">Days</div><div class="col-md-12"><table class="table-spread">{"".join(rows)}</table></div></div>'
+    return f"<html><body>{filler(300)}{program}{filler(300)}</body></html>"
+
+def synthesize_eurosys(sessions=12, papers_per_session=5):
+    tds = []
+    for s in range(sessions):
+        # The real page leaves list items unclosed, so the first item holds the whole list
+        items = "".join([f"<li>Paper {s}-{p}: Storage Things\n<small>Ada Lovelace, Alan Turing (University {p})</small>\n" for p in range(papers_per_session)])
+        tds.append(f'<td class="sch" id="session_{s}"><strong>Session {s}: Topic (Room {s})</strong><ul>{items}</ul></td>')
+    return f"<html><body>{filler(300)}<table><tr>{''.join(tds)}</tr></table>{filler(300)}</body></html>"
+
+def synthesize_eurosys22(sessions=12, papers_per_session=5):
+    body = []
+    for s in range(sessions):
+        items = "".join([f'<li><a href="https://doi.org/10.1145/{s}.{p}">Paper {s}-{p}: Distributed Things</a> <i>Ada Lovelace, Alan Turing</i></li>' for p in range(papers_per_session)])
+        body.append(f'<h5 id="session-{s}">Session {s} – Topic {s}</h5><ul>{items}</ul>')
+    return f'<html><body>{filler(300)}<div class="entry-content">{"".join(body)}</div>{filler(300)}</body></html>'
+
+def synthesize_sosp24():
+    # parse_document_sosp24 hard-codes the number of papers in each session
+    body = []
+    for s, papers in enumerate([4, 4, 5, 4, 4, 4, 5, 4, 4, 5]):
+        body.append(f'<h4 class="sch">Session {s}: Topic\nRoom {s}</h4>')
+        for p in range(papers):
+            body.append(f'<p><a href="assets/papers/{s}-{p}.pdf">Paper {s}-{p}: Verified Things</a></p><em>Ada Lovelace, Alan Turing</em>')
+    return f'<html><body>{filler(300)}<section id="schedule"><div class="container">{"".join(body)}</div></section>{filler(300)}</body></html>'
+
+def first_session_link(strategy, top_level_url):
+    """The first session page of a ScrapingStrategy1 conference, as a (url, html) pair from the cache."""
+    top_level_html = read_cached_webpage(top_level_url, get_cache_key(top_level_url))
+    if top_level_html is None:
+        return top_level_url, None
+    session_link = next(iter(strategy.extract_session_titles_and_links(make_soup(top_level_html, strategy.top_level_parse_only))))[1]
+    return session_link, read_cached_webpage(session_link, get_cache_key(session_link))
+
+def cached_page(url):
+    return url, read_cached_webpage(url, get_cache_key(url))
+
+class BenchmarkCase:
+    def __init__(self, name, run, synthesize, pin):
+        self.name = name
+        self.run = run
+        self.synthesize = synthesize
+        # Returns the (url, html) of the real page to pin from the cache, with None as html if it is not cached
+        self.pin = pin
+
+    @property
+    def fixture_path(self):
+        return os.path.join(fixtures_dir, f"{self.name}.html")
+
+benchmark_cases = [
+    BenchmarkCase("osdi_parse_paper", run_osdi_parse_paper, synthesize_usenix,
+        lambda: cached_page("https://www.usenix.org/conference/osdi25/technical-sessions")),
+    BenchmarkCase("mlsys_link_to_papers", run_mlsys_link_to_papers, synthesize_mlsys,
+        lambda: first_session_link(MLSysScraper.MLSysScraper("mlsys24"), "https://mlsys.org/virtual/2024/calendar")),
+    BenchmarkCase("eurosys25_link_to_papers", run_eurosys25_link_to_papers, synthesize_eurosys25,
+        lambda: first_session_link(EuroSys25ConferenceScraper.EuroSys25ConferenceScraper(), "https://download.vusec.net/asplos-eurosys-2025/schedule/nojs")),
+    BenchmarkCase("parse_document_sosp_old", run_sosp_old, synthesize_sosp_old,
+        lambda: cached_page("https://sosp2023.mpi-sws.org/program.html")),
+    BenchmarkCase("parse_document_eurosys", run_eurosys, synthesize_eurosys,
+        lambda: cached_page("https://2024.eurosys.org/program.html")),
+    BenchmarkCase("parse_document_eurosys22", run_eurosys22, synthesize_eurosys22,
+        lambda: cached_page("https://2022.eurosys.org/index.html@p=494.html")),
+    BenchmarkCase("parse_document_sosp24", run_sosp24, synthesize_sosp24,
+        lambda: cached_page("https://sigops.org/s/conferences/sosp/2024/schedule.html")),
+]
+
+def write_fixture(case, html):
+    os.makedirs(fixtures_dir, exist_ok=True)
+    with open(case.fixture_path, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+def pin_fixtures(synthesize_missing=False):
+    """Copy each parser's real page from the webpage cache into the fixtures, never fetching anything."""
+    for case in benchmark_cases:
+        url, html = case.pin()
+        if html is not None:
+            write_fixture(case, html)
+            print(f"Pinned {case.name} from {url}")
+        elif synthesize_missing:
+            write_fixture(case, case.synthesize())
+            print(f"Synthesized {case.name}, {url} is not cached")
+        else:
+            print(f"Skipped {case.name}, {url} is not cached")
+
+def benchmark_case(case, repeats):
+    """Time per page (median over repeats) and the peak memory of one more run, both with output silenced."""
+    with open(case.fixture_path, 'r', encoding='utf-8') as f:
+        html = f.read()
+
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        # The first run warms up imports and bs4's internals and is not timed
+        papers = count_papers(case.run(html))
+        for _ in range(repeats):
+            start = time.perf_counter()
+            case.run(html)
+            times.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        case.run(html)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    seconds_per_page = statistics.median(times)
+    return {
+        "papers": papers,
+        "page_bytes": len(html.encode()),
+        "ms_per_page": seconds_per_page * 1000,
+        "papers_per_second": papers / seconds_per_page if seconds_per_page > 0 else 0,
+        "peak_mib": peak / 2 ** 20,
+    }
+
+def compare_backends(backends, names=None):
+    """
+    Check that each fixture parses to exactly the same output with every backend as with
+    html.parser. Returns the names of the parsers whose output differs.
+    """
+    different = []
+    for case in benchmark_cases:
+        if names and case.name not in names:
+            continue
+        if not os.path.exists(case.fixture_path):
+            print(f"No fixture for {case.name}, run `python benchmark_parsers.py pin` first")
+            continue
+        with open(case.fixture_path, 'r', encoding='utf-8') as f:
+            html = f.read()
+
+        outputs = {}
+        for backend in ["html.parser"] + [backend for backend in backends if backend != "html.parser"]:
+            html_parsing.set_html_parser_backend(backend)
+            with contextlib.redirect_stdout(io.StringIO()):
+                try:
+                    outputs[backend] = result_to_json(case.run(html))
+                except Exception as e:
+                    outputs[backend] = {f"failed: {type(e).__name__}: {e}": []}
+
+        expected = json.dumps(outputs["html.parser"], indent=2, ensure_ascii=False)
+        for backend, output in outputs.items():
+            if json.dumps(output, indent=2, ensure_ascii=False) == expected:
+                continue
+            print(f"{case.name}: {backend} differs from html.parser")
+            as_sessions = lambda result: result if isinstance(result, dict) else {"": result}
+            print_structural_diff(structural_diff(as_sessions(outputs["html.parser"]), as_sessions(output)))
+            different.append(case.name)
+        if case.name not in different:
+            print(f"{case.name}: identical with {', '.join(outputs)}")
+    return different
+
+def relative_change(new, old):
+    return f"{(new - old) / old * 100:+.0f}%" if old else ""
+
+def run_benchmarks(names=None, repeats=5):
+    results = {}
+    for case in benchmark_cases:
+        if names and case.name not in names:
+            continue
+        if not os.path.exists(case.fixture_path):
+            print(f"No fixture for {case.name}, run `python benchmark_parsers.py pin` first")
+            continue
+        results[case.name] = benchmark_case(case, repeats)
+    return results
+
+def print_results(results, baseline):
+    print(f"{'parser':<28} {'papers':>6} {'ms/page':>9} {'papers/s':>9} {'peak MiB':>9} {'time':>6} {'memory':>6}")
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is not None and old["page_bytes"] != result["page_bytes"]:
+            # A different fixture makes the comparison meaningless
+            old = None
+        print(
+            f"{name:<28} {result['papers']:>6} {result['ms_per_page']:>9.1f} {result['papers_per_second']:>9.0f} {result['peak_mib']:>9.1f}"
+            f" {relative_change(result['ms_per_page'], old['ms_per_page']) if old else '':>6}"
+            f" {relative_change(result['peak_mib'], old['peak_mib']) if old else '':>6}"
+        )
+
+def load_baseline():
+    """The stored results, by backend and then by parser."""
+    if not os.path.exists(baseline_path):
+        return {}
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def changed_outputs(results, baseline):
+    """Names of the parsers that found a different number of papers than the baseline did on the same fixture."""
+    return [
+        name for name, result in results.items()
+        if name in baseline and baseline[name]["page_bytes"] == result["page_bytes"]
+        and result["papers"] != baseline[name]["papers"]
+    ]
+
+def regressions(results, baseline, threshold_percent):
+    """Names of the parsers that got slower than the baseline by more than threshold_percent."""
+    return [
+        name for name, result in results.items()
+        if name in baseline and baseline[name]["page_bytes"] == result["page_bytes"]
+        and result["ms_per_page"] > baseline[name]["ms_per_page"] * (1 + threshold_percent / 100)
+    ]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the HTML parsers against pinned fixtures")
+    parser.add_argument("command", nargs="?", choices=["run", "pin", "synthesize", "compare"], default="run")
+    parser.add_argument("--backend", choices=html_parsing.html_parser_backends, default=None, help="HTML parser backend to benchmark, or to compare with html.parser (every installed one by default)")
+    parser.add_argument("--parsers", nargs="*", default=None, help="Only benchmark these parsers")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--synthesize-missing", action="store_true", help="When pinning, synthesize the pages that are not cached")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Store the results in {baseline_path}")
+    parser.add_argument("--fail-above", type=float, default=None, help="Exit with an error if a parser is this many percent slower than the baseline")
+    args = parser.parse_args()
+    if args.backend is not None:
+        html_parsing.set_html_parser_backend(args.backend)
+
+    if args.command == "compare":
+        backends = [args.backend] if args.backend is not None else html_parsing.available_html_parser_backends()
+        if len(compare_backends(backends, args.parsers)) > 0:
+            exit(1)
+    elif args.command == "pin":
+        pin_fixtures(args.synthesize_missing)
+    elif args.command == "synthesize":
+        for case in benchmark_cases:
+            write_fixture(case, case.synthesize())
+        print(f"Synthesized {len(benchmark_cases)} fixtures in {fixtures_dir}/")
+    else:
+        baselines = load_baseline()
+        baseline = baselines.get(html_parsing.html_parser_backend, {})
+        if len(baseline) == 0:
+            print(f"No baseline for the {html_parsing.html_parser_backend} backend in {baseline_path}")
+
+        results = run_benchmarks(args.parsers, args.repeats)
+        print_results(results, baseline)
+
+        if args.save_baseline:
+            baselines[html_parsing.html_parser_backend] = {**baseline, **results}
+            with open(baseline_path, 'w', encoding='utf-8') as f:
+                json.dump(baselines, f, indent=4)
+                f.write("\n")
+            print(f"Saved baseline to {baseline_path}")
+
+        changed = changed_outputs(results, baseline)
+        if len(changed) > 0:
+            print(f"Found a different number of papers than the baseline: {', '.join(changed)}")
+            exit(1)
+        if args.fail_above is not None:
+            slower = regressions(results, baseline, args.fail_above)
+            if len(slower) > 0:
+                print(f"Slower than the baseline by more than {args.fail_above:.0f}%: {', '.join(slower)}")
+                exit(1)
@@ -0,0 +1,65 @@
+import argparse
+import contextlib
+import io
+import json
+import html_parsing
+import ParseCache
+from conference_registry import conference_jobs, parse_manifest
+from retrieve_webpage import is_webpage_cached
+from FetchPlan import FetchPlan, planning
+from Paper import encode_sessions, Paper
+from utils import structural_diff, print_structural_diff
+
+def parse_from_cache(name, backend):
+    """
+    Re-parse a conference from the webpage cache with the given backend, without fetching anything
+    and without the parse cache. Returns its sessions in the layout of the JSON outputs, or None if
+    its top-level page is not cached.
+    """
+    job = conference_jobs[name]
+    if not is_webpage_cached(job.url):
+        return None
+
+    html_parsing.set_html_parser_backend(backend)
+    with planning(FetchPlan()), contextlib.redirect_stdout(io.StringIO()):
+        if job.strategy is not None:
+            scraper = job.create_scraper()
+            scraper.extract()
+            return encode_sessions(scraper.sessions)
+        sessions = job.scrape(job.url)
+    return {
+        session_title: [paper.to_json() if isinstance(paper, Paper) else paper for paper in papers]
+        for session_title, papers in sessions.items()
+    }
+
+def check_conference(name, backend, baseline_backend="html.parser"):
+    """Whether the conference's output with backend is exactly the same as with baseline_backend. None if it is not cached."""
+    expected = parse_from_cache(name, baseline_backend)
+    if expected is None:
+        print(f"{name}: not cached, skipped")
+        return None
+    actual = parse_from_cache(name, backend)
+
+    if json.dumps(actual, indent=2, ensure_ascii=False) == json.dumps(expected, indent=2, ensure_ascii=False):
+        print(f"{name}: identical with {baseline_backend} and {backend}")
+        return True
+    print(f"{name}: {backend} differs from {baseline_backend}")
+    print_structural_diff(structural_diff(expected, actual))
+    return False
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that a parser backend gives the same output as html.parser on the cached pages")
+    parser.add_argument("manifest", nargs="?", default=None, help='e.g. "osdi20-25, sosp19-24", every conference by default')
+    parser.add_argument("--backend", choices=html_parsing.html_parser_backends, default=None, help="Every installed backend by default")
+    parser.add_argument("--baseline-backend", choices=html_parsing.html_parser_backends, default="html.parser")
+    args = parser.parse_args()
+
+    # Results memoized under one backend must not stand in for the other's
+    ParseCache.USE_PARSE_CACHE = False
+    names = parse_manifest(args.manifest) if args.manifest is not None else list(conference_jobs)
+    backends = [args.backend] if args.backend is not None else [
+        backend for backend in html_parsing.available_html_parser_backends() if backend != args.baseline_backend
+    ]
+    results = [check_conference(name, backend, args.baseline_backend) for name in names for backend in backends]
+    if False in results:
+        exit(1)
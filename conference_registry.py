@@ -0,0 +1,192 @@
+import re
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dotenv import load_dotenv
+from retrieve_webpage import is_webpage_cached
+from RunMetrics import get_run_metrics, reset_run_metrics
+from FetchPlan import FetchPlan, planning
+from saving import save_to_notion_format, save_to_json, save_to_jsonl, JsonlWriter
+from ScrapingStrategies import AbstractScrapingStrategy1
+from ConferenceScraper import ConferenceScraper
+from OsdiAtcNsdiConferenceScraper import OsdiAtcNsdiConferenceScraper
+from MLSysScraper import MLSysScraper
+from EuroSys25ConferenceScraper import EuroSys25ConferenceScraper
+from scrape_osdi_atc_nsdi import scrape_sessions
+from scrape_sosp24 import scrape_sessions_sosp24
+from scrape_sosp_old import scrape_sessions_sosp_old
+from scrape_eurosys import scrape_sessions_eurosys
+from scrape_eurosys22 import scrape_sessions_eurosys22
+
+class ConferenceJob:
+    """
+    A conference to scrape, either with a scraping strategy through ConferenceScraper or with one
+    of the legacy scrape_* functions. Nothing is constructed or fetched until the job is run.
+    """
+    def __init__(self, name, url, strategy=None, scrape=None):
+        assert (strategy is None) != (scrape is None), "Exactly one of strategy or scrape must be set"
+        self.name = name
+        self.url = url
+        self.strategy = strategy
+        self.scrape = scrape
+
+    def create_scraper(self):
+        strategy = self.strategy()
+        if isinstance(strategy, AbstractScrapingStrategy1):
+            return ConferenceScraper(self.name, self.url, scraping_strategy1=strategy)
+        return ConferenceScraper(self.name, self.url, scraping_strategy2=strategy)
+
+    def run(self, force_overwrite=False, jsonl=False, merge=False, resume=False, stream=False):
+        """
+        Scrape and save the conference. With jsonl, papers are also streamed to jsonl_format/ as they are finalized.
+        With resume, a strategy continues from the journal of an earlier run that did not finish.
+        With stream, a strategy's papers are only written to jsonl_format/ and never all held at once,
+        so the JSON and Notion outputs, which need the whole conference, are not written.
+        """
+        if self.strategy is not None:
+            scraper = self.create_scraper()
+            if stream:
+                with JsonlWriter(self.name) as writer:
+                    scraper.extract(writer, resume=resume, stream=True)
+                get_run_metrics().save(self.name)
+                print(f"Streamed {self.name} to jsonl_format/")
+                return
+            if jsonl:
+                with JsonlWriter(self.name) as writer:
+                    scraper.extract(writer, resume=resume)
+            else:
+                scraper.extract(resume=resume)
+            scraper.save_sessions(force_overwrite, merge)
+        else:
+            # Parse time of the legacy scrapers leaves out their fetching and enrichment, as for strategies
+            with reset_run_metrics().parsing("scrape"):
+                data = self.scrape(self.url)
+            save_to_json(data, f"{self.name}_sessions.json")
+            save_to_notion_format(data, f"{self.name}_sessions.notion.txt")
+            if jsonl:
+                save_to_jsonl(data, self.name, f"{self.name}_sessions.jsonl")
+            get_run_metrics().save(self.name)
+            print(f"Scraping completed successfully! ({self.name}_sessions)")
+
+    def plan(self):
+        """Work out the fetches a run would make, using only cached pages. Returns a FetchPlan."""
+        if self.strategy is not None:
+            return self.create_scraper().plan()
+
+        fetch_plan = FetchPlan()
+        with planning(fetch_plan):
+            if not is_webpage_cached(self.url):
+                fetch_plan.add(self.url, False)
+                fetch_plan.note(f"{self.url} is not cached, so its sessions and papers are unknown")
+            else:
+                self.scrape(self.url)
+        return fetch_plan
+
+conference_jobs = {}
+
+def register(job):
+    conference_jobs[job.name] = job
+
+for year in range(20, 26):
+    register(ConferenceJob(f"osdi{year}", f"https://www.usenix.org/conference/osdi{year}/technical-sessions", scrape=lambda url: scrape_sessions(url, "osdi")))
+    register(ConferenceJob(f"nsdi{year}", f"https://www.usenix.org/conference/nsdi{year}/technical-sessions", scrape=lambda url: scrape_sessions(url, "nsdi")))
+for year in range(20, 25):
+    register(ConferenceJob(f"atc{year}", f"https://www.usenix.org/conference/atc{year}/technical-sessions", scrape=lambda url: scrape_sessions(url, "atc")))
+
+register(ConferenceJob("osdi_atc25", "https://www.usenix.org/conference/osdi25/technical-sessions", strategy=lambda: OsdiAtcNsdiConferenceScraper("osdi_atc25")))
+
+register(ConferenceJob("sosp24", "https://sigops.org/s/conferences/sosp/2024/schedule.html", scrape=scrape_sessions_sosp24))
+register(ConferenceJob("sosp23", "https://sosp2023.mpi-sws.org/program.html", scrape=lambda url: scrape_sessions_sosp_old(url, "sosp23")))
+register(ConferenceJob("sosp21", "https://sosp2021.mpi-sws.org/program.html", scrape=lambda url: scrape_sessions_sosp_old(url, "sosp21")))
+register(ConferenceJob("sosp19", "https://www.sigops.org/s/conferences/sosp/2019/program.html", scrape=lambda url: scrape_sessions_sosp_old(url, "sosp19")))
+
+register(ConferenceJob("eurosys25", "https://download.vusec.net/asplos-eurosys-2025/schedule/nojs", strategy=EuroSys25ConferenceScraper))
+register(ConferenceJob("eurosys24", "https://2024.eurosys.org/program.html", scrape=lambda url: scrape_sessions_eurosys(url, "eurosys24")))
+register(ConferenceJob("eurosys23", "https://2023.eurosys.org/program.html", scrape=lambda url: scrape_sessions_eurosys(url, "eurosys23")))
+register(ConferenceJob("eurosys22", "https://2022.eurosys.org/index.html@p=494.html", scrape=lambda url: scrape_sessions_eurosys22(url, "eurosys22")))
+register(ConferenceJob("eurosys21", "https://2021.eurosys.org/papers.html#papers", scrape=lambda url: scrape_sessions_eurosys22(url, "eurosys21")))
+
+register(ConferenceJob("mlsys24", "https://mlsys.org/virtual/2024/calendar", strategy=lambda: MLSysScraper("mlsys24")))
+register(ConferenceJob("neurips24", "https://neurips.cc/virtual/2024/calendar", strategy=lambda: MLSysScraper("neurips24")))
+
+def parse_manifest(manifest):
+    """
+    Expand a manifest such as "osdi20-25, nsdi20-25, sosp19-24, mlsys24" into registered job names.
+    Years in a range that have no registered job (e.g. sosp20) are skipped.
+    """
+    names = []
+    for entry in manifest.split(","):
+        entry = entry.strip()
+        if entry == "":
+            continue
+
+        if entry in conference_jobs:
+            names.append(entry)
+            continue
+
+        match = re.fullmatch(r"([a-z_]+)(\d+)-(\d+)", entry)
+        if match is None:
+            raise ValueError(f"Unknown conference in manifest: {entry}")
+
+        prefix, first_year, last_year = match.group(1), int(match.group(2)), int(match.group(3))
+        expanded = [f"{prefix}{year}" for year in range(first_year, last_year + 1) if f"{prefix}{year}" in conference_jobs]
+        if len(expanded) == 0:
+            raise ValueError(f"No registered conferences match {entry}")
+        names.extend(expanded)
+
+    return list(dict.fromkeys(names))
+
+def plan_jobs(names):
+    """
+    Print the plan of each job and of the whole run. Planning makes no requests, so the jobs are
+    planned one after another in this process. Returns the combined FetchPlan.
+    """
+    total_plan = FetchPlan()
+    for name in names:
+        fetch_plan = conference_jobs[name].plan()
+        fetch_plan.print_report(name)
+        total_plan.merge(fetch_plan)
+
+    # Hosts are shared between the conferences of a run, so the total is not the sum of the estimates
+    total_plan.notes = []
+    total_plan.print_report(f"{len(names)} conferences")
+    return total_plan
+
+def init_worker():
+    load_dotenv()
+
+def run_job(name, force_overwrite=False, jsonl=False, merge=False, resume=False, stream=False):
+    """Run one job, returning the traceback if it failed rather than raising."""
+    try:
+        conference_jobs[name].run(force_overwrite, jsonl, merge, resume, stream)
+        return None
+    except BaseException:
+        # A diff against the existing output, or any other failure, should only fail this conference
+        return traceback.format_exc()
+
+def run_jobs(names, processes=4, force_overwrite=False, jsonl=False, merge=False, resume=False, stream=False):
+    """
+    Run jobs in a process pool. The workers share each host's rate limit through the RateLimiter
+    file in the cache directory. A failing conference does not stop the others. Returns a dict
+    from the names of failed jobs to their tracebacks.
+    """
+    failures = {}
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker) as executor:
+        futures = {executor.submit(run_job, name, force_overwrite, jsonl, merge, resume, stream): name for name in names}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                error = future.result()
+            except Exception:
+                # The worker process itself died
+                error = traceback.format_exc()
+
+            if error is None:
+                print(f"Finished {name}")
+            else:
+                print(f"Failed {name}:\n{error}")
+                failures[name] = error
+
+    print(f"Completed {len(names) - len(failures)}/{len(names)} conferences")
+    if len(failures) > 0:
+        print(f"Failed: {', '.join(failures)}")
+    return failures
@@ -0,0 +1,106 @@
+import os
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# How pages are parsed, all giving the same bs4 tree to the strategies:
+#   "html.parser"  bs4's pure Python parser, the slowest, and the default
+#   "lxml"         bs4 on top of libxml2, several times faster
+#   "selectolax"   lexbor (the selectolax package) finds the parse_only elements of the page, and only
+#                  those are built into a bs4 tree with lxml. Falls back to "lxml" for a parse_only
+#                  that has no CSS equivalent. By far the fastest on large schedules
+# Parsers repair malformed markup differently, so the faster backends are opt-in through
+# HTML_PARSER_BACKEND. Check that a conference's output is unchanged with
+# `python check_parser_backends.py` on its cached pages before switching.
+html_parser_backends = ["html.parser", "lxml", "selectolax"]
+
+def available_html_parser_backends():
+    """The backends whose packages are installed."""
+    backends = ["html.parser"]
+    if lxml is not None:
+        backends.append("lxml")
+        if LexborHTMLParser is not None:
+            backends.append("selectolax")
+    return backends
+
+html_parser_backend = "html.parser"
+
+def set_html_parser_backend(backend):
+    global html_parser_backend
+    if backend not in html_parser_backends:
+        raise ValueError(f"Invalid HTML parser backend: {backend}")
+    if backend in ["lxml", "selectolax"] and lxml is None:
+        raise ValueError(f"The {backend} backend requires the lxml package")
+    if backend == "selectolax" and LexborHTMLParser is None:
+        raise ValueError("The selectolax backend requires the selectolax package")
+    html_parser_backend = backend
+
+if os.getenv("HTML_PARSER_BACKEND"):
+    set_html_parser_backend(os.getenv("HTML_PARSER_BACKEND"))
+
+def css_string(value):
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def strainer_selector(parse_only):
+    """
+    A CSS selector for the elements a SoupStrainer keeps, or None if it has no exact equivalent. Only
+    a plain tag name with plain string attribute values is translated, such as
+    SoupStrainer('div', class_='timebox').
+    """
+    name_rules = getattr(parse_only, "name_rules", None)
+    attribute_rules = getattr(parse_only, "attribute_rules", None)
+    if name_rules is None or attribute_rules is None or getattr(parse_only, "string_rules", None):
+        return None
+
+    def is_plain(rule):
+        return rule.string is not None and rule.pattern is None and rule.function is None and rule.present is None
+
+    if len(name_rules) != 1 or not is_plain(name_rules[0]):
+        return None
+    selector = name_rules[0].string
+    for attribute, rules in attribute_rules.items():
+        if len(rules) != 1 or not is_plain(rules[0]):
+            return None
+        value = rules[0].string
+        if attribute == "class" and " " not in value:
+            # bs4 matches a single class against each of the element's classes
+            selector += f"[class~={css_string(value)}]"
+        else:
+            selector += f"[{attribute}={css_string(value)}]"
+    return selector
+
+def preselect(html, selector):
+    """The outer HTML of the outermost elements matching selector, found with lexbor."""
+    matches = LexborHTMLParser(html).css(selector)
+    matched = set([node.mem_id for node in matches])
+    outermost = []
+    for node in matches:
+        # A match inside another is already part of the outer one's HTML
+        parent = node.parent
+        while parent is not None and parent.mem_id not in matched:
+            parent = parent.parent
+        if parent is None:
+            outermost.append(node.html)
+    return "".join(outermost)
+
+def make_soup(html, parse_only=None, backend=None):
+    """
+    Parse a page. If parse_only (a SoupStrainer) is given, only the matching elements and their
+    subtrees are built, which skips most of the page on large schedules. backend overrides
+    html_parser_backend, for a page that only parses correctly with one of them.
+    """
+    backend = backend or html_parser_backend
+    if backend == "selectolax":
+        selector = strainer_selector(parse_only) if parse_only is not None else None
+        if selector is not None:
+            html = preselect(html, selector)
+        backend = "lxml"
+    return BeautifulSoup(html, backend, parse_only=parse_only)
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+
+# Seconds to wait for a connection and for the response
+request_timeout = (10, 60)
+
+# Retries after the first attempt, and the exponential backoff between them
+max_retries = 5
+backoff_base_seconds = 2
+backoff_max_seconds = 300
+
+# Connections kept alive per host
+pool_maxsize = 4
+
+# "live" sends requests, "record" also saves every final response as a fixture, and "replay"
+# answers from fixtures without touching the network
+http_mode = os.environ.get("HTTP_MODE", "live")
+fixtures_dir = os.environ.get("HTTP_FIXTURES_DIR", os.path.join("fixtures", "http"))
+
+# Base URL of a StandInServer to send every request to instead of the real host
+stand_in_url = os.environ.get("HTTP_STAND_IN_URL")
+
+# Response headers worth keeping in a fixture
+recorded_headers = ["Content-Type", "ETag", "Last-Modified"]
+
+sessions = {}
+sessions_lock = threading.Lock()
+
+def get_session(host):
+    """Return the keep-alive session for a host, so that repeated requests reuse a warm connection."""
+    with sessions_lock:
+        if host not in sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            sessions[host] = session
+        return sessions[host]
+
+def configure(mode=None, fixtures=None, stand_in=None):
+    """
+    Change the HTTP mode, fixtures directory or stand-in server. The environment is updated too,
+    so that worker processes started afterwards use the same settings.
+    """
+    global http_mode, fixtures_dir, stand_in_url
+    if mode is not None:
+        assert mode in ["live", "record", "replay"], f"Invalid HTTP mode: {mode}"
+        http_mode = os.environ["HTTP_MODE"] = mode
+    if fixtures is not None:
+        fixtures_dir = os.environ["HTTP_FIXTURES_DIR"] = fixtures
+    if stand_in is not None:
+        stand_in_url = os.environ["HTTP_STAND_IN_URL"] = stand_in
+
+def is_offline():
+    """Whether requests are answered by fixtures or a stand-in server rather than the real hosts."""
+    return http_mode == "replay" or stand_in_url is not None
+
+def rewrite_url(url):
+    """
+    Point a URL at the stand-in server if one is configured, keeping the original host as the
+    first path segment: https://dl.acm.org/doi/x becomes {stand_in_url}/dl.acm.org/doi/x.
+    """
+    if stand_in_url is None:
+        return url
+    parsed = urlparse(url)
+    query = f"?{parsed.query}" if parsed.query else ""
+    return f"{stand_in_url.rstrip('/')}/{parsed.netloc}{parsed.path or '/'}{query}"
+
+def get_fixture_path(method, url, params=None, json_data=None, directory=None):
+    """Fixtures are keyed by method, host, path, query and body, but not by scheme or headers."""
+    parsed = urlparse(requests.Request(method, url, params=params).prepare().url)
+    hash_input = f"{method} {parsed.netloc}{parsed.path}?{parsed.query}"
+    if json_data is not None:
+        hash_input += " " + json.dumps(json_data, sort_keys=True)
+    fixture_name = hashlib.md5(hash_input.encode()).hexdigest() + ".json"
+    return os.path.join(directory if directory is not None else fixtures_dir, parsed.netloc, fixture_name)
+
+def record_response(method, url, params, json_data, status_code, text, response_headers):
+    fixture_path = get_fixture_path(method, url, params, json_data)
+    os.makedirs(os.path.dirname(fixture_path), exist_ok=True)
+    fixture = {
+        "method": method,
+        "url": requests.Request(method, url, params=params).prepare().url,
+        "json_data": json_data,
+        "status": status_code,
+        "headers": {name: response_headers[name] for name in recorded_headers if name in response_headers},
+        "text": text,
+    }
+    with open(fixture_path, 'w', encoding='utf-8') as f:
+        json.dump(fixture, f, ensure_ascii=False, indent=1)
+
+def load_fixture(method, url, params=None, json_data=None, directory=None):
+    """Return the recorded fixture for a request, or None if there is none."""
+    fixture_path = get_fixture_path(method, url, params, json_data, directory)
+    if not os.path.exists(fixture_path):
+        return None
+    with open(fixture_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def replay_response(method, url, params=None, json_data=None):
+    fixture = load_fixture(method, url, params, json_data)
+    if fixture is None:
+        # Deliberately not a RequestException, so that a missing fixture fails at once instead of being retried
+        raise LookupError(f"No recorded response for {method} {url} with params {params} in {fixtures_dir}")
+    return fixture["status"], fixture["text"], fixture["headers"]
+
+def send_request(url, params=None, headers=None, json_data=None):
+    """
+    Make a single request on the host's pooled session, returning the status code, body and headers.
+    Sends a POST if json_data is given. Connection errors and timeouts raise requests.RequestException.
+    """
+    method = "POST" if json_data is not None else "GET"
+    if http_mode == "replay":
+        return replay_response(method, url, params, json_data)
+
+    session = get_session(urlparse(url).netloc)
+    if json_data is not None:
+        response = session.post(rewrite_url(url), headers=headers, params=params, json=json_data, timeout=request_timeout)
+    else:
+        response = session.get(rewrite_url(url), headers=headers, params=params, timeout=request_timeout)
+
+    # Responses that will be retried are not the outcome of the request, so only final ones are kept
+    if http_mode == "record" and not is_retryable(response.status_code):
+        record_response(method, url, params, json_data, response.status_code, response.text, response.headers)
+
+    return response.status_code, response.text, response.headers
+
+def is_retryable(status_code):
+    """Rate limits, timeouts, server errors and failed connections (None) are retried, other 4xx are not."""
+    return status_code is None or status_code in [408, 429] or status_code >= 500
+
+def parse_retry_after(value):
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def retry_delay(attempt, response_headers=None):
+    """
+    Seconds to wait before retry number attempt (from 0). The server's Retry-After is honored,
+    otherwise the delay is exponential with full jitter.
+    """
+    retry_after = parse_retry_after((response_headers or {}).get("Retry-After"))
+    if retry_after is not None:
+        return min(retry_after, backoff_max_seconds)
+    return random.uniform(0, min(backoff_max_seconds, backoff_base_seconds * 2 ** attempt))
@@ -1,9 +1,14 @@
 import urllib.parse
-from bs4 import BeautifulSoup
-from retrieve_webpage import get_cached_webpage
+from bs4 import BeautifulSoup, SoupStrainer
+from html_parsing import make_soup
+from retrieve_webpage import get_cached_webpage, get_cached_webpages, is_webpage_cached, forget_cached_webpage
 import requests
 import json
 import os
+from utils import normalize_title
+from EnrichmentCache import get_enrichment_cache
+from RunMetrics import get_run_metrics
+from FetchPlan import get_active_fetch_plan
 
 
 def title_to_scholar_search_url(title: str) -> str:
@@ -33,17 +38,66 @@ def get_info_from_google_scholar(title: str) -> str:
         print(f"Error: More than one link found for the paper {title}. Links: " + str(link_divs))
         return abstract_text, ""
 
-def get_info_from_semantic_scholar(title: str) -> str:
-    url = "https://api.semanticscholar.org/graph/v1/paper/search"
-    params = {
-        "query": title,
-        "limit": 1,
-        "fields": "abstract,url"
-    }
-    headers = {
+semantic_scholar_search_url = "https://api.semanticscholar.org/graph/v1/paper/search"
+semantic_scholar_bulk_search_url = "https://api.semanticscholar.org/graph/v1/paper/search/bulk"
+semantic_scholar_batch_url = "https://api.semanticscholar.org/graph/v1/paper/batch"
+semantic_scholar_batch_fields = "title,abstract,url,externalIds,openAccessPdf"
+
+# The batch endpoint accepts up to 500 ids, bulk search queries are kept short enough to fit in a URL
+semantic_scholar_batch_size = 500
+semantic_scholar_bulk_search_titles_per_query = 20
+
+def get_semantic_scholar_headers():
+    return {
         "x-api-key": os.getenv("SEMANTIC_SCHOLAR_API_KEY")
     }
-    response = get_cached_webpage(url, params=params, headers=headers, response_type="json", target_url="semantic_scholar")
+
+def get_doi_from_link(link: str) -> str:
+    for prefix in ["doi.org/", "dl.acm.org/doi/"]:
+        if prefix in link:
+            return link.split(prefix, 1)[1]
+    return ""
+
+def parse_semantic_scholar_paper(paper) -> dict:
+    abstract = paper.get("abstract")
+    url = paper.get("url")
+    external_ids = paper.get("externalIds") or {}
+    open_access_pdf = paper.get("openAccessPdf") or {}
+
+    return {
+        "abstract": abstract if abstract is not None else "",
+        "link": url if url is not None else "",
+        "doi": external_ids.get("DOI") or "",
+        "open_access_pdf": open_access_pdf.get("url") or "",
+    }
+
+def semantic_scholar_search_fetch(title: str) -> dict:
+    """The get_cached_webpage arguments of a single-title search."""
+    return {
+        "url": semantic_scholar_search_url,
+        "params": {
+            "query": title,
+            "limit": 1,
+            "fields": "abstract,url"
+        },
+        "headers": get_semantic_scholar_headers(),
+        "response_type": "json",
+        "target_url": "semantic_scholar"
+    }
+
+def get_info_from_semantic_scholar(title: str) -> str:
+    response = get_cached_webpage(**semantic_scholar_search_fetch(title))
+    return parse_semantic_scholar_search(response)
+
+def get_infos_from_semantic_scholar_by_search(titles):
+    """Single-title searches for many titles, fetched together. Returns a list of (abstract, link) pairs."""
+    responses = get_cached_webpages([semantic_scholar_search_fetch(title) for title in titles])
+    return [parse_semantic_scholar_search(response) for response in responses]
+
+def parse_semantic_scholar_search(response) -> str:
+    if response is None:
+        # Not cached while planning
+        return "", ""
     json_response = json.loads(response)
 
     if "data" not in json_response:
@@ -52,26 +106,154 @@ def get_info_from_semantic_scholar(title: str) -> str:
     if len(json_response["data"]) == 0:
         return "", ""
     
-    paper = json_response["data"][0]
-    abstract = paper["abstract"]
+    info = parse_semantic_scholar_paper(json_response["data"][0])
+    return info["abstract"], info["link"]
 
-    if "openAccessPdf" in paper:
-        url = paper["openAccessPdf"]["url"]
-        if url == "":
-            url = paper["url"]
-    else:
-        url = paper["url"]
-    
-    if abstract == None:
-        abstract = ""
-    if url == None:
-        url = ""
+def get_cached_info_from_semantic_scholar(title: str):
+    """
+    Returns the single-title search result if it is already cached and found the paper, otherwise
+    None. Whether a cached search that found nothing is tried again is up to the enrichment cache.
+    """
+    fetch = semantic_scholar_search_fetch(title)
+    if not is_webpage_cached(fetch["url"], params=fetch["params"], response_type="json"):
+        return None
+
+    abstract, link = get_info_from_semantic_scholar(title)
+    if abstract == "" and link == "":
+        return None
+    return {"abstract": abstract, "link": link, "doi": "", "open_access_pdf": ""}
+
+def forget_cached_search(title: str):
+    fetch = semantic_scholar_search_fetch(title)
+    forget_cached_webpage(fetch["url"], params=fetch["params"], response_type="json")
+
+def get_infos_from_semantic_scholar_by_doi(dois):
+    """Resolve DOIs through the paper batch endpoint. Returns a dict from DOI to paper info."""
+    infos = {}
+    batches = [dois[i:i + semantic_scholar_batch_size] for i in range(0, len(dois), semantic_scholar_batch_size)]
+    get_run_metrics().record_enrichment("batch_requests", len(batches))
+    responses = get_cached_webpages([{
+        "url": semantic_scholar_batch_url,
+        "params": {"fields": semantic_scholar_batch_fields},
+        "headers": get_semantic_scholar_headers(),
+        "response_type": "json",
+        "target_url": "semantic_scholar",
+        "json_data": {"ids": [f"DOI:{doi}" for doi in batch]}
+    } for batch in batches])
+    for batch, response in zip(batches, responses):
+        if response is None:
+            continue
+        # Results are aligned with the requested ids, with null for unknown papers
+        for doi, paper in zip(batch, json.loads(response)):
+            if paper is not None:
+                infos[doi] = parse_semantic_scholar_paper(paper)
+    return infos
+
+def get_infos_from_semantic_scholar_by_title(titles):
+    """Resolve titles by OR-ing their exact phrases into bulk search queries. Returns a dict from normalized title to paper info."""
+    infos = {}
+    batches = [
+        titles[i:i + semantic_scholar_bulk_search_titles_per_query]
+        for i in range(0, len(titles), semantic_scholar_bulk_search_titles_per_query)
+    ]
+    get_run_metrics().record_enrichment("bulk_search_requests", len(batches))
+    responses = get_cached_webpages([{
+        "url": semantic_scholar_bulk_search_url,
+        "params": {"query": " | ".join([f'"{title.replace(chr(34), "")}"' for title in batch]), "fields": semantic_scholar_batch_fields},
+        "headers": get_semantic_scholar_headers(),
+        "response_type": "json",
+        "target_url": "semantic_scholar"
+    } for batch in batches])
+    for batch, response in zip(batches, responses):
+        wanted = set([normalize_title(title) for title in batch])
+        if response is None:
+            continue
+        for paper in json.loads(response).get("data") or []:
+            normalized_title = normalize_title(paper.get("title") or "")
+            if normalized_title in wanted and normalized_title not in infos:
+                infos[normalized_title] = parse_semantic_scholar_paper(paper)
+    return infos
+
+def get_infos_from_semantic_scholar(titles, dois=None):
+    """
+    Look up a whole conference's titles at once. Returns a dict from title to a dict
+    with abstract, link, doi and open_access_pdf fields.
+
+    Titles whose single-title search is already cached reuse it, then titles already in
+    the enrichment cache under any spelling. Papers with a known DOI are resolved through
+    the batch endpoint, and the rest through bulk search. Anything still unresolved falls
+    back to a single-title search. New results are added to the enrichment cache.
+    """
+    if dois is None:
+        dois = {}
 
-    return abstract, url
+    metrics = get_run_metrics()
+    with metrics.enriching():
+        infos = {}
+        for title in titles:
+            cached_info = get_cached_info_from_semantic_scholar(title)
+            if cached_info is not None:
+                infos[title] = cached_info
+
+        enrichment_cache = get_enrichment_cache()
+        unresolved = [title for title in dict.fromkeys(titles) if title not in infos]
+        enrichment_cache.put_many(infos, "search")
+        metrics.record_enrichment("titles", len(dict.fromkeys(titles)))
+        metrics.record_enrichment("search_cache_hits", len(dict.fromkeys(titles)) - len(unresolved))
+        infos.update(enrichment_cache.get_many(unresolved))
+        metrics.record_enrichment("enrichment_cache_hits", len([title for title in unresolved if title in infos]))
+
+        unresolved = [title for title in unresolved if title not in infos]
+        fetch_plan = get_active_fetch_plan()
+        planned_misses = fetch_plan.misses() if fetch_plan is not None else 0
+        doi_infos = get_infos_from_semantic_scholar_by_doi(
+            list(dict.fromkeys([dois[title] for title in unresolved if dois.get(title)]))
+        )
+        for title in unresolved:
+            if dois.get(title) in doi_infos:
+                infos[title] = doi_infos[dois[title]]
+        enrichment_cache.put_many({title: infos[title] for title in unresolved if title in infos}, "batch")
+        metrics.record_enrichment("batch_resolved", len([title for title in unresolved if title in infos]))
+
+        unresolved = [title for title in unresolved if title not in infos]
+        title_infos = get_infos_from_semantic_scholar_by_title(unresolved)
+        for title in unresolved:
+            if normalize_title(title) in title_infos:
+                infos[title] = title_infos[normalize_title(title)]
+        enrichment_cache.put_many({title: infos[title] for title in unresolved if title in infos}, "bulk")
+        metrics.record_enrichment("bulk_resolved", len([title for title in unresolved if title in infos]))
+
+        unresolved = [title for title in unresolved if title not in infos]
+        if fetch_plan is not None and fetch_plan.misses() > planned_misses:
+            # Which titles fall back to single searches depends on batch and bulk responses that are not cached
+            fetch_plan.add_possible(semantic_scholar_search_url, len(unresolved), "semantic_scholar")
+            for title in unresolved:
+                infos[title] = {"abstract": "", "link": "", "doi": "", "open_access_pdf": ""}
+            unresolved = []
+        if fetch_plan is None:
+            # Titles only get here without a recent miss, so a search that found nothing before is retried
+            for title in unresolved:
+                forget_cached_search(title)
+        for title, (abstract, link) in zip(unresolved, get_infos_from_semantic_scholar_by_search(unresolved)):
+            infos[title] = {"abstract": abstract, "link": link, "doi": "", "open_access_pdf": ""}
+        if fetch_plan is None:
+            # While planning, uncached searches come back empty and must not be stored as results
+            enrichment_cache.put_many({title: infos[title] for title in unresolved}, "search")
+        metrics.record_enrichment("single_searches", len(unresolved))
+
+    return infos
 
 def get_abstract_from_osdi_nsdi_atc_link(paper_link: str) -> str:
-    html_content = get_cached_webpage(paper_link, target_url="other")
-    soup = BeautifulSoup(html_content, 'html.parser')
+    return parse_osdi_nsdi_atc_abstract(get_cached_webpage(paper_link, target_url="other"))
+
+def get_abstracts_from_osdi_nsdi_atc_links(paper_links):
+    """Abstracts of many paper pages, fetched together. Returns a list in the order of paper_links."""
+    return [parse_osdi_nsdi_atc_abstract(html_content) for html_content in get_cached_webpages(paper_links)]
+
+def parse_osdi_nsdi_atc_abstract(html_content) -> str:
+    if html_content is None:
+        return ""
+    soup = make_soup(html_content, SoupStrainer('div', class_='field-name-field-paper-description'))
     abstract_div = soup.find('div', class_='field-name-field-paper-description')
     abstract_paragraphs = abstract_div.find_all('p')
     abstract = "\n".join([p.text.strip() for p in abstract_paragraphs])
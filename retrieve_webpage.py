@@ -2,137 +2,352 @@ import requests
 import os
 import hashlib
 import time
-from requests_html import HTMLSession
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+import asyncio
+import threading
+from urllib.parse import urlparse
+from CacheStore import get_cache_store
+import http_client
+from http_client import send_request, is_retryable, retry_delay
+from BrowserPool import get_browser_pool
+from RunMetrics import get_run_metrics
+from FetchPlan import get_active_fetch_plan
+from RateLimiter import get_rate_limiter
 
-semantic_scholar_rate_limit_sleep_time = 2
-other_rate_limit_sleep_time = 60
+# Maximum number of downloads in flight per host, hosts are always fetched concurrently with each other
+host_concurrency_limits = {}
+default_host_concurrency_limit = 1
+
+# Every fetch of a process runs on one long-lived event loop, so that the per-host semaphores
+# hold across all the threads that fetch, such as the workers of a Pipeline
+fetch_loop = None
+fetch_loop_pid = None
+fetch_loop_lock = threading.Lock()
+host_semaphores = {}
+
+# Opt-in conditional revalidation of cached pages. Entries older than their host's max age
+# (in seconds) are revalidated with If-None-Match/If-Modified-Since, None means never
+REVALIDATE = False
+revalidation_max_age = {
+    "www.usenix.org": 24 * 60 * 60,
+}
+default_revalidation_max_age = None
 
 DEBUG = False
 
-def get_cached_webpage(url, params=None, headers=None, cache_dir=".cache", response_type="html", target_url="other", pre_render=False):
-    """
-    Get webpage content from cache or download it if not cached.
-    Returns the webpage content as a string.
-    """
-    global semantic_scholar_rate_limit_sleep_time
-    global other_rate_limit_sleep_time
+def get_host(url):
+    return urlparse(url).netloc
 
-    assert response_type in ["html", "json"], f"Invalid response type: {response_type}"
-    assert target_url in ["semantic_scholar", "other"], f"Invalid target URL: {target_url}"
+def get_fetch_interval(host, target_url, cache_dir=".cache"):
+    """Current seconds between downloads from a host, see RateLimiter."""
+    # Fixtures and the stand-in server have no politeness to respect
+    if http_client.is_offline():
+        return 0
+    return get_rate_limiter(cache_dir).interval(host, target_url)
 
-    # Create cache directory if it doesn't exist
-    os.makedirs(cache_dir, exist_ok=True)
-    if DEBUG:
-        print(f"Retrieving webpage {url}")
-    
+def get_cache_key(url, params=None, response_type="html", json_data=None):
     # Create a unique filename based on the URL and params if present
     if params:
         hash_input = url + str(params)
     else:
         hash_input = url
+    if json_data is not None:
+        hash_input += str(json_data)
     url_hash = hashlib.md5(hash_input.encode()).hexdigest()
 
     if response_type == "html":
-        cache_file = os.path.join(cache_dir, f"{url_hash}.html")
+        return f"{url_hash}.html"
     else:
-        cache_file = os.path.join(cache_dir, f"{url_hash}.json")
-    if DEBUG:
-        print(f"Cache file: {cache_file}")
+        return f"{url_hash}.json"
 
-    # Check if cache exists
-    if os.path.exists(cache_file):
+def read_cached_webpage(url, cache_key, cache_dir=".cache"):
+    content = get_cache_store(cache_dir).get(cache_key, url)
+    if content is not None:
+        get_run_metrics().record_cache_hit(get_host(url))
         if DEBUG:
             print("Using cached webpage...")
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            return f.read()
+    return content
 
-    # Wait 2s on the retrieve path to avoid being blocked by the server
-    if target_url == "semantic_scholar":
-        print(f"Sleeping for {semantic_scholar_rate_limit_sleep_time}s...")
-        time.sleep(semantic_scholar_rate_limit_sleep_time)
-    else:
-        print(f"Sleeping for {other_rate_limit_sleep_time}s...")
-        time.sleep(other_rate_limit_sleep_time)
-    
-    # Download the webpage if cache doesn't exist
+def plan_cached_webpage(url, params=None, cache_dir=".cache", response_type="html", target_url="other", json_data=None, browser=False):
+    """Record a fetch in the active plan, returning the cached content or None without downloading anything."""
+    cache_key = get_cache_key(url, params, response_type, json_data)
+    cached = get_cache_store(cache_dir).contains(cache_key)
+    get_active_fetch_plan().add(url, cached, target_url, browser)
+    return read_cached_webpage(url, cache_key, cache_dir) if cached else None
+
+def reserve_fetch_slot(host, target_url, cache_dir=".cache"):
+    """
+    Reserve the next download from a host in the rate limiter shared by all scraper processes,
+    returning how long to wait until it may start.
+    """
+    if http_client.is_offline():
+        return 0
+    return get_rate_limiter(cache_dir).reserve(host, target_url)
+
+def record_fetch_outcome(host, target_url, status_code, wait=0, cache_dir=".cache"):
+    """
+    Let the rate limiter adapt to a download's status code: speed up after a success, slow down
+    after the host throttles us, and hold the host back for wait seconds after other failures.
+    """
+    if http_client.is_offline():
+        return
+    rate_limiter = get_rate_limiter(cache_dir)
+    if status_code in [429, 503]:
+        rate_limiter.record_throttled(host, target_url, wait)
+    elif is_retryable(status_code):
+        rate_limiter.defer(host, target_url, wait)
+    elif status_code is not None and status_code < 400:
+        rate_limiter.record_success(host, target_url)
+
+def needs_revalidation(url, cache_key, cache_dir=".cache"):
+    if not REVALIDATE:
+        return False
+
+    max_age = revalidation_max_age.get(get_host(url), default_revalidation_max_age)
+    if max_age is None:
+        return False
+
+    metadata = get_cache_store(cache_dir).get_metadata(cache_key)
+    return metadata is not None and time.time() - metadata["fetched_at"] > max_age
+
+def get_host_semaphore(host):
+    # Only ever called on the fetch loop, so no lock is needed
+    if host not in host_semaphores:
+        limit = host_concurrency_limits.get(host, default_host_concurrency_limit)
+        host_semaphores[host] = asyncio.Semaphore(limit)
+    return host_semaphores[host]
+
+def get_fetch_loop():
+    """The process's fetch loop, started on first use in a daemon thread."""
+    global fetch_loop, fetch_loop_pid
+    with fetch_loop_lock:
+        # A forked worker process inherits the loop but not the thread running it
+        if fetch_loop is None or fetch_loop_pid != os.getpid():
+            fetch_loop = asyncio.new_event_loop()
+            fetch_loop_pid = os.getpid()
+            host_semaphores.clear()
+            threading.Thread(target=fetch_loop.run_forever, name="fetch-loop", daemon=True).start()
+        return fetch_loop
+
+def download_webpage(url, params=None, headers=None, target_url="other", pre_render=False, json_data=None):
+    """Download a webpage, returning the status code, response body and response headers. Sends a POST if json_data is given."""
+    assert get_active_fetch_plan() is None, "Nothing may be downloaded while planning"
     if DEBUG:
         print("Downloading webpage...")
 
+    headers = dict(headers) if headers is not None else {}
     if target_url == "other":
-        if headers is None:
-            headers = {}
-
         headers['User-Agent'] = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36"
 
     if pre_render:
-        session = HTMLSession()
-        response = session.get(url, headers=headers, params=params)
-        response.html.render()
-        response_text = response.html.raw_html
-    else:
-        response = requests.get(url, headers=headers, params=params)
-        response_text = response.text
+        # Browsers do not expose the status code, so a rendered page is treated as a success
+        if http_client.http_mode == "replay":
+            return http_client.replay_response("GET", url, params)
+        full_url = requests.Request("GET", http_client.rewrite_url(url), params=params).prepare().url
+        page_source, _ = get_browser_pool().get_page_source(full_url)
+        if http_client.http_mode == "record":
+            http_client.record_response("GET", url, params, None, 200, page_source, {})
+        return 200, page_source, {}
 
+    return send_request(url, params, headers, json_data)
 
-    if response.status_code != 200:
-        if response.status_code == 429:
-            # Rate limit exceeded
-            if target_url == "semantic_scholar":
-                print(f"Rate limited at {semantic_scholar_rate_limit_sleep_time}s, doubling the sleep time to {2 * semantic_scholar_rate_limit_sleep_time}s.")
-                semantic_scholar_rate_limit_sleep_time *= 2
-            else:
-                print(f"Rate limited at {other_rate_limit_sleep_time}s, doubling the sleep time to {2 * other_rate_limit_sleep_time}s.")
-                other_rate_limit_sleep_time *= 2
+async def async_get_cached_webpage(url, params=None, headers=None, cache_dir=".cache", response_type="html", target_url="other", pre_render=False, json_data=None):
+    """
+    Get webpage content from cache or download it if not cached.
+    Downloads to the same host share that host's politeness budget, while downloads
+    to different hosts proceed concurrently.
+    """
+    assert response_type in ["html", "json"], f"Invalid response type: {response_type}"
+    assert target_url in ["semantic_scholar", "other"], f"Invalid target URL: {target_url}"
 
-            return get_cached_webpage(url, params, headers, cache_dir, response_type, target_url, pre_render)
+    if DEBUG:
+        print(f"Retrieving webpage {url}")
+
+    if get_active_fetch_plan() is not None:
+        return plan_cached_webpage(url, params, cache_dir, response_type, target_url, json_data)
+
+    cache_key = get_cache_key(url, params, response_type, json_data)
+    if DEBUG:
+        print(f"Cache key: {cache_key}")
+
+    store = get_cache_store(cache_dir)
+    revalidate = needs_revalidation(url, cache_key, cache_dir) and not pre_render and json_data is None
+    if not revalidate:
+        cached_content = read_cached_webpage(url, cache_key, cache_dir)
+        if cached_content is not None:
+            return cached_content
+
+    host = get_host(url)
+    async with get_host_semaphore(host):
+        # Another request for the same page may have filled or revalidated the cache while we waited
+        if store.contains(cache_key) and not needs_revalidation(url, cache_key, cache_dir):
+            cached_content = read_cached_webpage(url, cache_key, cache_dir)
+            if cached_content is not None:
+                return cached_content
+
+        request_headers = dict(headers) if headers is not None else {}
+        if revalidate:
+            metadata = store.get_metadata(cache_key) or {"etag": None, "last_modified": None}
+            if metadata["etag"] is not None:
+                request_headers["If-None-Match"] = metadata["etag"]
+            if metadata["last_modified"] is not None:
+                request_headers["If-Modified-Since"] = metadata["last_modified"]
+
+        attempt = 0
+        download_seconds = 0.0
+        while True:
+            # Wait for this host's next slot to avoid being blocked by the server. Reserving may wait
+            # on another process's transaction, which must not hold up the other hosts on the loop
+            delay = await asyncio.to_thread(reserve_fetch_slot, host, target_url, cache_dir)
+            if delay > 0:
+                print(f"Sleeping for {delay:.0f}s before fetching from {host}...")
+                get_run_metrics().record_sleep(host, delay)
+                await asyncio.sleep(delay)
+
+            download_start = time.perf_counter()
+            try:
+                status_code, response_text, response_headers = await asyncio.to_thread(
+                    download_webpage, url, params, request_headers, target_url, pre_render, json_data
+                )
+            except requests.RequestException as e:
+                status_code, response_text, response_headers = None, str(e), {}
+            download_seconds += time.perf_counter() - download_start
+
+            if not is_retryable(status_code) or attempt >= http_client.max_retries:
+                record_fetch_outcome(host, target_url, status_code, cache_dir=cache_dir)
+                break
+
+            # Back off, and hold back every other request to this host for as long
+            wait = retry_delay(attempt, response_headers)
+            record_fetch_outcome(host, target_url, status_code, wait, cache_dir)
+            print(f"Got {status_code or 'no response'} from {host}, retrying in {wait:.0f}s ({attempt + 1}/{http_client.max_retries})...")
+            get_run_metrics().record_sleep(host, wait, "retry")
+            await asyncio.sleep(wait)
+            attempt += 1
+
+    if revalidate and status_code == 304:
+        if DEBUG:
+            print("Cached webpage is still current...")
+        store.mark_revalidated(cache_key)
+        return read_cached_webpage(url, cache_key, cache_dir)
+
+    if revalidate and status_code != 200:
+        # A copy that may be out of date beats no page at all
+        cached_content = read_cached_webpage(url, cache_key, cache_dir)
+        if cached_content is not None:
+            print(f"Warning: could not revalidate {url} ({status_code or response_text}), using the cached copy")
+            return cached_content
+
+    if status_code is None:
+        raise Exception(f"Failed to retrieve the webpage after {attempt + 1} attempts: {response_text}")
+    if status_code != 200:
+        raise Exception(f"Failed to retrieve the webpage: Status code {status_code}, output: {response_text}")
+
+    get_run_metrics().record_download(host, len(response_text.encode()), download_seconds)
 
-        raise Exception(f"Failed to retrieve the webpage: Status code {response.status_code}, output: {response_text}")
-    
     # Save to cache
-    with open(cache_file, 'w', encoding='utf-8') as f:
-        f.write(response_text)
-    
+    store.put(
+        cache_key,
+        url,
+        response_text,
+        status_code,
+        etag=response_headers.get("ETag"),
+        last_modified=response_headers.get("Last-Modified")
+    )
+
     return response_text
 
-def get_cached_webpage_via_selenium(url):
+async def async_get_cached_webpages(fetches):
+    """
+    Get many webpages at once. Each fetch is either a URL or a dict of
+    get_cached_webpage keyword arguments. Results are returned in input order.
+    """
+    fetches = [{"url": fetch} if isinstance(fetch, str) else fetch for fetch in fetches]
+    return await asyncio.gather(*[async_get_cached_webpage(**fetch) for fetch in fetches])
+
+def run_sync(coroutine):
+    """Run a coroutine on the fetch loop and wait for it, from any thread but the fetch loop's own."""
+    loop = get_fetch_loop()
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    if running_loop is loop:
+        coroutine.close()
+        raise RuntimeError("Fetches on the fetch loop must await async_get_cached_webpage rather than block on it")
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+def get_cached_webpage(url, params=None, headers=None, cache_dir=".cache", response_type="html", target_url="other", pre_render=False, json_data=None):
+    """
+    Get webpage content from cache or download it if not cached.
+    Returns the webpage content as a string, or None for an uncached page while planning.
+    """
+    if get_active_fetch_plan() is not None:
+        return plan_cached_webpage(url, params, cache_dir, response_type, target_url, json_data)
+
+    with get_run_metrics().fetching():
+        # Serve cache hits without starting an event loop
+        cache_key = get_cache_key(url, params, response_type, json_data)
+        if get_cache_store(cache_dir).contains(cache_key) and not needs_revalidation(url, cache_key, cache_dir):
+            cached_content = read_cached_webpage(url, cache_key, cache_dir)
+            # The entry may have been evicted by another process since
+            if cached_content is not None:
+                return cached_content
+
+        return run_sync(async_get_cached_webpage(url, params, headers, cache_dir, response_type, target_url, pre_render, json_data))
+
+def forget_cached_webpage(url, params=None, cache_dir=".cache", response_type="html", json_data=None):
+    """Drop a page from the cache, so that the next request for it downloads it again."""
+    get_cache_store(cache_dir).remove(get_cache_key(url, params, response_type, json_data))
+
+def is_webpage_cached(url, params=None, cache_dir=".cache", response_type="html", json_data=None):
+    return get_cache_store(cache_dir).contains(get_cache_key(url, params, response_type, json_data))
+
+def get_cached_webpages(fetches):
+    """Synchronous wrapper around async_get_cached_webpages."""
+    with get_run_metrics().fetching():
+        return run_sync(async_get_cached_webpages(fetches))
+
+def get_cached_webpage_via_selenium(url, ready_selector="section#abstract"):
+    """
+    Get a page that needs a real browser to render, such as an ACM DL paper page, waiting
+    until ready_selector is present. Pages that never become ready are not cached, and give None.
+    """
     assert "dl.acm.org" in url
 
-    # Cache the webpage
-    url_hash = hashlib.md5(url.encode()).hexdigest()
-    cache_file = os.path.join(".cache", f"{url_hash}.html")
-    if DEBUG:
-        print(f"Cache file: {cache_file}")
-    if os.path.exists(cache_file):
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            return f.read()
-
-    chrome_options = Options()
-    # chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-
-    # Ensure that the webpage has rendered fully
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.get(url)
-    driver.minimize_window()
-    # Wait for 60 seconds for the page to load, and for the request to look less suspicious
-    print(f"Sleeping for {other_rate_limit_sleep_time}s...")
-    # Wait for 5 seconds to ensure the page is loaded
-    time.sleep(5)
-    # Save to cache
-    html = driver.page_source
-    with open(cache_file, 'w', encoding='utf-8') as f:
-        f.write(html)
+    if get_active_fetch_plan() is not None:
+        return plan_cached_webpage(url, browser=True)
+
+    with get_run_metrics().fetching():
+        # Cache the webpage
+        cache_key = get_cache_key(url)
+        if DEBUG:
+            print(f"Cache key: {cache_key}")
+        cached_content = read_cached_webpage(url, cache_key)
+        if cached_content is not None:
+            return cached_content
 
-    # Wait for the remaining time to not be rate limited
-    time.sleep(other_rate_limit_sleep_time - 5)
+        # Wait for this host's next slot for the request to look less suspicious
+        host = get_host(url)
+        delay = reserve_fetch_slot(host, "other")
+        if delay > 0:
+            print(f"Sleeping for {delay:.0f}s before fetching from {host}...")
+            get_run_metrics().record_sleep(host, delay)
+            time.sleep(delay)
 
-    driver.quit()
+        download_start = time.perf_counter()
+        if http_client.http_mode == "replay":
+            _, html, _ = http_client.replay_response("GET", url)
+            ready = True
+        else:
+            html, ready = get_browser_pool().get_page_source(http_client.rewrite_url(url), ready_selector)
+            if ready:
+                record_fetch_outcome(host, "other", 200)
+            if ready and http_client.http_mode == "record":
+                http_client.record_response("GET", url, None, None, 200, html, {})
+        get_run_metrics().record_download(host, len(html.encode()), time.perf_counter() - download_start)
 
-    return html
+        if not ready:
+            print(f"{url} never showed {ready_selector}, skipping it")
+            return None
+        get_cache_store().put(cache_key, url, html)
+        return html
@@ -26,3 +26,51 @@ def save_to_json(data, filename="osdi24_sessions.json"):
     with open(f"json_format/{filename}", 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
     print(f"Data saved to {filename}")
+
+class JsonlWriter:
+    """
+    Writes one JSON record per line to jsonl_format/, flushing after every paper so that
+    downstream tools can read results while a conference is still being scraped.
+    """
+    def __init__(self, conference_name, filename=None):
+        if not os.path.exists("jsonl_format"):
+            os.makedirs("jsonl_format")
+        self.conference_name = conference_name
+        self.path = f"jsonl_format/{filename if filename is not None else conference_name + '.jsonl'}"
+        self.file = open(self.path, 'w', encoding='utf-8')
+        self.papers_written = 0
+
+    def write_paper(self, paper, session_title=None):
+        record = {"conference": self.conference_name, "session": session_title}
+        record.update(paper)
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        self.papers_written += 1
+
+    def write_session(self, session_title, papers):
+        for paper in papers:
+            self.write_paper(paper, session_title)
+
+    def close(self):
+        self.file.close()
+        print(f"Data saved to {self.path} ({self.papers_written} papers)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def read_jsonl(filename):
+    """Lazily yield the records of a JSONL file written by JsonlWriter, one at a time."""
+    path = filename if os.path.exists(filename) else f"jsonl_format/{filename}"
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip() != "":
+                yield json.loads(line)
+
+def save_to_jsonl(data, conference_name, filename=None):
+    """Save sessions of scraped data as one JSON record per paper"""
+    with JsonlWriter(conference_name, filename) as writer:
+        for session_title, papers in data.items():
+            writer.write_session(session_title, papers)
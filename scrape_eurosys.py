@@ -1,12 +1,14 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from html_parsing import make_soup
 from retrieve_webpage import get_cached_webpage
-from retrieve_paper_info import get_info_from_semantic_scholar
+from retrieve_paper_info import get_infos_from_semantic_scholar
 
 def scrape_sessions_eurosys(url, conference_name):
     assert conference_name in ["eurosys24", "eurosys23"]
 
     html_content = get_cached_webpage(url)
-    soup = BeautifulSoup(html_content, 'html.parser')
+    # The page leaves list items unclosed, which only html.parser nests the way parse_document_eurosys expects
+    soup = make_soup(html_content, SoupStrainer('td', class_='sch'), backend="html.parser")
     return parse_document_eurosys(soup, conference_name)
 
 def parse_document_eurosys(soup, conference_name):
@@ -39,13 +41,19 @@ def parse_document_eurosys(soup, conference_name):
         assert len(paper_names) == len(authors_lists), f"Number of paper names and authors lists are not equal for {session_title}"
         
         for paper_name, authors_list in zip(paper_names, authors_lists):
-            abstract, link = get_info_from_semantic_scholar(paper_name)
             paper = {
                 "title": paper_name,
                 "authors": authors_list,
-                "abstract": abstract,
-                "link": link,
+                "abstract": "",
+                "link": "",
             }
             sessions[session_title].append(paper)
+
+    # Look up all papers at once rather than one request per paper
+    papers = [paper for session_papers in sessions.values() for paper in session_papers]
+    infos = get_infos_from_semantic_scholar([paper["title"] for paper in papers])
+    for paper in papers:
+        paper["abstract"] = infos[paper["title"]]["abstract"]
+        paper["link"] = infos[paper["title"]]["link"]
         
     return sessions
\ No newline at end of file
@@ -1,12 +1,14 @@
 from bs4 import BeautifulSoup
+from html_parsing import make_soup
 from retrieve_webpage import get_cached_webpage
-from retrieve_paper_info import get_info_from_semantic_scholar
+from retrieve_paper_info import get_infos_from_semantic_scholar
 
 def scrape_sessions_eurosys22(url, conference_name):
     assert conference_name in ["eurosys22", "eurosys21"]
 
     html_content = get_cached_webpage(url)
-    soup = BeautifulSoup(html_content, 'html.parser')
+    # Titles are matched to the next list in document order, so the whole page is parsed
+    soup = make_soup(html_content)
     return parse_document_eurosys22(soup, conference_name)
 
 def parse_document_eurosys22(soup, conference_name):
@@ -60,12 +62,11 @@ def parse_document_eurosys22(soup, conference_name):
                 paper_name = paper.find('a').text.strip()
                 paper_link = paper.find('a')['href']
                 authors_list = paper.find('i').text.strip()
-                abstract, _ = get_info_from_semantic_scholar(paper_name)
 
                 paper = {
                     "title": paper_name,
                     "authors": authors_list,
-                    "abstract": abstract,
+                    "abstract": "",
                     "link": paper_link,
                 }
                 sessions[session_title].append(paper)
@@ -80,15 +81,18 @@ def parse_document_eurosys22(soup, conference_name):
 
                 paper_link = paper_li.find('a')['href']
 
-                abstract, _ = get_info_from_semantic_scholar(paper_title)
-
                 paper = {
                     "title": paper_title,
                     "authors": authors,
-                    "abstract": abstract,
+                    "abstract": "",
                     "link": paper_link,
                 }
                 sessions[session_title].append(paper)
 
+    # Look up all papers at once rather than one request per paper
+    papers = [paper for session_papers in sessions.values() for paper in session_papers]
+    infos = get_infos_from_semantic_scholar([paper["title"] for paper in papers])
+    for paper in papers:
+        paper["abstract"] = infos[paper["title"]]["abstract"]
 
     return sessions
@@ -1,20 +1,35 @@
-from bs4 import BeautifulSoup
-from retrieve_paper_info import get_info_from_semantic_scholar, get_abstract_from_osdi_nsdi_atc_link
+from bs4 import BeautifulSoup, SoupStrainer
+from html_parsing import make_soup
+from retrieve_paper_info import get_infos_from_semantic_scholar, get_abstracts_from_osdi_nsdi_atc_links
 from retrieve_webpage import get_cached_webpage
+from author_parsing import parse_authors
 
 def scrape_sessions(url, conference_name):
     # Get webpage content (from cache or download)
     html_content = get_cached_webpage(url)
     
     # Parse the HTML content
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = make_soup(html_content, SoupStrainer('article', class_=lambda c: c and 'node-session' in c))
 
     sessions = parse_document(soup, conference_name)
     return sessions
 
 def parse_document(soup, conference_name):
     session_divs = soup.find_all('article', class_=lambda c: c and 'node-session' in c)
-    return parse_sessions(session_divs, conference_name)
+    sessions = parse_sessions(session_divs, conference_name)
+    populate_missing_abstracts(sessions)
+    return sessions
+
+def populate_missing_abstracts(sessions):
+    # Papers without an abstract on the sessions page are looked up all at once
+    papers = [paper for papers in sessions.values() for paper in papers if paper["abstract"] is None]
+    infos = get_infos_from_semantic_scholar([paper["title"] for paper in papers])
+    for paper in papers:
+        paper["abstract"] = infos[paper["title"]]["abstract"]
+    # The rest are read from their paper pages, fetched together
+    papers = [paper for paper in papers if paper["abstract"] == ""]
+    for paper, abstract in zip(papers, get_abstracts_from_osdi_nsdi_atc_links([paper["link"] for paper in papers])):
+        paper["abstract"] = abstract
 
 def parse_sessions(session_divs, conference_name):
     sessions = {}
@@ -41,15 +56,14 @@ def parse_paper(paper_div, conference_name):
 
     authors_div = paper_div.find('div', class_='field-name-field-paper-people-text')
     authors = authors_div.find('p').get_text(strip=True) if authors_div else ""
-    # authors = parse_authors_osdi_nsdi_atc(authors)
+    authors = parse_authors_osdi_nsdi_atc(authors)
 
     abstract_div = paper_div.find('div', class_='field-name-field-paper-description-long')
 
     if abstract_div is None:
         print(f"abstract_div is None for {paper_title}")
-        abstract, _ = get_info_from_semantic_scholar(paper_title)
-        if abstract == "":
-            abstract = get_abstract_from_osdi_nsdi_atc_link(paper_link)
+        # Filled in by populate_missing_abstracts
+        abstract = None
     else:
         abstract_paragraphs = abstract_div.find_all('p')
 
@@ -66,34 +80,7 @@ def parse_paper(paper_div, conference_name):
     }
 
 def parse_authors_intitution_pair(author_institution_pair):
-    authors_processed = []
-
-    institution = author_institution_pair.split(",")[-1]
-    authors = author_institution_pair.split(",")[:-1]
-    for author in authors:
-        author = author.strip()
-        institution = institution.strip()
-
-        if author.startswith("and"):
-            author = author[4:].strip()
-
-        authors_processed.append({
-            "name": author,
-            "institution": institution
-        })
-
-    return authors_processed
+    return parse_authors(author_institution_pair, "usenix")
 
 def parse_authors_osdi_nsdi_atc(authors):
-    if authors == "":
-        return []
-
-    authors_processed = []
-    if ";" in authors:
-        author_institutions = authors.split(";")
-        for author_institution_pair in author_institutions:
-            authors_processed.extend(parse_authors_intitution_pair(author_institution_pair))
-    else:
-        authors_processed.extend(parse_authors_intitution_pair(authors))
-    
-    return authors_processed
\ No newline at end of file
+    return parse_authors(authors, "usenix")
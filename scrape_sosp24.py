@@ -1,5 +1,6 @@
 from bs4 import BeautifulSoup
-from retrieve_paper_info import get_info_from_semantic_scholar
+from html_parsing import make_soup
+from retrieve_paper_info import get_infos_from_semantic_scholar
 from retrieve_webpage import get_cached_webpage
 
 def scrape_sessions_sosp24(url):
@@ -7,7 +8,8 @@ def scrape_sessions_sosp24(url):
     html_content = get_cached_webpage(url)
     
     # Parse the HTML content
-    soup = BeautifulSoup(html_content, 'html.parser')
+    # Authors are found by walking forward in document order, so the whole page is parsed
+    soup = make_soup(html_content)
     return parse_document_sosp24(soup)
 
 def parse_document_sosp24(soup):
@@ -23,18 +25,19 @@ def parse_document_sosp24(soup):
         session_titles.append(session_title)
 
     titles = soup.find_all('a', href=lambda h: 'assets/papers/' in h)
+    infos = get_infos_from_semantic_scholar([title.text.strip() for title in titles])
     papers = []
 
     for title in titles:
         print(title.text.strip())
         authors = title.parent.find_next('em').text.strip()
         print(authors)
-        abstract, link = get_info_from_semantic_scholar(title.text.strip())
+        info = infos[title.text.strip()]
         papers.append({
             "title": title.text.strip(),
             "authors": authors,
-            "abstract": abstract,
-            "link": link
+            "abstract": info["abstract"],
+            "link": info["link"]
         })
 
     papers_in_each_session = [4, 4, 5, 4, 4, 4, 5, 4, 4, 5]
@@ -1,6 +1,7 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from html_parsing import make_soup
 from retrieve_webpage import get_cached_webpage
-from retrieve_paper_info import get_info_from_semantic_scholar
+from retrieve_paper_info import get_infos_from_semantic_scholar
 from utils import flat_map
 
 
@@ -8,7 +9,7 @@ def scrape_sessions_sosp_old(url, conference_name):
     assert conference_name in ["sosp21", "sosp23", "sosp19"], "Invalid conference name"
 
     html_content = get_cached_webpage(url)
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = make_soup(html_content, SoupStrainer('div', class_='main-text' if conference_name == "sosp19" else 'program'))
     return parse_document_sosp_old(soup, conference_name)
 
 def parse_document_sosp_old(soup, conference_name):
@@ -58,11 +59,10 @@ def parse_document_sosp_old(soup, conference_name):
                 i += 1
                 authors = table_rows[i].text.strip()
 
-                abstract, _ = get_info_from_semantic_scholar(paper_name)
                 papers.append({
                     "title": paper_name,
                     "authors": authors,
-                    "abstract": abstract,
+                    "abstract": "",
                     "link": paper_link,
                 })
             
@@ -72,4 +72,10 @@ def parse_document_sosp_old(soup, conference_name):
         sessions[session_title] = papers
         i += 1
 
+    # Look up all papers at once rather than one request per paper
+    papers = [paper for session_papers in sessions.values() for paper in session_papers]
+    infos = get_infos_from_semantic_scholar([paper["title"] for paper in papers])
+    for paper in papers:
+        paper["abstract"] = infos[paper["title"]]["abstract"]
+
     return sessions
\ No newline at end of file
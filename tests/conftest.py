@@ -0,0 +1,60 @@
+import os
+import sys
+import pytest
+
+# The modules live at the top level of the repository rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import CacheStore
+import EnrichmentCache
+import ParseCache
+import PaperStore
+import RateLimiter
+import RunMetrics
+import http_client
+from StandInServer import StandInServer
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """
+    Run each test in its own directory, so that .cache/ and the output directories start empty,
+    with fresh process-wide stores for it.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(CacheStore, "cache_stores", {})
+    monkeypatch.setattr(ParseCache, "parse_caches", {})
+    monkeypatch.setattr(EnrichmentCache, "enrichment_caches", {})
+    monkeypatch.setattr(RateLimiter, "rate_limiters", {})
+    monkeypatch.setattr(PaperStore, "paper_stores", {})
+    monkeypatch.setattr(RunMetrics, "run_metrics", RunMetrics.RunMetrics())
+
+@pytest.fixture
+def stand_in(tmp_path, monkeypatch):
+    """
+    A StandInServer answering every request from fixtures under tmp_path, with retries backing
+    off for milliseconds. Add responses with http_client.record_response, and configure the
+    server's injected failures through its attributes.
+    """
+    fixtures = str(tmp_path / "fixtures")
+    monkeypatch.setattr(http_client, "fixtures_dir", fixtures)
+    monkeypatch.setattr(http_client, "backoff_base_seconds", 0.01)
+    monkeypatch.setattr(http_client, "backoff_max_seconds", 0.05)
+    server = StandInServer(fixtures, port=0, retry_after=0)
+    server.start()
+    monkeypatch.setattr(http_client, "stand_in_url", server.url)
+    yield server
+    server.stop()
+
+@pytest.fixture
+def requests_made(stand_in):
+    """The (method, path) of every request the stand-in server answers, making up Semantic Scholar results"""
+    stand_in.synthesize = True
+    made = []
+    respond = stand_in.respond
+
+    def recording_respond(method, path, body):
+        made.append((method, path.split("?")[0]))
+        return respond(method, path, body)
+
+    stand_in.respond = recording_respond
+    return made
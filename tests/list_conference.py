@@ -0,0 +1,27 @@
+"""A minimal strategy-1 conference whose pages the tests record as stand-in fixtures"""
+import http_client
+from Paper import Paper
+from ScrapingStrategies import AbstractScrapingStrategy1
+from html_parsing import make_soup
+from retrieve_webpage import get_cached_webpage
+
+TOP_LEVEL_URL = "https://conf.example/program"
+
+class ListScrapingStrategy(AbstractScrapingStrategy1):
+    """Sessions are the links of the top-level page, and papers the list items of a session page"""
+    def extract_session_titles_and_links(self, top_level_soup):
+        return [(link.text, link["href"]) for link in top_level_soup.find_all("a")]
+
+    def link_to_papers(self, session_link):
+        soup = make_soup(get_cached_webpage(session_link))
+        return [Paper(item.text, link=item.get("data-link", "")) for item in soup.find_all("li")]
+
+def record_conference(sessions, papers_per_session, link=None):
+    links = "".join([f'<a href="https://conf.example/session/{number}">Session {number}</a>' for number in range(sessions)])
+    http_client.record_response("GET", TOP_LEVEL_URL, None, None, 200, f"<html>{links}</html>", {})
+    for number in range(sessions):
+        items = "".join([
+            f'<li data-link="{link(number, paper) if link else ""}">Paper {number}.{paper}</li>'
+            for paper in range(papers_per_session)
+        ])
+        http_client.record_response("GET", f"https://conf.example/session/{number}", None, None, 200, f"<ul>{items}</ul>", {})
@@ -0,0 +1,76 @@
+import http_client
+from author_parsing import parse_authors, parse_author_pairs, author_style
+from ConferenceScraper import ConferenceScraper
+from OsdiAtcNsdiConferenceScraper import OsdiAtcNsdiConferenceScraper
+from Paper import Paper, encode_sessions, decode_sessions
+from ParseCache import memoize_parse, parse_key, get_parse_cache
+
+def test_usenix_groups_share_their_institution():
+    assert parse_author_pairs("Ada Lovelace and Alan Turing, University of Cambridge; Grace Hopper, Yale University", "usenix") == (
+        ("Ada Lovelace", "University of Cambridge"),
+        ("Alan Turing", "University of Cambridge"),
+        ("Grace Hopper", "Yale University"),
+    )
+
+def test_usenix_institutions_may_contain_commas():
+    assert parse_author_pairs("A, B, University of California, Berkeley", "usenix") == (
+        ("A", "University of California, Berkeley"),
+        ("B", "University of California, Berkeley"),
+    )
+
+def test_usenix_company_suffixes_stay_with_the_company():
+    assert parse_author_pairs("A, B, Google, Inc.", "usenix") == (("A", "Google, Inc."), ("B", "Google, Inc."))
+    assert parse_author_pairs("A, Meta, Ltd", "usenix") == (("A", "Meta, Ltd"),)
+
+def test_mlsys_lists_have_no_institutions():
+    assert parse_author_pairs("Ada Lovelace · Alan Turing · Grace Hopper", "mlsys") == (
+        ("Ada Lovelace", ""), ("Alan Turing", ""), ("Grace Hopper", ""),
+    )
+
+def test_auto_reads_parenthesized_institutions():
+    assert parse_author_pairs("A, B (MIT), C (ETH Zurich), D", "auto") == (
+        ("A", "MIT"), ("B", "MIT"), ("C", "ETH Zurich"), ("D", ""),
+    )
+
+def test_auto_splits_plain_names():
+    assert parse_author_pairs("A, B and C", "auto") == (("A", ""), ("B", ""), ("C", ""))
+
+def test_parse_authors_gives_records_and_passes_parsed_lists_through():
+    assert parse_authors("", "usenix") == []
+    assert parse_authors(None) == []
+    assert parse_authors("A  B, Inst", "usenix") == [{"name": "A B", "institution": "Inst"}]
+    assert parse_authors([{"name": " A ", "institution": None}]) == [{"name": "A", "institution": ""}]
+
+def test_author_style_by_venue():
+    assert author_style("osdi24") == "usenix"
+    assert author_style("osdi_atc25") == "usenix"
+    assert author_style("neurips24") == "mlsys"
+    assert author_style("sosp23") == "auto"
+
+def test_usenix_parses_memoized_before_authors_were_parsed_are_not_reused(stand_in):
+    url = "https://www.usenix.org/conference/osdi24/technical-sessions"
+    html = (
+        '<article class="node-session"><h2>Storage</h2><article class="node-paper">'
+        '<a href="/conference/osdi24/presentation/a">A Paper</a>'
+        '<div class="field-name-field-paper-people-text"><p>Ada Lovelace, MIT</p></div>'
+        '</article></article>'
+    )
+    http_client.record_response("GET", url, None, None, 200, html, {})
+    # The strategy as it was, when authors were kept as scraped
+    stale_strategy = type("OsdiAtcNsdiConferenceScraper", (OsdiAtcNsdiConferenceScraper,), {"version": 1})("osdi24")
+    memoize_parse(
+        stale_strategy,
+        "extract_sessions",
+        html,
+        lambda: {"Storage": [Paper("A Paper", authors="Ada Lovelace, MIT")]},
+        encode=encode_sessions,
+        decode=decode_sessions
+    )
+
+    strategy = OsdiAtcNsdiConferenceScraper("osdi24")
+    assert parse_key(strategy, "extract_sessions", html) != parse_key(stale_strategy, "extract_sessions", html)
+    scraper = ConferenceScraper("osdi24", url, scraping_strategy2=strategy)
+    scraper.extract()
+    assert scraper.sessions["Storage"][0].authors == [{"name": "Ada Lovelace", "institution": "MIT"}]
+    # And the stale parse is dropped
+    assert get_parse_cache().connection.execute("SELECT version FROM parsed").fetchall() == [(2,)]
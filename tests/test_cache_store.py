@@ -0,0 +1,138 @@
+import gzip
+import os
+import sqlite3
+import pytest
+import CacheStore
+from CacheStore import CacheStore as Store, database_path
+from EnrichmentCache import EnrichmentCache
+from ParseCache import ParseCache
+from RateLimiter import RateLimiter
+
+KEYS = ["%032x.html" % number for number in range(4)]
+
+def indexed_keys(store):
+    return sorted([row[0] for row in store.connection.execute("SELECT key FROM entries")])
+
+def test_entries_round_trip(tmp_path):
+    store = Store(str(tmp_path), compression=None)
+    store.put(KEYS[0], "https://www.usenix.org/a", "<p>café</p>\n", etag='"v1"')
+    assert store.get(KEYS[0], "https://www.usenix.org/a") == "<p>café</p>\n"
+    assert store.get_metadata(KEYS[0])["etag"] == '"v1"'
+    assert store.get(KEYS[1]) is None
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(CacheStore.time, "time", lambda: now[0])
+    store = Store(str(tmp_path), max_bytes=None, compression=None)
+    for key in KEYS[:3]:
+        now[0] += 1
+        store.put(key, "https://example.org/" + key, "x" * 100)
+    now[0] += 1
+    # Reading the oldest entry makes the second one the least recently used
+    store.get(KEYS[0])
+
+    store.max_bytes = 250
+    now[0] += 1
+    store.put(KEYS[3], "https://example.org/new", "x" * 50)
+    assert indexed_keys(store) == sorted([KEYS[0], KEYS[2], KEYS[3]])
+    assert not os.path.exists(tmp_path / KEYS[1])
+
+def test_lost_files_are_not_cached(tmp_path):
+    store = Store(str(tmp_path))
+    store.put(KEYS[0], "https://example.org/a", "<html></html>")
+    store.put(KEYS[1], "https://example.org/b", "<html></html>")
+    os.remove(store.path(KEYS[0], store.compression))
+
+    assert not store.contains(KEYS[0])
+    assert store.contains(KEYS[1])
+    assert store.get(KEYS[0]) is None
+    assert store.gc() == (0, 0)
+    os.remove(store.path(KEYS[1], store.compression))
+    assert store.gc() == (1, 0)
+    assert indexed_keys(store) == []
+
+def test_hits_are_written_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(CacheStore, "access_flush_seconds", 3600)
+    monkeypatch.setattr(CacheStore, "access_flush_size", 3)
+    store = Store(str(tmp_path))
+    for key in KEYS[:3]:
+        store.put(key, "https://www.usenix.org/" + key, "<html></html>")
+
+    store.get(KEYS[0], "https://www.usenix.org/a")
+    store.get(KEYS[0], "https://www.usenix.org/a")
+    store.get(KEYS[3], "https://www.usenix.org/b")
+    store.get(KEYS[1], "https://www.usenix.org/c")
+    assert store.connection.execute("SELECT COUNT(*) FROM host_stats").fetchone()[0] == 0
+    # The third entry read fills the batch
+    store.get(KEYS[2], "https://www.usenix.org/d")
+    assert store.connection.execute("SELECT hits, misses FROM host_stats").fetchall() == [(4, 1)]
+
+    store.get(KEYS[3], "https://www.usenix.org/b")
+    assert store.stats()["hosts"]["www.usenix.org"]["misses"] == 2
+
+def test_bodies_are_stored_compressed(tmp_path):
+    store = Store(str(tmp_path), compression="gzip")
+    store.put(KEYS[0], "https://www.usenix.org/a", "<p>café</p>\r\n" * 100)
+    with open(tmp_path / (KEYS[0] + ".gz"), 'rb') as f:
+        assert gzip.decompress(f.read()) == ("<p>café</p>\r\n" * 100).encode('utf-8')
+    # Decoded like the text-mode reads of uncompressed entries
+    assert store.get(KEYS[0]) == "<p>café</p>\n" * 100
+    assert store.total_bytes() < len("<p>café</p>\r\n" * 100)
+
+def test_uncompressed_entries_are_migrated(tmp_path):
+    for key in KEYS[:2]:
+        (tmp_path / key).write_text("<html>" + "a" * 1000 + "</html>", encoding='utf-8')
+    store = Store(str(tmp_path), compression="gzip")
+    # Entries are readable before and after the migration
+    assert store.get(KEYS[1]) == "<html>" + "a" * 1000 + "</html>"
+
+    migrated, before, after = store.compress_existing_entries()
+    assert migrated == 2
+    assert after < before
+    assert sorted([filename for filename in os.listdir(tmp_path) if filename.startswith("0")]) == [KEYS[0] + ".gz", KEYS[1] + ".gz"]
+    assert store.get(KEYS[0]) == "<html>" + "a" * 1000 + "</html>"
+
+def test_rewriting_an_entry_replaces_its_other_encodings(tmp_path):
+    Store(str(tmp_path), compression=None).put(KEYS[0], "https://example.org/", "old")
+    store = Store(str(tmp_path), compression="gzip")
+    store.put(KEYS[0], "https://example.org/", "new")
+    assert not os.path.exists(tmp_path / KEYS[0])
+    assert store.get(KEYS[0]) == "new"
+
+def test_unknown_compressions_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Invalid cache compression"):
+        Store(str(tmp_path), compression="brotli")
+
+def test_the_other_caches_databases_are_never_indexed(tmp_path):
+    ParseCache(str(tmp_path))
+    EnrichmentCache(str(tmp_path))
+    RateLimiter(str(tmp_path))
+    (tmp_path / "notes.txt").write_text("not an entry")
+    (tmp_path / KEYS[0]).write_text("<html></html>")
+    store = Store(str(tmp_path))
+    assert store.index_existing_files() == 1
+    assert indexed_keys(store) == [KEYS[0]]
+    # Compressing must not rewrite a live database as if it were a page
+    store.compress_existing_entries()
+    assert not any([filename.endswith(".gz") for filename in os.listdir(tmp_path / "db")])
+
+def test_databases_indexed_by_older_versions_are_dropped(tmp_path):
+    store = Store(str(tmp_path))
+    store.connection.execute(
+        "INSERT INTO entries (key, url, host, size, encoding) VALUES ('parsed.sqlite3', NULL, 'unknown', 10, NULL)"
+    )
+    store.connection.commit()
+    store.index_existing_files()
+    assert indexed_keys(store) == []
+
+def test_databases_are_moved_out_of_the_entries(tmp_path):
+    connection = sqlite3.connect(tmp_path / "parsed.sqlite3")
+    connection.execute("CREATE TABLE parsed (key TEXT)")
+    connection.execute("INSERT INTO parsed VALUES ('kept')")
+    connection.commit()
+    connection.close()
+
+    path = database_path(str(tmp_path), "parsed.sqlite3")
+    assert path == os.path.join(str(tmp_path), "db", "parsed.sqlite3")
+    assert not os.path.exists(tmp_path / "parsed.sqlite3")
+    assert sqlite3.connect(path).execute("SELECT key FROM parsed").fetchall() == [("kept",)]
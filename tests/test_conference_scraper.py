@@ -0,0 +1,55 @@
+import math
+import pytest
+import ConferenceScraper as conference_scraper
+from ConferenceScraper import ConferenceScraper
+from list_conference import TOP_LEVEL_URL, ListScrapingStrategy, record_conference
+from retrieve_paper_info import semantic_scholar_bulk_search_titles_per_query
+
+def test_small_sessions_share_bulk_searches(requests_made):
+    record_conference(30, 4)
+    scraper = ConferenceScraper("conf24", TOP_LEVEL_URL, ListScrapingStrategy())
+    scraper.extract()
+
+    papers = [paper for papers in scraper.sessions.values() for paper in papers]
+    assert len(papers) == 120
+    assert all([paper.abstract == f"Synthetic abstract of {paper.title}." for paper in papers])
+    bulk_searches = requests_made.count(("GET", "/api.semanticscholar.org/graph/v1/paper/search/bulk"))
+    # Each enrich worker may end with a partial batch, but not one per session
+    assert bulk_searches <= math.ceil(120 / semantic_scholar_bulk_search_titles_per_query) + conference_scraper.pipeline_stage_workers["enrich"]
+    assert ("GET", "/api.semanticscholar.org/graph/v1/paper/search") not in requests_made
+
+def test_papers_with_dois_share_batch_requests(requests_made):
+    record_conference(30, 4, lambda session, paper: f"https://doi.org/10.1145/{session}.{paper}")
+    scraper = ConferenceScraper("conf24", TOP_LEVEL_URL, ListScrapingStrategy())
+    scraper.extract()
+
+    assert all([paper.abstract != "" for papers in scraper.sessions.values() for paper in papers])
+    assert requests_made.count(("POST", "/api.semanticscholar.org/graph/v1/paper/batch")) <= conference_scraper.pipeline_stage_workers["enrich"]
+    assert ("GET", "/api.semanticscholar.org/graph/v1/paper/search/bulk") not in requests_made
+
+def test_streamed_sessions_are_enriched_in_batches(requests_made):
+    record_conference(30, 4)
+    written = []
+
+    class Writer:
+        def write_session(self, session_title, papers):
+            written.append((session_title, [paper.abstract != "" for paper in papers]))
+
+    ConferenceScraper("conf24", TOP_LEVEL_URL, ListScrapingStrategy()).extract(Writer(), stream=True)
+    assert [session_title for session_title, _ in written] == [f"Session {number}" for number in range(30)]
+    assert all([all(enriched) for _, enriched in written])
+    assert requests_made.count(("GET", "/api.semanticscholar.org/graph/v1/paper/search/bulk")) < 30
+
+def test_streamed_sessions_are_not_kept(requests_made):
+    record_conference(3, 2)
+    scraper = ConferenceScraper("conf24", TOP_LEVEL_URL, ListScrapingStrategy())
+    with pytest.raises(ValueError, match="needs an output writer"):
+        scraper.extract(stream=True)
+
+    class Writer:
+        def write_session(self, session_title, papers):
+            pass
+
+    scraper.extract(Writer(), stream=True)
+    assert scraper.sessions == {}
+    assert scraper.parsed_top_level_soup is None and scraper.fetched_top_level_html is None
@@ -0,0 +1,87 @@
+import json
+import http_client
+from EnrichmentCache import get_enrichment_cache, index_existing_cache, miss_retry_age
+from CacheStore import get_cache_store
+from retrieve_paper_info import (
+    get_cached_info_from_semantic_scholar, get_infos_from_semantic_scholar, semantic_scholar_search_fetch,
+    semantic_scholar_bulk_search_url, semantic_scholar_batch_fields
+)
+from retrieve_webpage import get_cache_key
+
+SEARCH = ("GET", "/api.semanticscholar.org/graph/v1/paper/search")
+BULK_SEARCH = ("GET", "/api.semanticscholar.org/graph/v1/paper/search/bulk")
+
+def info(abstract="", link=""):
+    return {"abstract": abstract, "link": link, "doi": "", "open_access_pdf": ""}
+
+def record_search(title, papers):
+    fetch = semantic_scholar_search_fetch(title)
+    http_client.record_response("GET", fetch["url"], fetch["params"], None, 200, json.dumps({"total": len(papers), "data": papers}), {})
+
+def record_empty_bulk_search(title):
+    params = {"query": f'"{title}"', "fields": semantic_scholar_batch_fields}
+    http_client.record_response("GET", semantic_scholar_bulk_search_url, params, None, 200, json.dumps({"total": 0, "data": []}), {})
+
+def age_entries(seconds):
+    cache = get_enrichment_cache()
+    cache.connection.execute("UPDATE enrichment SET updated_at = updated_at - ?", (seconds,))
+    cache.connection.commit()
+
+def test_results_are_found_under_any_spelling_of_the_title():
+    cache = get_enrichment_cache()
+    cache.put("FractOS: Slashing the Disaggregation Tax", info("Abstract"), "bulk")
+    assert cache.get("fractos slashing the disaggregation tax")["abstract"] == "Abstract"
+    assert cache.get_many(["Fractos -- Slashing the disaggregation tax!", "Unknown"]) == {
+        "Fractos -- Slashing the disaggregation tax!": info("Abstract")
+    }
+
+def test_abstracts_are_never_replaced_by_empty_results():
+    cache = get_enrichment_cache()
+    cache.put("A paper", info("Abstract", "link"), "bulk")
+    cache.put("A paper", info(link="other link"), "search")
+    assert cache.get("A paper") == info("Abstract", "link")
+    cache.put("A paper", info("Better abstract"), "search")
+    assert cache.get("A paper") == info("Better abstract")
+
+def test_misses_expire_and_results_do_not():
+    cache = get_enrichment_cache()
+    cache.put("Found", info("Abstract"), "bulk")
+    cache.put("Not found", info(), "search")
+    assert cache.get("Not found") == info()
+
+    age_entries(miss_retry_age + 1)
+    assert cache.get("Not found") is None
+    assert cache.get("Found") == info("Abstract")
+
+def test_misses_are_searched_again_after_a_week(requests_made):
+    record_empty_bulk_search("Obscure paper")
+    record_search("Obscure paper", [])
+    assert get_infos_from_semantic_scholar(["Obscure paper"])["Obscure paper"] == info()
+    assert requests_made == [BULK_SEARCH, SEARCH]
+    # An empty cached search is not a result
+    assert get_cached_info_from_semantic_scholar("Obscure paper") is None
+
+    requests_made.clear()
+    get_infos_from_semantic_scholar(["Obscure paper"])
+    assert requests_made == []
+
+    age_entries(miss_retry_age + 1)
+    record_search("Obscure paper", [{"title": "Obscure paper", "abstract": "Found at last", "url": "https://s2/1"}])
+    # The cached empty search is forgotten, so the search really is made again. The same bulk
+    # query is still answered from the webpage cache
+    assert get_infos_from_semantic_scholar(["Obscure paper"])["Obscure paper"]["abstract"] == "Found at last"
+    assert requests_made == [SEARCH]
+    assert get_enrichment_cache().get("obscure paper")["abstract"] == "Found at last"
+
+def test_existing_bulk_responses_are_migrated():
+    response = {"total": 2, "data": [
+        {"title": "First paper", "abstract": "First abstract", "url": "https://s2/1"},
+        {"title": "Second paper", "abstract": None, "url": "https://s2/2"}
+    ]}
+    params = {"query": "anything", "fields": semantic_scholar_batch_fields}
+    get_cache_store().put(
+        get_cache_key(semantic_scholar_bulk_search_url, params, "json"), semantic_scholar_bulk_search_url, json.dumps(response)
+    )
+    assert index_existing_cache() == 2
+    assert get_enrichment_cache().get("first paper")["abstract"] == "First abstract"
+    assert get_enrichment_cache().get("Second Paper")["link"] == "https://s2/2"
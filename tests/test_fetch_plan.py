@@ -0,0 +1,119 @@
+import pytest
+import ConferenceScraper as conference_scraper
+import retrieve_webpage
+from ConferenceScraper import ConferenceScraper
+from FetchPlan import FetchPlan, planning, get_active_fetch_plan, estimated_download_seconds, estimated_browser_seconds
+from list_conference import TOP_LEVEL_URL, ListScrapingStrategy, record_conference
+from retrieve_webpage import get_cached_webpage, is_webpage_cached
+
+@pytest.fixture
+def fetch_interval(monkeypatch):
+    """Ten seconds between downloads from any host"""
+    monkeypatch.setattr(retrieve_webpage, "get_fetch_interval", lambda host, target_url: 10)
+    return 10
+
+def test_fetches_are_counted_per_host():
+    plan = FetchPlan()
+    plan.add("https://a.example/1", True)
+    plan.add("https://a.example/2", False)
+    plan.add("https://b.example/1", False)
+    plan.add_possible("https://b.example/search", 3)
+
+    assert plan.misses() == 2
+    assert plan.missed_urls() == {"https://a.example/2", "https://b.example/1"}
+    assert plan.hosts["a.example"]["hits"] == 1
+    assert plan.hosts["b.example"]["possible"] == 3
+
+def test_misses_can_be_made_possible():
+    plan = FetchPlan()
+    plan.add("https://dl.example/1", False)
+    plan.add("https://dl.example/2", False)
+    plan.make_possible("dl.example")
+    plan.make_possible("never.example")
+
+    assert plan.misses() == 0
+    assert plan.missed_urls() == set()
+    assert plan.hosts["dl.example"]["possible"] == 2
+
+def test_plans_merge():
+    first = FetchPlan()
+    first.add("https://a.example/1", False)
+    first.note("first")
+    second = FetchPlan()
+    second.add("https://a.example/2", True, browser=True)
+    second.add("https://b.example/1", False)
+    second.note("second")
+    first.merge(second)
+
+    assert first.hosts["a.example"]["hits"] == 1
+    assert first.hosts["a.example"]["browser"]
+    assert first.misses() == 2
+    assert first.notes == ["first", "second"]
+
+def test_a_host_is_busy_for_its_politeness_sleeps(fetch_interval):
+    plan = FetchPlan()
+    for number in range(3):
+        plan.add(f"https://a.example/{number}", False)
+    plan.add_possible("https://a.example/search", 2)
+
+    assert plan.estimate_host_seconds("a.example") == 2 * fetch_interval + estimated_download_seconds
+    assert plan.estimate_host_seconds("a.example", include_possible=True) == 4 * fetch_interval + estimated_download_seconds
+
+def test_a_host_is_busy_for_its_downloads_when_they_are_slower(fetch_interval):
+    plan = FetchPlan()
+    for number in range(3):
+        plan.add(f"https://a.example/{number}", False, browser=True)
+
+    assert plan.estimate_host_seconds("a.example") == 3 * estimated_browser_seconds
+
+def test_the_slowest_host_sets_the_wall_time(fetch_interval):
+    plan = FetchPlan()
+    assert plan.estimate_seconds() == 0
+    plan.add("https://a.example/1", False)
+    for number in range(4):
+        plan.add(f"https://b.example/{number}", False)
+
+    assert plan.estimate_seconds() == plan.estimate_host_seconds("b.example") == 3 * fetch_interval + estimated_download_seconds
+    assert plan.report()["hosts"]["a.example"]["estimated_seconds"] == estimated_download_seconds
+
+def test_plans_cannot_be_nested():
+    with planning(FetchPlan()):
+        with pytest.raises(AssertionError):
+            with planning(FetchPlan()):
+                pass
+    assert get_active_fetch_plan() is None
+
+def test_nothing_is_downloaded_while_planning(stand_in):
+    with planning(FetchPlan()) as plan:
+        assert get_cached_webpage("https://a.example/") is None
+    assert plan.missed_urls() == {"https://a.example/"}
+    assert stand_in.stats["requests"] == 0
+
+def test_a_plan_counts_uncached_sessions_without_fetching_them(stand_in, monkeypatch):
+    # A single enrich worker, so that the cached sessions share one bulk search
+    monkeypatch.setitem(conference_scraper.pipeline_stage_workers, "enrich", 1)
+    record_conference(4, 3)
+    for url in [TOP_LEVEL_URL, "https://conf.example/session/0", "https://conf.example/session/1"]:
+        get_cached_webpage(url)
+    scraper = ConferenceScraper("conf24", TOP_LEVEL_URL, ListScrapingStrategy())
+    plan = scraper.plan()
+
+    assert stand_in.stats["requests"] == 3
+    assert not is_webpage_cached("https://conf.example/session/2")
+    assert plan.hosts["conf.example"]["misses"] == 2
+    assert plan.missed_urls() >= {"https://conf.example/session/2", "https://conf.example/session/3"}
+    # The bulk search for the cached sessions' papers, then either their single searches or the
+    # bulk search for the papers guessed to be on the uncached sessions
+    semantic_scholar = plan.hosts["api.semanticscholar.org"]
+    assert semantic_scholar["misses"] == 1
+    assert semantic_scholar["possible"] == 6 + 1
+    assert plan.notes == ["2 session pages are not cached, with about 6 papers to enrich"]
+    assert scraper.sessions == {}
+
+def test_a_plan_without_the_top_level_page_stops_there(stand_in):
+    record_conference(4, 3)
+    plan = ConferenceScraper("conf24", TOP_LEVEL_URL, ListScrapingStrategy()).plan()
+
+    assert stand_in.stats["requests"] == 0
+    assert plan.missed_urls() == {TOP_LEVEL_URL}
+    assert plan.notes == [f"{TOP_LEVEL_URL} is not cached, so its sessions and papers are unknown"]
@@ -0,0 +1,33 @@
+import pytest
+from bs4 import SoupStrainer
+import html_parsing
+from html_parsing import make_soup, strainer_selector
+
+PAGE = """
+<html><body>
+<div class="timebox day"><h2>Monday</h2><div class="timebox"><a href="/s/1">Session &amp; one</a></div></div>
+<div class="other"><a href="/s/2">Not kept</a></div>
+<div class="timebox"><a href="/s/3">Session "three"</a>
+</body></html>
+"""
+
+def test_html_parser_is_the_default():
+    assert html_parsing.html_parser_backend == "html.parser"
+
+@pytest.mark.parametrize("backend", html_parsing.available_html_parser_backends())
+def test_backends_keep_the_same_elements(backend):
+    parse_only = SoupStrainer('div', class_='timebox')
+    expected = make_soup(PAGE, parse_only, backend="html.parser")
+    soup = make_soup(PAGE, parse_only, backend=backend)
+    assert [(link["href"], link.text) for link in soup.find_all('a')] == [("/s/1", "Session & one"), ("/s/3", 'Session "three"')]
+    assert [div.get("class") for div in soup.find_all('div', recursive=False)] == [div.get("class") for div in expected.find_all('div', recursive=False)]
+
+def test_strainers_are_translated_only_when_exact():
+    assert strainer_selector(SoupStrainer('div', class_='timebox')) == 'div[class~="timebox"]'
+    assert strainer_selector(SoupStrainer('section', id='abstract')) == 'section[id="abstract"]'
+    assert strainer_selector(SoupStrainer(['div', 'span'])) is None
+    assert strainer_selector(SoupStrainer('div', class_=lambda value: True)) is None
+
+def test_unknown_backends_are_rejected():
+    with pytest.raises(ValueError, match="Invalid HTML parser backend"):
+        html_parsing.set_html_parser_backend("html5lib")
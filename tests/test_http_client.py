@@ -0,0 +1,83 @@
+import time
+from email.utils import formatdate
+import pytest
+import http_client
+from http_client import get_session, is_retryable, parse_retry_after, retry_delay
+from retrieve_webpage import get_cached_webpage
+from RunMetrics import get_run_metrics
+
+def record_page(url, text, status=200):
+    http_client.record_response("GET", url, None, None, status, text, {})
+
+def test_only_transient_failures_are_retried():
+    assert [status for status in [None, 200, 304, 404, 408, 429, 500, 503] if is_retryable(status)] == [None, 408, 429, 500, 503]
+
+def test_retry_after_is_read_as_seconds_or_a_date():
+    assert parse_retry_after("7") == 7
+    assert parse_retry_after("-3") == 0
+    assert parse_retry_after(formatdate(time.time() + 60, usegmt=True)) == pytest.approx(60, abs=2)
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+def test_backoff_honors_retry_after_up_to_the_maximum(monkeypatch):
+    monkeypatch.setattr(http_client, "backoff_max_seconds", 300)
+    assert retry_delay(0, {"Retry-After": "12"}) == 12
+    assert retry_delay(0, {"Retry-After": "9999"}) == 300
+    # Full jitter under an exponential cap
+    delays = [retry_delay(3) for _ in range(200)]
+    assert all([0 <= delay <= 16 for delay in delays])
+    assert max(delays) > 8
+
+def test_requests_to_a_host_share_one_pooled_session():
+    assert get_session("retry.example") is get_session("retry.example")
+    assert get_session("retry.example") is not get_session("other.example")
+
+def test_rate_limited_requests_are_retried_until_served(stand_in):
+    record_page("https://retry.example/warm", "warm")
+    record_page("https://retry.example/page", "page")
+    # Request 0 is served, 1 and 2 get a 429, and 3 is served
+    stand_in.burst_every = 1
+    stand_in.burst_length = 2
+
+    assert get_cached_webpage("https://retry.example/warm") == "warm"
+    assert get_cached_webpage("https://retry.example/page") == "page"
+    assert stand_in.stats["rate_limited"] == 2
+    assert stand_in.stats["requests"] == 4
+    assert get_run_metrics().hosts["retry.example"]["misses"] == 2
+
+def test_retry_after_holds_the_retry_back(stand_in, monkeypatch):
+    monkeypatch.setattr(http_client, "backoff_max_seconds", 300)
+    record_page("https://retry.example/warm", "warm")
+    record_page("https://retry.example/page", "page")
+    stand_in.burst_every = 1
+    stand_in.burst_length = 1
+    stand_in.retry_after = 0.3
+
+    get_cached_webpage("https://retry.example/warm")
+    start = time.perf_counter()
+    assert get_cached_webpage("https://retry.example/page") == "page"
+    assert time.perf_counter() - start >= 0.3
+    assert get_run_metrics().seconds["sleep_retry"] == pytest.approx(0.3)
+
+def test_server_errors_give_up_after_the_last_retry(stand_in, monkeypatch):
+    monkeypatch.setattr(http_client, "max_retries", 2)
+    stand_in.failure_rate = 1
+    with pytest.raises(Exception, match="Status code 500"):
+        get_cached_webpage("https://retry.example/page")
+    assert stand_in.stats["failed"] == 3
+
+def test_dropped_connections_are_retried(stand_in, monkeypatch):
+    monkeypatch.setattr(http_client, "max_retries", 2)
+    stand_in.drop_rate = 1
+    with pytest.raises(Exception, match="after 3 attempts"):
+        get_cached_webpage("https://retry.example/page")
+    assert stand_in.stats["dropped"] == 3
+
+    stand_in.drop_rate = 0
+    record_page("https://retry.example/page", "page")
+    assert get_cached_webpage("https://retry.example/page") == "page"
+
+def test_client_errors_are_not_retried(stand_in):
+    with pytest.raises(Exception, match="Status code 404"):
+        get_cached_webpage("https://retry.example/missing")
+    assert stand_in.stats["requests"] == 1
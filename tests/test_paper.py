@@ -0,0 +1,46 @@
+import json
+import pytest
+from Paper import Paper, Session, encode_papers, decode_papers, encode_sessions, decode_sessions
+
+def test_records_round_trip_with_their_extra_fields():
+    record = {"title": "A", "authors": "Ada Lovelace", "abstract": "", "link": "https://a.example", "doi": "10.1145/1", "track": "research"}
+    paper = Paper.from_json(record)
+    assert paper.extra == {"doi": "10.1145/1", "track": "research"}
+    assert paper.to_json() == record
+    assert list(paper.to_json()) == ["title", "authors", "abstract", "link", "doi", "track"]
+    assert Paper.from_json(paper) is paper
+
+def test_missing_fields_default_to_empty():
+    assert Paper.from_json({"title": "A"}).to_json() == {"title": "A", "authors": "", "abstract": "", "link": ""}
+
+def test_papers_are_slotted():
+    paper = Paper("A")
+    assert not hasattr(paper, "__dict__")
+    with pytest.raises(AttributeError):
+        paper.venue = "osdi"
+    assert not hasattr(Session("S", []), "__dict__")
+
+def test_papers_are_indexed_like_the_dicts_they_replace():
+    paper = Paper("A", link="https://a.example")
+    paper["abstract"] = "Found"
+    paper["doi"] = "10.1145/1"
+    assert paper["abstract"] == paper.abstract == "Found"
+    assert paper["doi"] == paper.get("doi") == "10.1145/1"
+    assert paper.get("track", "research") == "research"
+    assert "doi" in paper and "track" not in paper
+    assert dict(paper.items()) == {"title": "A", "authors": "", "abstract": "Found", "link": "https://a.example", "doi": "10.1145/1"}
+    with pytest.raises(KeyError):
+        paper["track"]
+
+def test_sessions_round_trip_through_json():
+    sessions = {"Storage": [Paper("A", authors=[{"name": "Ada Lovelace", "institution": "MIT"}]), Paper("B", extra={"doi": "1"})]}
+    decoded = decode_sessions(json.loads(json.dumps(encode_sessions(sessions))))
+    assert decoded == sessions
+    assert list(decoded) == ["Storage"]
+    assert decode_papers(encode_papers(sessions["Storage"])) == sessions["Storage"]
+
+def test_repeated_author_names_are_shared():
+    first = Paper("A", authors=[{"name": "".join(["Ada ", "Lovelace"]), "institution": None}])
+    second = Paper("B", authors=[{"name": "".join(["Ada ", "Lov", "elace"]), "institution": "MIT"}])
+    assert first.authors[0]["name"] is second.authors[0]["name"]
+    assert first.authors[0]["institution"] == ""
@@ -0,0 +1,98 @@
+import json
+import pytest
+from PaperStore import PaperStore, parse_conference_name, conference_name_from_path
+
+def paper(title, authors="", abstract=""):
+    return {"title": title, "authors": authors, "abstract": abstract, "link": ""}
+
+@pytest.fixture
+def store(tmp_path):
+    store = PaperStore(str(tmp_path / "papers.sqlite3"))
+    store.upsert_conference("osdi23", {
+        "Storage": [
+            paper("Disaggregating Memory at Scale", "Ada Lovelace and Alan Turing, University of Cambridge", "Remote memory over RDMA."),
+            paper("A Log-Structured Store", "Grace Hopper, Yale University", "Writes are appended."),
+        ],
+    })
+    store.upsert_conference("nsdi24", {
+        "Networking": [paper("Congestion Control for RDMA", "Ada Lovelace, Google, Inc.", "Datacenter networks.")],
+    })
+    store.upsert_conference("osdi_atc25", {
+        "Memory": [paper("Disaggregated Memory Revisited", "Barbara Liskov, MIT", "Far memory again.")],
+    })
+    return store
+
+def titles(results):
+    return [result["title"] for result in results]
+
+def test_search_stems_words_and_ranks_title_matches_first(store):
+    results = store.search("disaggregation")
+    assert set(titles(results)) == {"Disaggregating Memory at Scale", "Disaggregated Memory Revisited"}
+    assert titles(store.search("rdma")) == ["Congestion Control for RDMA", "Disaggregating Memory at Scale"]
+    assert store.search("appended")[0]["session"] == "Storage"
+
+def test_search_filters_by_venue_and_year(store):
+    # osdi also matches the combined osdi_atc
+    assert titles(store.search("memory", venues=["osdi"], since=2024)) == ["Disaggregated Memory Revisited"]
+    assert titles(store.search("rdma", venues=["nsdi"])) == ["Congestion Control for RDMA"]
+    assert store.search("rdma", venues=["sosp"]) == []
+
+def test_search_falls_back_to_words_for_invalid_syntax(store):
+    assert titles(store.search("Log-Structured Store:")) == ["A Log-Structured Store"]
+
+def test_papers_by_author_and_institution(store):
+    assert titles(store.papers_by(author="lovelace")) == ["Congestion Control for RDMA", "Disaggregating Memory at Scale"]
+    assert titles(store.papers_by(institution="Cambridge")) == ["Disaggregating Memory at Scale"]
+    assert titles(store.papers_by(author="Lovelace", since=2024)) == ["Congestion Control for RDMA"]
+
+def test_institutions_count_papers_not_authors(store):
+    # Two Cambridge authors share one paper
+    assert sorted(store.top_institutions(venues=["osdi"])) == [("MIT", 1), ("University of Cambridge", 1), ("Yale University", 1)]
+    assert store.top_institutions(venues=["nsdi"]) == [("Google, Inc.", 1)]
+
+def test_company_suffixes_stay_in_the_institution(store):
+    assert titles(store.papers_by(institution="Google, Inc.")) == ["Congestion Control for RDMA"]
+
+def test_unchanged_conferences_are_not_written_again(store):
+    data = {"Storage": [paper("A Log-Structured Store", "Grace Hopper, Yale University", "Writes are appended.")]}
+    assert store.upsert_conference("sosp23", data) == {"inserted": 1, "updated": 0, "removed": 0}
+    assert store.upsert_conference("sosp23", data) is None
+    assert store.upsert_conference("sosp23", data, force=True) == {"inserted": 0, "updated": 0, "removed": 0}
+
+def test_changed_papers_are_updated_and_missing_ones_removed(store):
+    counts = store.upsert_conference("osdi23", {
+        "Storage": [paper("Disaggregating Memory at Scale", "Grace Hopper, Yale University", "Remote memory over CXL.")],
+    })
+    assert counts == {"inserted": 0, "updated": 1, "removed": 1}
+    assert titles(store.search("cxl")) == ["Disaggregating Memory at Scale"]
+    assert store.search("rdma", venues=["osdi"]) == []
+    assert store.search("appended") == []
+    # The author index follows the new authors
+    assert titles(store.papers_by(author="Turing")) == []
+    assert titles(store.papers_by(author="Hopper")) == ["Disaggregating Memory at Scale"]
+
+def test_conferences_can_be_removed(store):
+    store.remove_conference("nsdi24")
+    assert store.conference_names() == ["osdi23", "osdi_atc25"]
+    assert titles(store.search("rdma")) == ["Disaggregating Memory at Scale"]
+
+def test_papers_come_back_in_scraped_order(store):
+    assert [stored["title"] for stored in store.papers("osdi23")] == ["Disaggregating Memory at Scale", "A Log-Structured Store"]
+    assert store.stats()["osdi23"] == {"venue": "osdi", "year": 2023, "sessions": 1, "papers": 2, "missing_abstracts": 0}
+
+def test_json_and_jsonl_outputs_are_ingested(store, tmp_path):
+    path = tmp_path / "json_format" / "sosp23_sessions.json"
+    path.parent.mkdir()
+    path.write_text(json.dumps([paper("Flat List Paper")]), encoding="utf-8")
+    assert store.ingest_file(str(path)) == ("sosp23", {"inserted": 1, "updated": 0, "removed": 0})
+
+    path = tmp_path / "eurosys24.jsonl"
+    path.write_text(json.dumps({"conference": "eurosys24", "session": "Systems", **paper("Streamed Paper")}) + "\n", encoding="utf-8")
+    assert store.ingest_file(str(path))[0] == "eurosys24"
+    assert store.search("streamed")[0]["session"] == "Systems"
+
+def test_conference_names():
+    assert parse_conference_name("osdi24") == ("osdi", 2024)
+    assert parse_conference_name("osdi_atc25") == ("osdi_atc", 2025)
+    assert parse_conference_name("hotos") == ("hotos", None)
+    assert conference_name_from_path("json_format/osdi24_sessions.json") == "osdi24"
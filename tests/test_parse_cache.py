@@ -0,0 +1,53 @@
+import ParseCache
+from ParseCache import memoize_parse, get_parse_cache
+from Paper import Paper, encode_papers, decode_papers
+from ScrapingStrategies import AbstractScrapingStrategy1
+
+class CountingStrategy(AbstractScrapingStrategy1):
+    def __init__(self, track="research"):
+        self.track = track
+
+    def extract_session_titles_and_links(self, top_level_soup):
+        return []
+
+    def link_to_papers(self, session_link):
+        return []
+
+def memoize(strategy, content, calls, argument=""):
+    def parse():
+        calls.append(content)
+        return [Paper(f"Parsed from {content}", abstract="")]
+    return memoize_parse(strategy, "link_to_papers", content, parse, argument, encode_papers, decode_papers)
+
+def test_pages_are_parsed_once_per_content():
+    calls = []
+    assert memoize(CountingStrategy(), "<ul>a</ul>", calls) == [Paper("Parsed from <ul>a</ul>")]
+    assert memoize(CountingStrategy(), "<ul>a</ul>", calls) == [Paper("Parsed from <ul>a</ul>")]
+    assert calls == ["<ul>a</ul>"]
+    memoize(CountingStrategy(), "<ul>b</ul>", calls)
+    memoize(CountingStrategy(), "<ul>a</ul>", calls, argument="https://other.example/session")
+    assert len(calls) == 3
+
+def test_results_are_kept_per_strategy_configuration():
+    calls = []
+    memoize(CountingStrategy("research"), "<ul>a</ul>", calls)
+    memoize(CountingStrategy("industry"), "<ul>a</ul>", calls)
+    assert len(calls) == 2
+
+def test_stale_versions_are_cleared():
+    calls = []
+    memoize(CountingStrategy(), "<ul>a</ul>", calls)
+    count = lambda: get_parse_cache().connection.execute("SELECT COUNT(*) FROM parsed").fetchone()[0]
+
+    # Other strategies' results are kept
+    get_parse_cache().clear_stale(type("OtherStrategy", (CountingStrategy,), {"version": 2})())
+    assert count() == 1
+    get_parse_cache().clear_stale(type("CountingStrategy", (CountingStrategy,), {"version": 2})())
+    assert count() == 0
+
+def test_the_parse_cache_can_be_turned_off(monkeypatch):
+    monkeypatch.setattr(ParseCache, "USE_PARSE_CACHE", False)
+    calls = []
+    memoize(CountingStrategy(), "<ul>a</ul>", calls)
+    memoize(CountingStrategy(), "<ul>a</ul>", calls)
+    assert len(calls) == 2
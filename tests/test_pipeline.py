@@ -0,0 +1,105 @@
+import threading
+import time
+import pytest
+from Pipeline import Pipeline, PipelineStage
+
+def test_results_come_back_in_input_order():
+    def jitter(item):
+        time.sleep(0.001 * (item % 3))
+        return item * 2
+    pipeline = Pipeline([PipelineStage("a", jitter, workers=4, queue_size=2), PipelineStage("b", lambda item: item + 1, workers=3)])
+    handed = []
+    assert pipeline.run(range(50), handed.append) == [item * 2 + 1 for item in range(50)]
+    assert handed == [item * 2 + 1 for item in range(50)]
+
+def test_a_failing_item_is_raised_after_the_rest_are_drained():
+    def fail_on_seven(item):
+        if item == 7:
+            raise ValueError("seven")
+        return item
+    pipeline = Pipeline([PipelineStage("a", fail_on_seven, workers=2, queue_size=1), PipelineStage("b", lambda item: item, workers=2, queue_size=1)])
+    with pytest.raises(ValueError, match="seven"):
+        pipeline.run(range(100))
+
+def test_a_failing_callback_stops_the_run():
+    def callback(item):
+        if item == 3:
+            raise RuntimeError("callback")
+    with pytest.raises(RuntimeError, match="callback"):
+        Pipeline([PipelineStage("a", lambda item: item, workers=2)]).run(range(20), callback)
+
+def test_batches_are_gathered_until_the_next_item_does_not_fit():
+    batches = []
+    def add_one(items):
+        batches.append(list(items))
+        return [item + 1 for item in items]
+    pipeline = Pipeline([
+        PipelineStage("a", lambda item: item, workers=2),
+        PipelineStage("batch", add_one, workers=1, batch_fits=lambda items: sum(items) <= 10),
+    ])
+    assert pipeline.run([3, 3, 3, 3, 12, 1]) == [4, 4, 4, 4, 13, 2]
+    # An item too large for any batch gets one of its own
+    assert batches == [[3, 3, 3], [3], [12], [1]]
+
+def test_partial_batches_run_when_the_input_waits_on_them():
+    batches = []
+    def record(items):
+        batches.append(len(items))
+        return items
+    pipeline = Pipeline([PipelineStage("batch", record, workers=1, batch_fits=lambda items: True)])
+    handed = []
+    pipeline.run(range(20), handed.append, keep_results=False, max_pending=3)
+    assert handed == list(range(20))
+    assert max(batches) <= 3
+
+def test_a_failing_batch_is_raised():
+    def fail(items):
+        raise ValueError("batch")
+    with pytest.raises(ValueError, match="batch"):
+        Pipeline([PipelineStage("batch", fail, workers=2, batch_fits=lambda items: len(items) <= 4)]).run(range(30))
+
+def test_a_failure_before_a_batch_stage_is_raised():
+    def fail_on_seven(item):
+        if item == 7:
+            raise ValueError("seven")
+        return {"value": item}
+    pipeline = Pipeline([
+        PipelineStage("a", fail_on_seven, workers=2),
+        # Drained items are not dicts, so measuring them would fail
+        PipelineStage("batch", lambda items: items, workers=2, batch_fits=lambda items: sum([item["value"] for item in items]) <= 20),
+        PipelineStage("c", lambda item: item, workers=2),
+    ])
+    with pytest.raises(ValueError, match="seven"):
+        pipeline.run(range(30))
+
+def test_dropped_results_bound_the_items_in_flight():
+    in_flight = [0]
+    peak = [0]
+    lock = threading.Lock()
+    def stage(item):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        return item
+    def callback(item):
+        with lock:
+            in_flight[0] -= 1
+    pipeline = Pipeline([PipelineStage("a", stage, workers=2, queue_size=2)])
+    assert pipeline.run(range(200), callback, keep_results=False, max_pending=3) is None
+    assert peak[0] <= 3
+    assert pipeline.results == {}
+
+def test_a_failure_does_not_hang_an_endless_input_when_results_are_dropped():
+    def fail_on_fifty(item):
+        if item == 50:
+            raise ValueError("fifty")
+        return item
+    handed = []
+    def endless():
+        item = 0
+        while True:
+            yield item
+            item += 1
+    with pytest.raises(ValueError, match="fifty"):
+        Pipeline([PipelineStage("a", fail_on_fifty, workers=2, queue_size=2)]).run(endless(), handed.append, keep_results=False)
+    assert handed == list(range(50))
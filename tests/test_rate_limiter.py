@@ -0,0 +1,47 @@
+import pytest
+import RateLimiter
+from RateLimiter import RateLimit, RateLimiter as Limiter
+
+@pytest.fixture
+def limiter(tmp_path, monkeypatch):
+    monkeypatch.setattr(RateLimiter, "host_rate_limits", {
+        "fast": RateLimit(initial_rate=1, min_rate=0.25, max_rate=2, additive_increase=0.5, burst=1),
+        "polite": RateLimit(initial_rate=0.5, min_rate=0.1, max_rate=0.5, additive_increase=0.1, initial_tokens=0),
+    })
+    monkeypatch.setattr(RateLimiter.time, "time", lambda: 1000.0)
+    return Limiter(str(tmp_path))
+
+def test_first_request_uses_the_initial_tokens(limiter):
+    assert limiter.reserve("fast") == 0
+    assert limiter.reserve("fast") == pytest.approx(1)
+    assert limiter.reserve("polite") == pytest.approx(2)
+
+def test_scraped_sites_wait_before_their_first_request(tmp_path):
+    assert Limiter(str(tmp_path)).reserve("dl.acm.org") == pytest.approx(60, abs=1)
+
+def test_successes_increase_the_rate_additively_up_to_the_maximum(limiter):
+    limiter.record_success("fast")
+    assert limiter.interval("fast") == pytest.approx(1 / 1.5)
+    for _ in range(5):
+        limiter.record_success("fast")
+    assert limiter.interval("fast") == pytest.approx(1 / 2)
+
+def test_throttling_halves_the_rate_down_to_the_minimum_and_holds_requests_back(limiter):
+    limiter.record_throttled("fast", seconds=10)
+    assert limiter.interval("fast") == pytest.approx(2)
+    # The 10s hold at the new rate, then one interval for this request
+    assert limiter.reserve("fast") == pytest.approx(12)
+    for _ in range(5):
+        limiter.record_throttled("fast")
+    assert limiter.interval("fast") == pytest.approx(4)
+
+def test_tokens_refill_with_time_up_to_the_burst(limiter, monkeypatch):
+    assert limiter.reserve("fast") == 0
+    monkeypatch.setattr(RateLimiter.time, "time", lambda: 1100.0)
+    assert limiter.reserve("fast") == 0
+    assert limiter.reserve("fast") == pytest.approx(1)
+
+def test_processes_sharing_a_cache_directory_share_the_budget(limiter, tmp_path):
+    other_process = Limiter(str(tmp_path))
+    assert limiter.reserve("fast") == 0
+    assert other_process.reserve("fast") == pytest.approx(1)
@@ -0,0 +1,58 @@
+import json
+import http_client
+import retrieve_paper_info
+from retrieve_paper_info import get_infos_from_semantic_scholar, semantic_scholar_bulk_search_url, semantic_scholar_batch_fields
+from RunMetrics import get_run_metrics
+
+def test_titles_are_resolved_twenty_per_bulk_search(requests_made):
+    titles = [f"Paper number {number}" for number in range(45)]
+    infos = get_infos_from_semantic_scholar(titles)
+
+    assert requests_made == [("GET", "/api.semanticscholar.org/graph/v1/paper/search/bulk")] * 3
+    assert infos["Paper number 44"]["abstract"] == "Synthetic abstract of Paper number 44."
+    assert get_run_metrics().enrichment["bulk_resolved"] == 45
+
+def test_dois_are_resolved_five_hundred_per_batch(requests_made):
+    titles = [f"Paper number {number}" for number in range(1001)]
+    dois = {title: f"10.1145/{number}" for number, title in enumerate(titles)}
+    infos = get_infos_from_semantic_scholar(titles, dois)
+
+    assert requests_made == [("POST", "/api.semanticscholar.org/graph/v1/paper/batch")] * 3
+    assert infos["Paper number 1000"]["doi"] == "10.1145/1000"
+    assert get_run_metrics().enrichment["batch_resolved"] == 1001
+
+def test_titles_missing_from_the_bulk_results_fall_back_to_a_single_search(requests_made):
+    titles = ["Found in bulk", "Only found alone"]
+    http_client.record_response(
+        "GET",
+        semantic_scholar_bulk_search_url,
+        {"query": '"Found in bulk" | "Only found alone"', "fields": semantic_scholar_batch_fields},
+        None,
+        200,
+        json.dumps({"total": 1, "data": [{"title": "Found in Bulk", "abstract": "Bulk abstract", "url": "https://s2/1"}]}),
+        {}
+    )
+    infos = get_infos_from_semantic_scholar(titles)
+
+    assert requests_made == [
+        ("GET", "/api.semanticscholar.org/graph/v1/paper/search/bulk"),
+        ("GET", "/api.semanticscholar.org/graph/v1/paper/search")
+    ]
+    assert infos["Found in bulk"]["abstract"] == "Bulk abstract"
+    assert infos["Only found alone"]["abstract"] == "Synthetic abstract of Only found alone."
+
+def test_resolved_titles_are_not_looked_up_again(requests_made):
+    titles = [f"Paper number {number}" for number in range(30)]
+    first = get_infos_from_semantic_scholar(titles)
+    requests_made.clear()
+
+    # Spelled differently, as another conference might
+    assert get_infos_from_semantic_scholar([title.upper() for title in titles])["PAPER NUMBER 3"] == first["Paper number 3"]
+    assert requests_made == []
+
+def test_bulk_queries_drop_quotes_from_titles(requests_made, monkeypatch):
+    monkeypatch.setattr(retrieve_paper_info, "semantic_scholar_bulk_search_titles_per_query", 2)
+    infos = get_infos_from_semantic_scholar(['The "quoted" paper', "Another"])
+
+    assert len(requests_made) == 1
+    assert infos['The "quoted" paper']["abstract"] == "Synthetic abstract of The quoted paper."
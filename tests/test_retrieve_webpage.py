@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import http_client
+import retrieve_webpage
+from CacheStore import get_cache_store
+from retrieve_webpage import async_get_cached_webpage, get_cache_key, get_cached_webpage, get_cached_webpages, is_webpage_cached, run_sync
+
+def record_page(url, text, status=200, headers=None):
+    http_client.record_response("GET", url, None, None, status, text, headers or {})
+
+@pytest.fixture
+def in_flight(monkeypatch):
+    """The most downloads in flight at once, per host and in total"""
+    lock = threading.Lock()
+    current = {}
+    peak = {}
+    download_webpage = retrieve_webpage.download_webpage
+
+    def tracked_download_webpage(url, *args):
+        hosts = [retrieve_webpage.get_host(url), "total"]
+        with lock:
+            for host in hosts:
+                current[host] = current.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), current[host])
+        try:
+            # Long enough for any other download that is allowed to start to overlap this one
+            time.sleep(0.05)
+            return download_webpage(url, *args)
+        finally:
+            with lock:
+                for host in hosts:
+                    current[host] -= 1
+
+    monkeypatch.setattr(retrieve_webpage, "download_webpage", tracked_download_webpage)
+    return peak
+
+def test_one_download_at_a_time_per_host_with_hosts_in_parallel(stand_in, in_flight):
+    urls = [f"https://{host}/paper/{number}" for number in range(4) for host in ["a.example", "b.example"]]
+    for url in urls:
+        record_page(url, f"<html>{url}</html>")
+
+    assert get_cached_webpages(urls) == [f"<html>{url}</html>" for url in urls]
+    assert in_flight == {"a.example": 1, "b.example": 1, "total": 2}
+
+def test_hosts_can_allow_more_downloads_at_once(stand_in, in_flight, monkeypatch):
+    monkeypatch.setattr(retrieve_webpage, "host_concurrency_limits", {"c.example": 2})
+    urls = [f"https://c.example/paper/{number}" for number in range(6)]
+    for url in urls:
+        record_page(url, url)
+
+    assert get_cached_webpages(urls) == urls
+    assert in_flight["c.example"] == 2
+
+def test_the_per_host_limit_holds_across_threads(stand_in, in_flight):
+    urls = [f"https://d.example/paper/{number}" for number in range(6)]
+    for url in urls:
+        record_page(url, url)
+
+    # Each worker thread blocks in run_sync while its fetch runs on the shared loop
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        assert list(executor.map(get_cached_webpage, urls)) == urls
+    assert in_flight == {"d.example": 1, "total": 1}
+
+def test_pages_are_downloaded_once(stand_in):
+    url = "https://e.example/schedule"
+    record_page(url, "<html></html>")
+
+    assert get_cached_webpages([url, url, url]) == ["<html></html>"] * 3
+    assert get_cached_webpage(url) == "<html></html>"
+    assert stand_in.stats["requests"] == 1
+    assert is_webpage_cached(url)
+
+def test_failed_downloads_raise_in_the_caller_and_are_not_cached(stand_in):
+    record_page("https://f.example/found", "found")
+
+    with pytest.raises(Exception, match="Status code 404"):
+        get_cached_webpage("https://f.example/missing")
+    with pytest.raises(Exception, match="Status code 404"):
+        get_cached_webpages(["https://f.example/found", "https://f.example/missing"])
+    assert not is_webpage_cached("https://f.example/missing")
+    # The loop keeps serving fetches after a failure
+    assert get_cached_webpage("https://f.example/found") == "found"
+
+def test_blocking_on_the_fetch_loop_is_refused(stand_in):
+    record_page("https://g.example/", "page")
+
+    async def fetch_blocking():
+        return run_sync(async_get_cached_webpage("https://g.example/"))
+
+    with pytest.raises(RuntimeError, match="must await"):
+        run_sync(fetch_blocking())
+    assert stand_in.stats["requests"] == 0
+
+def test_pages_whose_cached_file_was_lost_are_downloaded_again(stand_in):
+    url = "https://h.example/"
+    record_page(url, "page")
+    assert get_cached_webpage(url) == "page"
+
+    store = get_cache_store()
+    os.remove(store.path(get_cache_key(url), store.compression))
+    assert get_cached_webpage(url) == "page"
+    assert get_cached_webpages([url]) == ["page"]
+    assert stand_in.stats["requests"] == 2
+
+@pytest.fixture
+def revalidating(monkeypatch):
+    """Revalidate every cached page of i.example on each request"""
+    monkeypatch.setattr(retrieve_webpage, "REVALIDATE", True)
+    monkeypatch.setattr(retrieve_webpage, "revalidation_max_age", {"i.example": -1})
+
+def test_unchanged_pages_are_kept_and_changed_ones_replaced(stand_in, revalidating):
+    url = "https://i.example/program"
+    record_page(url, "first", headers={"ETag": '"1"'})
+    assert get_cached_webpage(url) == "first"
+
+    record_page(url, "", status=304)
+    assert get_cached_webpage(url) == "first"
+    record_page(url, "second", headers={"ETag": '"2"'})
+    assert get_cached_webpage(url) == "second"
+    assert get_cache_store().get_metadata(get_cache_key(url))["etag"] == '"2"'
+    assert stand_in.stats["requests"] == 3
+
+def test_failed_revalidations_serve_the_cached_copy(stand_in, revalidating, capsys):
+    url = "https://i.example/program"
+    record_page(url, "first")
+    assert get_cached_webpage(url) == "first"
+
+    stand_in.failure_rate = 1
+    assert get_cached_webpage(url) == "first"
+    assert "could not revalidate" in capsys.readouterr().out
+    record_page(url, "gone", status=404)
+    stand_in.failure_rate = 0
+    assert get_cached_webpages([url]) == ["first"]
+
+def test_failed_revalidations_raise_without_a_cached_copy(stand_in, revalidating):
+    stand_in.failure_rate = 1
+    with pytest.raises(Exception, match="Status code 500"):
+        get_cached_webpage("https://i.example/program")
@@ -0,0 +1,79 @@
+import json
+import pytest
+import ConferenceScraper as conference_scraper
+import http_client
+from ConferenceScraper import ConferenceScraper
+from RunJournal import RunJournal
+from list_conference import TOP_LEVEL_URL, ListScrapingStrategy, record_conference
+
+def test_a_run_resumes_from_its_own_journal():
+    journal = RunJournal("osdi24")
+    journal.start({"strategy": "usenix", "version": 1})
+    journal.append({"event": "sessions", "sessions": ["Storage"]})
+    journal.append({"event": "session", "title": "Storage", "papers": []})
+    journal.close()
+
+    journal = RunJournal("osdi24")
+    assert journal.resume({"strategy": "usenix", "version": 1}) == [
+        {"event": "sessions", "sessions": ["Storage"]},
+        {"event": "session", "title": "Storage", "papers": []}
+    ]
+    journal.append({"event": "done"})
+    journal.close()
+    assert RunJournal("osdi24").read()[-1] == {"event": "done"}
+
+def test_a_different_run_starts_over():
+    journal = RunJournal("osdi24")
+    journal.start({"strategy": "usenix", "version": 1})
+    journal.append({"event": "sessions", "sessions": ["Storage"]})
+    journal.close()
+
+    journal = RunJournal("osdi24")
+    assert journal.resume({"strategy": "usenix", "version": 2}) == []
+    journal.close()
+    assert RunJournal("osdi24").read() == [{"event": "start", "run": {"strategy": "usenix", "version": 2}}]
+
+def test_a_torn_last_line_is_dropped_on_resume():
+    journal = RunJournal("osdi24")
+    journal.start({"version": 1})
+    journal.append({"event": "sessions", "sessions": ["Storage"]})
+    journal.close()
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"event": "sess')
+
+    journal = RunJournal("osdi24")
+    assert journal.resume({"version": 1}) == [{"event": "sessions", "sessions": ["Storage"]}]
+    journal.append({"event": "done"})
+    journal.close()
+    with open(journal.path, 'r', encoding='utf-8') as f:
+        assert [json.loads(line)["event"] for line in f] == ["start", "sessions", "done"]
+
+def test_a_stopped_extraction_resumes_without_fetching_its_sessions_again(requests_made, monkeypatch):
+    # One fetch worker, so that the sessions before the missing one are fetched first
+    monkeypatch.setitem(conference_scraper.pipeline_stage_workers, "fetch", 1)
+    record_conference(4, 3)
+    http_client.record_response("GET", "https://conf.example/session/2", None, None, 404, "", {})
+    with pytest.raises(Exception, match="Status code 404"):
+        ConferenceScraper("conf24", TOP_LEVEL_URL, ListScrapingStrategy()).extract()
+    journaled = set([record["session"] for record in RunJournal("conf24").read() if "session" in record])
+    assert journaled >= {"Session 0", "Session 1"}
+
+    record_conference(4, 3)
+    fetched = []
+    get_cached_webpage = conference_scraper.get_cached_webpage
+
+    def recording_get_cached_webpage(url, *args, **kwargs):
+        fetched.append(url)
+        return get_cached_webpage(url, *args, **kwargs)
+
+    monkeypatch.setattr(conference_scraper, "get_cached_webpage", recording_get_cached_webpage)
+    scraper = ConferenceScraper("conf24", TOP_LEVEL_URL, ListScrapingStrategy())
+    scraper.extract(resume=True)
+
+    # The top-level page is not needed either, as the journal lists the sessions
+    assert TOP_LEVEL_URL not in fetched
+    assert "https://conf.example/session/0" not in fetched
+    assert "https://conf.example/session/2" in fetched
+    assert list(scraper.sessions) == [f"Session {number}" for number in range(4)]
+    assert all([paper.abstract != "" for papers in scraper.sessions.values() for paper in papers])
+    assert RunJournal("conf24").read()[-1]["event"] == "finished"
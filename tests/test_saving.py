@@ -0,0 +1,25 @@
+from saving import JsonlWriter, read_jsonl, save_to_jsonl
+
+def test_jsonl_records_carry_their_conference_and_session():
+    with JsonlWriter("osdi24") as writer:
+        writer.write_paper({"title": "A"})
+        writer.write_session("Storage", [{"title": "B"}, {"title": "C"}])
+        # Flushed per paper, so readable before the writer is closed
+        assert len(list(read_jsonl("osdi24.jsonl"))) == 3
+    assert writer.papers_written == 3
+    assert list(read_jsonl("jsonl_format/osdi24.jsonl")) == [
+        {"conference": "osdi24", "session": None, "title": "A"},
+        {"conference": "osdi24", "session": "Storage", "title": "B"},
+        {"conference": "osdi24", "session": "Storage", "title": "C"}
+    ]
+
+def test_save_to_jsonl_writes_every_session():
+    save_to_jsonl({"Storage": [{"title": "A"}], "Networking": [{"title": "B"}]}, "nsdi24", "nsdi24_papers.jsonl")
+    assert [(record["session"], record["title"]) for record in read_jsonl("nsdi24_papers.jsonl")] == [
+        ("Storage", "A"), ("Networking", "B")
+    ]
+
+def test_non_ascii_text_is_kept_readable():
+    save_to_jsonl({"Système": [{"title": "Café"}]}, "eurosys24")
+    with open("jsonl_format/eurosys24.jsonl", 'r', encoding='utf-8') as f:
+        assert "Café" in f.read()
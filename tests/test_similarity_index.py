@@ -0,0 +1,83 @@
+import pytest
+import SimilarityIndex as similarity_index
+from SimilarityIndex import SimilarityIndex, tokenize
+
+def paper(title, abstract=""):
+    return {"title": title, "abstract": abstract, "link": ""}
+
+osdi23 = [
+    paper("Disaggregated Memory over RDMA", "Remote memory pages are fetched over RDMA."),
+    paper("A Log-Structured File System", "Writes are appended to a log on flash."),
+    paper("Scheduling Serverless Functions", "Cold starts of serverless functions are scheduled away."),
+]
+nsdi24 = [
+    paper("Congestion Control for RDMA Networks", "Datacenter RDMA traffic needs congestion control."),
+    paper("Far Memory for Serverless", "Serverless functions page to far memory."),
+]
+eurosys24 = [
+    paper("Memory Tiering", "Hot pages stay in local memory."),
+    paper("RDMA Transactions"),
+]
+
+@pytest.fixture
+def index(tmp_path):
+    index = SimilarityIndex(str(tmp_path / "index"))
+    index.add_conference("osdi23", osdi23)
+    index.add_conference("nsdi24", nsdi24)
+    return index
+
+def titles(matches):
+    return [match["title"] for match in matches]
+
+def scores(index):
+    """The scores of every osdi23 paper's matches, in one list"""
+    return [match["score"] for matches in index.similar_to_papers([("osdi23", paper["title"]) for paper in osdi23]) for match in matches]
+
+def test_stop_words_are_not_terms():
+    assert tokenize("A paper about the RDMA network") == ["rdma", "network"]
+
+def test_texts_find_papers_across_conferences_best_first(index):
+    matches = index.similar_to_texts(["rdma congestion"], k=2)[0]
+    assert titles(matches) == ["Congestion Control for RDMA Networks", "Disaggregated Memory over RDMA"]
+    assert matches[0]["conference"] == "nsdi24"
+    assert matches[0]["score"] > matches[1]["score"] > 0
+    # Only papers sharing a term are similar at all
+    assert titles(index.similar_to_texts(["flash log"])[0]) == ["A Log-Structured File System"]
+    assert index.similar_to_texts(["quantum"])[0] == []
+
+def test_papers_are_not_their_own_best_match(index):
+    related, unknown = index.similar_to_papers([("osdi23", "Scheduling serverless functions"), ("osdi23", "Not Indexed")], k=1)
+    assert titles(related) == ["Far Memory for Serverless"]
+    assert unknown == []
+
+def test_the_index_is_loaded_from_disk(index, tmp_path):
+    loaded = SimilarityIndex(str(tmp_path / "index"))
+    assert loaded.stats() == index.stats()
+    assert scores(loaded) == scores(index)
+
+def test_adding_a_conference_again_replaces_it(index):
+    index.add_conference("nsdi24", nsdi24[:1])
+    assert index.stats()["papers"] == 4
+    assert titles(index.similar_to_texts(["far memory"])[0]) == ["Disaggregated Memory over RDMA"]
+
+def test_removed_conferences_are_not_matched(index):
+    index.remove_conference("nsdi24")
+    assert index.stats()["papers"] == 3
+    assert titles(index.similar_to_texts(["rdma"])[0]) == ["Disaggregated Memory over RDMA"]
+
+def test_reweighting_matches_weighting_everything_at_once(index, tmp_path, monkeypatch):
+    # Too little growth to reweight on adding, so the earlier conferences keep their old weights
+    monkeypatch.setattr(similarity_index, "reweight_growth", 10)
+    index.add_conference("eurosys24", eurosys24)
+    assert index.stats()["weighted_papers"] < index.stats()["papers"]
+    drifted = scores(index)
+
+    index.reweight()
+    assert index.stats()["weighted_papers"] == index.stats()["papers"]
+    assert scores(index) != pytest.approx(drifted)
+
+    rebuilt = SimilarityIndex(str(tmp_path / "rebuilt"))
+    for conference_name, papers in [("osdi23", osdi23), ("nsdi24", nsdi24), ("eurosys24", eurosys24)]:
+        rebuilt.add_conference(conference_name, papers)
+    rebuilt.reweight()
+    assert scores(index) == pytest.approx(scores(rebuilt))
@@ -0,0 +1,85 @@
+import random
+import time
+from utils import keys_kept_in_order, merge_sessions, structural_diff
+
+def paper(title, **fields):
+    return {"title": title, "authors": "", "abstract": "", "link": "", **fields}
+
+def kinds(changes):
+    return sorted([(change["kind"], change.get("title", change.get("session"))) for change in changes])
+
+def test_identical_sessions_have_no_changes():
+    sessions = {"S": [paper("A"), paper("B")]}
+    assert structural_diff(sessions, sessions) == []
+
+def test_inserting_a_paper_does_not_move_the_ones_after_it():
+    old = {"S": [paper("A"), paper("B"), paper("C")]}
+    new = {"S": [paper("Z"), paper("A"), paper("B"), paper("C")]}
+    assert kinds(structural_diff(old, new)) == [("added", "Z")]
+
+def test_removing_a_paper_does_not_move_the_ones_after_it():
+    old = {"S": [paper("A"), paper("B"), paper("C")]}
+    new = {"S": [paper("B"), paper("C")]}
+    assert kinds(structural_diff(old, new)) == [("removed", "A")]
+
+def test_reordering_moves_only_the_papers_out_of_order():
+    old = {"S": [paper("A"), paper("B"), paper("C"), paper("D")]}
+    new = {"S": [paper("A"), paper("C"), paper("D"), paper("B")]}
+    assert kinds(structural_diff(old, new)) == [("moved", "B")]
+
+def test_a_paper_in_another_session_has_moved():
+    old = {"S": [paper("A")], "T": [paper("B")]}
+    new = {"S": [], "T": [paper("B"), paper("A")]}
+    changes = structural_diff(old, new)
+    assert kinds(changes) == [("moved", "A")]
+    assert changes[0]["old_session"] == "S" and changes[0]["session"] == "T"
+
+def test_titles_are_matched_after_normalization_and_fields_compared():
+    old = {"S": [paper("A System, for Things", abstract="old")]}
+    new = {"S": [paper("a system for things", abstract="new")]}
+    changes = structural_diff(old, new)
+    assert [change["kind"] for change in changes] == ["changed"]
+    assert changes[0]["fields"]["abstract"] == ("old", "new")
+
+def test_merge_keeps_old_abstracts_and_fills_in_missing_links():
+    old = {"S": [paper("A", abstract="kept", link="old link"), paper("Gone")]}
+    new = {"S": [paper("A", abstract="", link=""), paper("New", abstract="fresh")]}
+    merged = merge_sessions(old, new)
+    assert merged == {"S": [paper("A", abstract="kept", link="old link"), paper("New", abstract="fresh")]}
+
+def test_merge_prefers_new_non_empty_links_and_leaves_inputs_alone():
+    old = {"S": [paper("A", link="old link")]}
+    new = {"S": [paper("A", link="new link")]}
+    assert merge_sessions(old, new)["S"][0]["link"] == "new link"
+    assert new["S"][0]["link"] == "new link" and old["S"][0]["link"] == "old link"
+
+def test_the_longest_run_in_order_is_kept():
+    old = {"S": [paper(title) for title in "ABCDEFGH"]}
+    new = {"S": [paper(title) for title in "HABGCDEF"]}
+    assert kinds(structural_diff(old, new)) == [("moved", "G"), ("moved", "H")]
+
+def test_keys_kept_in_order_match_a_longest_common_subsequence():
+    rng = random.Random(0)
+    for _ in range(200):
+        old_keys = list(range(rng.randint(0, 12)))
+        new_keys = rng.sample(old_keys, rng.randint(0, len(old_keys))) + [100, 101]
+        rng.shuffle(new_keys)
+        kept = keys_kept_in_order(old_keys, new_keys)
+        assert [key for key in old_keys if key in kept] == [key for key in new_keys if key in kept]
+        # Without repeated keys, the longest common subsequence is as long as the longest increasing run
+        assert len(kept) == longest_common_subsequence_length(old_keys, new_keys)
+
+def longest_common_subsequence_length(old, new):
+    lengths = [[0] * (len(new) + 1) for _ in range(len(old) + 1)]
+    for i in range(len(old)):
+        for j in range(len(new)):
+            lengths[i + 1][j + 1] = lengths[i][j] + 1 if old[i] == new[j] else max(lengths[i][j + 1], lengths[i + 1][j])
+    return lengths[-1][-1]
+
+def test_large_sessions_are_diffed_quickly():
+    titles = [f"Paper {number}" for number in range(50000)]
+    shuffled = titles[1:] + titles[:1]
+    start = time.perf_counter()
+    changes = structural_diff({"S": [paper(title) for title in titles]}, {"S": [paper(title) for title in shuffled]})
+    assert kinds(changes) == [("moved", "Paper 0")]
+    assert time.perf_counter() - start < 5
@@ -1,4 +1,7 @@
+import bisect
 import difflib
+import re
+import unicodedata
 
 def flat_map(f, xs):
     ys = []
@@ -15,3 +18,166 @@ def pretty_print_diff(old, new):
             print(f"\033[91m{line}\033[0m")
         else:
             print(line)
+
+def normalize_title(title: str) -> str:
+    """Normalize a title so that differences in case, punctuation and whitespace are ignored."""
+    title = unicodedata.normalize("NFKC", title).lower()
+    title = re.sub(r"[^\w\s]", " ", title)
+    return " ".join(title.split())
+
+def index_papers(sessions):
+    """Map each paper's key to its session, position and record. Repeated titles are numbered to keep keys unique."""
+    index = {}
+    for session_title, papers in sessions.items():
+        for position, paper in enumerate(papers):
+            key = normalize_title(paper["title"])
+            occurrence = 0
+            while (key, occurrence) in index:
+                occurrence += 1
+            index[(key, occurrence)] = (session_title, position, paper)
+    return index
+
+def longest_increasing_subsequence(values):
+    """Indexes of a longest strictly increasing subsequence of values, in O(n log n) by patience sorting."""
+    # tails[k] is the index of the smallest last value of an increasing subsequence of length k + 1
+    tails = []
+    tail_values = []
+    previous = [None] * len(values)
+    for index, value in enumerate(values):
+        length = bisect.bisect_left(tail_values, value)
+        if length > 0:
+            previous[index] = tails[length - 1]
+        if length == len(tails):
+            tails.append(index)
+            tail_values.append(value)
+        else:
+            tails[length] = index
+            tail_values[length] = value
+
+    indexes = []
+    index = tails[-1] if len(tails) > 0 else None
+    while index is not None:
+        indexes.append(index)
+        index = previous[index]
+    return indexes[::-1]
+
+def keys_kept_in_order(old_keys, new_keys):
+    """
+    The most keys of two sequences of distinct keys whose order relative to each other is the same in
+    both. Taking the new keys' old positions, these are their longest increasing subsequence.
+    """
+    old_positions = {key: position for position, key in enumerate(old_keys)}
+    common_keys = [key for key in new_keys if key in old_positions]
+    return set([common_keys[index] for index in longest_increasing_subsequence([old_positions[key] for key in common_keys])])
+
+def structural_diff(old_sessions, new_sessions):
+    """
+    Compare two {session title: [paper]} dicts paper by paper, keyed by normalized title.
+    Returns a list of changes, each a dict with a kind of "added", "removed", "moved" or "changed".
+    A paper has moved if it changed session, or if its order relative to the other papers kept in
+    its session changed, so that adding or removing one paper does not move every paper after it.
+    """
+    old_index = index_papers(old_sessions)
+    new_index = index_papers(new_sessions)
+    changes = []
+
+    for session_title in old_sessions:
+        if session_title not in new_sessions:
+            changes.append({"kind": "removed_session", "session": session_title})
+    for session_title in new_sessions:
+        if session_title not in old_sessions:
+            changes.append({"kind": "added_session", "session": session_title})
+
+    # Papers in the same session in both, in their old and new order within it. Indexes list each
+    # session's papers in order, so no sorting is needed
+    stayed = {}
+    for key, (session_title, _, _) in old_index.items():
+        if key in new_index and new_index[key][0] == session_title:
+            stayed.setdefault(session_title, ([], []))[0].append(key)
+    for key, (session_title, _, _) in new_index.items():
+        if key in old_index and old_index[key][0] == session_title:
+            stayed[session_title][1].append(key)
+    in_order = set()
+    for old_keys, new_keys in stayed.values():
+        in_order.update(keys_kept_in_order(old_keys, new_keys))
+
+    for key, (session_title, _, paper) in old_index.items():
+        if key not in new_index:
+            changes.append({"kind": "removed", "title": paper["title"], "session": session_title})
+
+    for key, (session_title, position, paper) in new_index.items():
+        if key not in old_index:
+            changes.append({"kind": "added", "title": paper["title"], "session": session_title})
+            continue
+
+        old_session_title, old_position, old_paper = old_index[key]
+        if key not in in_order:
+            changes.append({
+                "kind": "moved",
+                "title": paper["title"],
+                "session": session_title,
+                "old_session": old_session_title,
+                "position": position,
+                "old_position": old_position
+            })
+
+        fields = {}
+        for field in list(dict.fromkeys(list(old_paper) + list(paper))):
+            if old_paper.get(field) != paper.get(field):
+                fields[field] = (old_paper.get(field), paper.get(field))
+        if len(fields) > 0:
+            changes.append({"kind": "changed", "title": paper["title"], "session": session_title, "fields": fields})
+
+    return changes
+
+def shorten(value, length=100):
+    value = str(value)
+    return value if len(value) <= length else value[:length] + "..."
+
+def print_structural_diff(changes):
+    for change in changes:
+        if change["kind"] == "added_session":
+            print(f"\033[92m+ session {change['session']}\033[0m")
+        elif change["kind"] == "removed_session":
+            print(f"\033[91m- session {change['session']}\033[0m")
+        elif change["kind"] == "added":
+            print(f"\033[92m+ {change['title']} ({change['session']})\033[0m")
+        elif change["kind"] == "removed":
+            print(f"\033[91m- {change['title']} ({change['session']})\033[0m")
+        elif change["kind"] == "moved":
+            print(f"~ {change['title']}: {change['old_session']} #{change['old_position']} -> {change['session']} #{change['position']}")
+        elif change["kind"] == "changed":
+            print(f"~ {change['title']} ({change['session']})")
+            for field, (old_value, new_value) in change["fields"].items():
+                print(f"\033[91m    - {field}: {shorten(old_value)}\033[0m")
+                print(f"\033[92m    + {field}: {shorten(new_value)}\033[0m")
+
+    counts = {}
+    for change in changes:
+        counts[change["kind"]] = counts.get(change["kind"], 0) + 1
+    print(", ".join([f"{count} {kind}" for kind, count in counts.items()]))
+
+def merge_sessions(old_sessions, new_sessions, keep_old_fields=("abstract",), accept_new_fields=("link",)):
+    """
+    Non-interactive merge that takes its structure from new_sessions. For papers present in both,
+    keep_old_fields keep the old value unless it is empty, and accept_new_fields take the new value
+    unless it is empty. Other fields take the new value.
+    """
+    old_index = index_papers(old_sessions)
+    merged = {}
+    for session_title, papers in new_sessions.items():
+        merged[session_title] = [dict(paper) for paper in papers]
+
+    for key, (session_title, position, _) in index_papers(merged).items():
+        if key not in old_index:
+            continue
+        paper = merged[session_title][position]
+        old_paper = old_index[key][2]
+        for field in keep_old_fields:
+            if old_paper.get(field, "") != "":
+                paper[field] = old_paper[field]
+        for field in accept_new_fields:
+            if paper.get(field, "") == "" and old_paper.get(field, "") != "":
+                paper[field] = old_paper[field]
+
+    return merged